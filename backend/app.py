@@ -1,17 +1,27 @@
 """
 Flask主应用
 """
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 import os
-import atexit
 import threading
 import time
+from datetime import datetime
 
 from config import Config
 from routes import upload_bp, analysis_bp, filter_bp
 from models.response import APIResponse, ResponseStatus
-from utils.file_manager import cleanup_old_files
+from utils.expiry_index import configure_expiry_index, CleanerLock, expire_files
+from utils.storage import get_storage
+from utils.pixel_cache import configure_pixel_cache
+from services.compute_pool import configure_compute_pool
+from services.analysis_cache import configure_analysis_cache
+from services.speculative import configure_speculative_worker, get_speculative_worker
+from utils.strips import configure_strip_parallelism
+from utils.metric_pool import configure_metric_pool
+from utils.upload_sessions import configure_upload_sessions, get_upload_sessions
+from utils.single_flight import configure_single_flight, get_single_flight
+from utils.constants import STORAGE_NAMESPACES
 
 def create_app(config_class=Config):
     """Flask应用工厂"""
@@ -29,6 +39,40 @@ def create_app(config_class=Config):
     app.register_blueprint(analysis_bp, url_prefix='/api')
     app.register_blueprint(filter_bp, url_prefix='/api')
 
+    # 解码像素缓存，重复分析/预览/生成同一张图片时跳过解码
+    configure_pixel_cache(app.config.get('PIXEL_CACHE_FOLDER'), app.config.get('PIXEL_CACHE_MAX_BYTES', 0))
+
+    # 分析与滤镜计算进程池，像素经共享内存传递
+    configure_compute_pool(app.config.get('COMPUTE_PROCESSES', 0))
+
+    # 单张大图的条带并行 (同时调低OpenCV内部线程数，避免超额订阅)
+    configure_strip_parallelism(app.config.get('FILTER_STRIP_WORKERS', 0))
+
+    # 单张图片的各项分析指标并行计算
+    configure_metric_pool(app.config.get('ANALYSIS_METRIC_WORKERS', 0))
+
+    # 分析结果缓存，同一张图片追加请求的参数只计算缺少的部分
+    configure_analysis_cache(app.config.get('ANALYSIS_CACHE_ENTRIES', 0))
+
+    # 相同图片内容/操作/参数的并发请求只计算一次
+    configure_single_flight(app.config.get('REQUEST_COALESCING', False), app.config.get('COALESCING_LOCK_FOLDER'))
+
+    # 上传后在空闲时预先解码、准备预览底图并分析，前台请求期间不开始新的推测步骤
+    speculative_worker = configure_speculative_worker(
+        app.config.get('SPECULATIVE_PROCESSING', False),
+        app.config.get('ANALYSIS_ENGINE', 'basic'),
+        app.config.get('SPECULATIVE_QUEUE_SIZE', 64)
+    )
+    if speculative_worker is not None:
+        register_foreground_tracking(app)
+
+    # 可续传分块上传的暂存目录，会话有效期与自动清理时间一致
+    configure_upload_sessions(
+        app.config.get('RESUMABLE_UPLOAD_FOLDER'),
+        app.config.get('RESUMABLE_UPLOAD_MAX_BYTES', 0),
+        app.config['AUTO_CLEANUP_HOURS'] * 3600
+    )
+
     # 注册错误处理器
     register_error_handlers(app)
 
@@ -37,6 +81,21 @@ def create_app(config_class=Config):
 
     return app
 
+def register_foreground_tracking(app):
+    """统计进行中的前台请求，推测任务只在没有前台请求时执行"""
+
+    @app.before_request
+    def foreground_started():
+        worker = get_speculative_worker()
+        if worker is not None:
+            worker.foreground_started()
+
+    @app.teardown_request
+    def foreground_finished(exception=None):
+        worker = get_speculative_worker()
+        if worker is not None:
+            worker.foreground_finished()
+
 def register_error_handlers(app):
     """注册全局错误处理器"""
 
@@ -72,26 +131,70 @@ def register_error_handlers(app):
             error_code="INTERNAL_ERROR"
         ).to_dict()), 500
 
+def _storages(app):
+    """命名空间 -> 存储"""
+    return {namespace: get_storage(namespace, app.config) for namespace in STORAGE_NAMESPACES}
+
+def run_expiry(app):
+    """按过期索引清理文件，返回各命名空间的清理数量"""
+    return expire_files(
+        app.extensions['expiry_index'],
+        _storages(app),
+        app.config['AUTO_CLEANUP_HOURS'],
+        app.config.get('STORAGE_QUOTA_BYTES')
+    )
+
+def reconcile_storage(app):
+    """过期索引与各存储实际内容对账"""
+    index = app.extensions['expiry_index']
+    for namespace, storage in _storages(app).items():
+        changes = index.reconcile(namespace, storage.iter_objects())
+        if any(changes.values()):
+            app.logger.info(f"存储对账 {namespace}: {changes}")
+
 def setup_cleanup_task(app):
     """设置文件清理任务"""
-    cleanup_interval = 3600  # 每小时清理一次
+    cleanup_interval = app.config.get('CLEANUP_INTERVAL', 300)
+
+    # 保存文件时写入过期索引，清理时只取到期条目
+    index = configure_expiry_index(app.config['EXPIRY_INDEX_PATH'])
+    app.extensions['expiry_index'] = index
+
+    # 多个Web进程中只有获得锁的一个负责清理
+    cleaner_lock = CleanerLock(app.config['CLEANER_LOCK_PATH'])
+
+    reconcile_interval = app.config.get('RECONCILE_INTERVAL', 6 * 3600)
 
     def cleanup_worker():
         """后台清理工作线程"""
+        last_reconcile = None
         while True:
             try:
-                with app.app_context():
-                    upload_count = cleanup_old_files(
-                        app.config['UPLOAD_FOLDER'],
-                        app.config['AUTO_CLEANUP_HOURS']
-                    )
-                    output_count = cleanup_old_files(
-                        app.config['OUTPUT_FOLDER'],
-                        app.config['AUTO_CLEANUP_HOURS']
-                    )
-
-                    if upload_count > 0 or output_count > 0:
-                        app.logger.info(f"自动清理完成: 上传文件 {upload_count} 个，输出文件 {output_count} 个")
+                if cleaner_lock.try_acquire():
+                    with app.app_context():
+                        # 首次当选时先与存储对账: 登记索引建立之前已存在的文件，
+                        # 移除停机期间在索引之外被删除的文件，使计数从启动起即准确
+                        if last_reconcile is None:
+                            reconcile_storage(app)
+                            last_reconcile = time.time()
+
+                        removed = run_expiry(app)
+                        upload_count = removed.get('uploads', 0)
+                        output_count = removed.get('outputs', 0)
+
+                        if upload_count > 0 or output_count > 0:
+                            app.logger.info(f"自动清理完成: 上传文件 {upload_count} 个，输出文件 {output_count} 个")
+
+                        upload_sessions = get_upload_sessions()
+                        if upload_sessions is not None:
+                            expired_sessions = upload_sessions.expire()
+                            if expired_sessions > 0:
+                                app.logger.info(f"清理过期上传会话 {expired_sessions} 个")
+
+                        # 低频与存储对账，修正索引之外发生的增删
+                        if time.time() - last_reconcile >= reconcile_interval:
+                            reconcile_storage(app)
+                            last_reconcile = time.time()
 
             except Exception as e:
                 app.logger.error(f"文件清理异常: {str(e)}")
@@ -102,39 +205,34 @@ def setup_cleanup_task(app):
     cleanup_thread = threading.Thread(target=cleanup_worker, daemon=True)
     cleanup_thread.start()
 
-    # 注册退出时清理
-    def cleanup_on_exit():
-        try:
-            cleanup_old_files(app.config['UPLOAD_FOLDER'], 0)  # 清理所有临时文件
-            cleanup_old_files(app.config['OUTPUT_FOLDER'], 0)
-        except:
-            pass
-
-    atexit.register(cleanup_on_exit)
-
 # 添加健康检查和系统信息接口
 def add_system_routes(app):
     """添加系统路由"""
 
     @app.route('/api/health', methods=['GET'])
     def health_check():
-        """健康检查"""
-        from utils.file_manager import list_temp_files
-
+        """健康检查 (只读取存储计数，不扫描文件)"""
         try:
-            file_info = list_temp_files(
-                app.config['UPLOAD_FOLDER'],
-                app.config['OUTPUT_FOLDER']
-            )
+            counters = app.extensions['expiry_index'].get_counters()
+            uploads = counters.get('uploads', {'file_count': 0, 'total_bytes': 0})
+            outputs = counters.get('outputs', {'file_count': 0, 'total_bytes': 0})
 
             health_data = {
                 'status': 'healthy',
-                'upload_folder_size_mb': round(file_info['upload_folder_size'] / 1024 / 1024, 2),
-                'output_folder_size_mb': round(file_info['output_folder_size'] / 1024 / 1024, 2),
-                'upload_files_count': len(file_info['uploads']),
-                'output_files_count': len(file_info['outputs'])
+                'upload_folder_size_mb': round(uploads['total_bytes'] / 1024 / 1024, 2),
+                'output_folder_size_mb': round(outputs['total_bytes'] / 1024 / 1024, 2),
+                'upload_files_count': uploads['file_count'],
+                'output_files_count': outputs['file_count']
             }
 
+            single_flight = get_single_flight()
+            if single_flight is not None:
+                health_data['coalescing'] = single_flight.stats()
+
+            speculative_worker = get_speculative_worker()
+            if speculative_worker is not None:
+                health_data['speculative'] = speculative_worker.stats()
+
             return jsonify(APIResponse(
                 status=ResponseStatus.SUCCESS,
                 message="服务运行正常",
@@ -148,18 +246,67 @@ def add_system_routes(app):
                 error_code="HEALTH_CHECK_ERROR"
             ).to_dict()), 500
 
+    @app.route('/api/admin/files', methods=['GET'])
+    def list_stored_files():
+        """
+        分页列出存储文件 (管理接口)
+
+        Query:
+            namespace: uploads / outputs
+            limit: 每页条数 (最多1000)
+            cursor: 上一页返回的 next_cursor
+        """
+        namespace = request.args.get('namespace', 'uploads')
+        if namespace not in STORAGE_NAMESPACES:
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message=f"未知的存储命名空间: {namespace}",
+                error_code="INVALID_NAMESPACE"
+            ).to_dict()), 400
+
+        try:
+            limit = max(1, min(1000, int(request.args.get('limit', 100))))
+            cursor = None
+            if request.args.get('cursor'):
+                created_at, name = request.args['cursor'].split(':', 1)
+                cursor = (float(created_at), name)
+        except ValueError:
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="分页参数无效",
+                error_code="INVALID_PAGINATION"
+            ).to_dict()), 400
+
+        rows = app.extensions['expiry_index'].list_files(namespace, limit, cursor)
+        files = [{
+            'filename': name,
+            'size': size,
+            'modified': datetime.fromtimestamp(created_at).isoformat(),
+            'accessed': datetime.fromtimestamp(accessed_at).isoformat()
+        } for name, size, created_at, accessed_at in rows]
+
+        next_cursor = None
+        if len(rows) == limit:
+            last_name, _, last_created_at, _ = rows[-1]
+            next_cursor = f"{last_created_at!r}:{last_name}"
+
+        return jsonify(APIResponse(
+            status=ResponseStatus.SUCCESS,
+            message="文件列表获取成功",
+            data={
+                'namespace': namespace,
+                'files': files,
+                'next_cursor': next_cursor
+            }
+        ).to_dict()), 200
+
     @app.route('/api/cleanup', methods=['POST'])
     def manual_cleanup():
         """手动触发文件清理"""
         try:
-            upload_count = cleanup_old_files(
-                app.config['UPLOAD_FOLDER'],
-                app.config['AUTO_CLEANUP_HOURS']
-            )
-            output_count = cleanup_old_files(
-                app.config['OUTPUT_FOLDER'],
-                app.config['AUTO_CLEANUP_HOURS']
-            )
+            removed = run_expiry(app)
+            upload_count = removed.get('uploads', 0)
+            output_count = removed.get('outputs', 0)
 
             cleanup_data = {
                 'upload_files_cleaned': upload_count,
@@ -10,12 +10,40 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
     OUTPUT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'output')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    RESUMABLE_UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'upload_sessions')  # 可续传上传的暂存目录
+    RESUMABLE_UPLOAD_MAX_BYTES = int(os.environ.get('RESUMABLE_UPLOAD_MAX_BYTES', 100 * 1024 * 1024))  # 可续传上传的单个文件上限
+    BULK_UPLOAD_MAX_BYTES = int(os.environ.get('BULK_UPLOAD_MAX_BYTES', 2 * 1024 * 1024 * 1024))  # 批量上传请求体上限 (边读边处理，不受MAX_CONTENT_LENGTH限制)
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 
     # 处理配置
     ANALYSIS_TIMEOUT = 30  # 30秒超时
     GENERATION_TIMEOUT = 20  # 20秒超时
     AUTO_CLEANUP_HOURS = 24  # 24小时后自动清理
+    CLEANUP_INTERVAL = 300  # 过期检查间隔(秒)，只处理索引中到期的条目
+    RECONCILE_INTERVAL = 6 * 3600  # 存储计数与磁盘对账间隔(秒)，需要全量扫描目录
+    STORAGE_QUOTA_BYTES = None  # 上传+输出总容量配额，超出时按LRU淘汰；None表示不限制
+    EXPIRY_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'storage_index.db')
+    CLEANER_LOCK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'storage_cleaner.lock')
+
+    # 存储后端配置
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')  # local / s3
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_KEY_PREFIX = os.environ.get('S3_KEY_PREFIX', '')  # 对象键前缀，其后为 uploads/ 或 outputs/
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')  # 本地联调时指向MinIO，如 http://127.0.0.1:9000
+    S3_REGION = os.environ.get('S3_REGION')
+    STORAGE_CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'storage_cache')  # 远程存储的节点本地缓存
+    STORAGE_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 本地缓存容量上限，超出时按LRU淘汰
+    PIXEL_CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pixel_cache')  # 解码像素(.npy)缓存
+    PIXEL_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 像素缓存容量上限，0表示关闭
+    COMPUTE_PROCESSES = int(os.environ.get('COMPUTE_PROCESSES', 0))  # 分析/滤镜计算进程数，0表示在请求线程内计算
+    ANALYSIS_ENGINE = os.environ.get('ANALYSIS_ENGINE', 'basic')  # 默认分析引擎 (basic/advanced/sampled)，可按请求覆盖
+    ANALYSIS_CACHE_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_ENTRIES', 512))  # 分析结果缓存条目数(按图片与引擎)，0表示关闭
+    ANALYSIS_METRIC_WORKERS = int(os.environ.get('ANALYSIS_METRIC_WORKERS', 0))  # 单张图片分析指标并行线程数，0表示顺序计算
+    REQUEST_COALESCING = os.environ.get('REQUEST_COALESCING', '1') == '1'  # 合并相同图片/操作/参数的并发分析、生成与预览
+    COALESCING_LOCK_FOLDER = os.environ.get('COALESCING_LOCK_FOLDER')  # 设置后通过锁文件跨进程合并 (多个Web进程共享该目录)
+    SPECULATIVE_PROCESSING = os.environ.get('SPECULATIVE_PROCESSING', '0') == '1'  # 上传后空闲时预先解码、准备预览底图并分析
+    SPECULATIVE_QUEUE_SIZE = int(os.environ.get('SPECULATIVE_QUEUE_SIZE', 64))  # 推测任务排队上限，超出时丢弃最早的任务
+    FILTER_STRIP_WORKERS = int(os.environ.get('FILTER_STRIP_WORKERS', 0))  # 单张大图条带并行线程数，0表示关闭
 
     # CORS配置
     CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000']
@@ -23,6 +51,9 @@ class Config:
     # 图像处理配置
     MAX_IMAGE_SIZE = (2048, 2048)  # 最大处理尺寸
     QUALITY_COMPRESSION = 85  # JPEG压缩质量
+    UPLOAD_ENCODER_PROFILE = 'balanced'  # 上传图片归一化编码配置 (fast/balanced/smallest)
+    OUTPUT_ENCODER_PROFILE = 'balanced'  # 滤镜输出默认编码配置
+    OUTPUT_FORMAT = 'jpeg'  # 滤镜输出默认格式 (jpeg/webp)
 
     @staticmethod
     def init_app(app):
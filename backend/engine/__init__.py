@@ -0,0 +1,9 @@
+# engine/__init__.py
+# 纯图像计算模块，只依赖 NumPy / OpenCV / Pillow，可被后端服务与独立脚本服务器共同导入
+from .filters import (
+    FILTER_SEMANTICS, FilterStage, build_filter_stages, apply_filter_stages,
+    apply_filter_parameters, fuse_lut_stages, parameter_value, hsv_lut
+)
+
+__all__ = ['FILTER_SEMANTICS', 'FilterStage', 'build_filter_stages', 'apply_filter_stages',
+           'apply_filter_parameters', 'fuse_lut_stages', 'parameter_value', 'hsv_lut']
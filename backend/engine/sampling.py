@@ -0,0 +1,137 @@
+"""
+分层随机抽样
+把图像划分为网格，每格独立均匀抽取相同数量的像素(有放回)；
+全局均值类指标用分层估计量在样本上计算，并给出标准误差
+"""
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Sobel 3x3 核 (行优先展开)，与 cv2.Sobel(ksize=3) 一致
+_SOBEL_X = np.array([-1, 0, 1, -2, 0, 2, -1, 0, 1], dtype=np.float32)
+_SOBEL_Y = np.array([-1, -2, -1, 0, 0, 0, 1, 2, 1], dtype=np.float32)
+
+def _reflect_101(index: np.ndarray, size: int) -> np.ndarray:
+    """越界下标按 BORDER_REFLECT_101 (OpenCV默认边界) 映射回图像内"""
+    index = np.abs(index)
+    return np.where(index >= size, 2 * (size - 1) - index, index)
+
+class StratifiedSample:
+    """
+    图像的分层随机样本
+
+    抽样位置只取决于图像尺寸与随机种子，同一张图片重复分析得到相同的样本
+    """
+
+    def __init__(self, image_bgr: np.ndarray, sample_size: int, grid: int = 16, seed: int = 0):
+        height, width = image_bgr.shape[:2]
+        if height < 3 or width < 3:
+            raise ValueError("图片过小，无法抽样")
+
+        rows_grid = min(grid, height)
+        cols_grid = min(grid, width)
+        row_edges = np.linspace(0, height, rows_grid + 1).astype(np.int64)
+        col_edges = np.linspace(0, width, cols_grid + 1).astype(np.int64)
+        row_sizes = np.diff(row_edges)
+        col_sizes = np.diff(col_edges)
+
+        strata = rows_grid * cols_grid
+        per_stratum = max(2, -(-sample_size // strata))
+        rng = np.random.default_rng(seed)
+
+        # 每格抽取 per_stratum 个像素，格的编号按行优先排列
+        cell_rows = np.repeat(np.arange(rows_grid), cols_grid)
+        cell_cols = np.tile(np.arange(cols_grid), rows_grid)
+        offsets_y = rng.random((strata, per_stratum))
+        offsets_x = rng.random((strata, per_stratum))
+        self.rows = (row_edges[cell_rows][:, None] + (offsets_y * row_sizes[cell_rows][:, None]).astype(np.int64)).ravel()
+        self.cols = (col_edges[cell_cols][:, None] + (offsets_x * col_sizes[cell_cols][:, None]).astype(np.int64)).ravel()
+
+        self.image = image_bgr
+        self.size = self.rows.size
+        self.per_stratum = per_stratum
+        # 各层权重为其面积占整图的比例
+        self.weights = np.outer(row_sizes, col_sizes).ravel() / float(height * width)
+        self._cache = {}
+
+    def _memo(self, name: str, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    # ---- 采样点上的像素值 (与整图转换逐像素一致) ----
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """采样点的BGR值 (N x 3, uint8)"""
+        return self._memo('bgr', lambda: self.image[self.rows, self.cols])
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self._memo('gray', lambda: cv2.cvtColor(self.bgr[None], cv2.COLOR_BGR2GRAY)[0])
+
+    @property
+    def hsv(self) -> np.ndarray:
+        return self._memo('hsv', lambda: cv2.cvtColor(self.bgr[None], cv2.COLOR_BGR2HSV)[0])
+
+    @property
+    def sobel_magnitude(self) -> np.ndarray:
+        """采样点的3x3 Sobel梯度幅值，与整图 cv2.Sobel + cv2.magnitude 一致"""
+        def build():
+            height, width = self.image.shape[:2]
+            patch = np.empty((self.size, 3, 3, 3), dtype=np.uint8)
+
+            # 内部像素: 在3x3滑动窗口视图上一次取出整个邻域
+            interior = (self.rows > 0) & (self.rows < height - 1) & (self.cols > 0) & (self.cols < width - 1)
+            windows = sliding_window_view(self.image, (3, 3), axis=(0, 1))
+            patch[interior] = windows[self.rows[interior] - 1, self.cols[interior] - 1].transpose(0, 2, 3, 1)
+
+            # 边缘像素 (很少): 按默认边界规则镜像取邻域
+            edge = ~interior
+            if edge.any():
+                offsets = np.arange(-1, 2)
+                rows = _reflect_101(self.rows[edge, None, None] + offsets[:, None], height)
+                cols = _reflect_101(self.cols[edge, None, None] + offsets[None, :], width)
+                patch[edge] = self.image[rows, cols]
+
+            gray = cv2.cvtColor(patch.reshape(1, -1, 3), cv2.COLOR_BGR2GRAY).reshape(-1, 9).astype(np.float32)
+            grad_x = gray @ _SOBEL_X
+            grad_y = gray @ _SOBEL_Y
+            return np.sqrt(grad_x * grad_x + grad_y * grad_y)
+        return self._memo('sobel_magnitude', build)
+
+    # ---- 分层估计 ----
+
+    def mean(self, values: np.ndarray) -> Tuple[float, float]:
+        """
+        分层均值估计
+
+        Returns:
+            (估计值, 标准误差)  标准误差 = sqrt(Σ W_h² s_h² / n_h)
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.per_stratum)
+        stratum_means = values.mean(axis=1)
+        stratum_vars = values.var(axis=1, ddof=1)
+        estimate = float(self.weights @ stratum_means)
+        standard_error = float(np.sqrt((self.weights ** 2) @ stratum_vars / self.per_stratum))
+        return estimate, standard_error
+
+    def ratio_mean(self, values: np.ndarray, mask: np.ndarray, min_count: int = 0) -> Optional[Tuple[float, float]]:
+        """
+        子区域(mask为真的像素)内的均值估计 (比率估计量，标准误差按线性化计算)
+
+        Returns:
+            (估计值, 标准误差)；样本中该区域像素少于 min_count 时返回 None
+        """
+        count = int(np.count_nonzero(mask))
+        if count == 0 or count < min_count:
+            return None
+        values = np.asarray(values, dtype=np.float64)
+        indicator = mask.astype(np.float64)
+        proportion, _ = self.mean(indicator)
+        total, _ = self.mean(values * indicator)
+        estimate = total / proportion
+        _, standard_error = self.mean(indicator * (values - estimate) / proportion)
+        return estimate, standard_error
@@ -2,7 +2,7 @@
 图像分析参数数据模型
 """
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 @dataclass
@@ -13,6 +13,32 @@ class ParameterValue:
     value: float    # 调整幅度
     unit: str       # 单位 %/K/°等
     reference: str  # 参考标准
+    confidence_interval: Optional[Tuple[float, float]] = None  # 抽样估计时 value 的置信区间，精确计算时为空
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            'name': self.name,
+            'direction': self.direction,
+            'value': self.value,
+            'unit': self.unit,
+            'reference': self.reference
+        }
+        if self.confidence_interval is not None:
+            result['confidence_interval'] = list(self.confidence_interval)
+        return result
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ParameterValue':
+        """从 to_dict 的输出创建实例"""
+        interval = data.get('confidence_interval')
+        return cls(
+            name=data['name'],
+            direction=data['direction'],
+            value=data['value'],
+            unit=data['unit'],
+            reference=data['reference'],
+            confidence_interval=tuple(interval) if interval is not None else None
+        )
 
 @dataclass
 class AnalysisResult:
@@ -22,24 +48,45 @@ class AnalysisResult:
     analysis_time: float  # 分析耗时(秒)
     timestamp: datetime
     confidence_score: float  # 分析置信度
+    metrics: Optional[Dict[str, Dict[str, Any]]] = None  # 各项原始指标 (增强引擎)
+    suggestions: Optional[List[str]] = None  # 引擎给出的建议 (增强引擎)
+    engine: str = 'basic'  # 分析引擎
+
+    @property
+    def parameters_present(self) -> List[str]:
+        """结果中已包含的参数 (按需分析时可能只是8类参数的一部分)"""
+        return list(self.parameters)
 
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
-        return {
+        result = {
             'image_id': self.image_id,
-            'parameters': {
-                name: {
-                    'name': param.name,
-                    'direction': param.direction,
-                    'value': param.value,
-                    'unit': param.unit,
-                    'reference': param.reference
-                } for name, param in self.parameters.items()
-            },
+            'parameters': {name: param.to_dict() for name, param in self.parameters.items()},
             'analysis_time': self.analysis_time,
             'timestamp': self.timestamp.isoformat(),
-            'confidence_score': self.confidence_score
+            'confidence_score': self.confidence_score,
+            'engine': self.engine,
+            'parameters_present': self.parameters_present
         }
+        if self.metrics is not None:
+            result['metrics'] = self.metrics
+        if self.suggestions is not None:
+            result['suggestions'] = self.suggestions
+        return result
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AnalysisResult':
+        """从 to_dict 的输出创建实例"""
+        return cls(
+            image_id=data['image_id'],
+            parameters={name: ParameterValue.from_dict(param) for name, param in data['parameters'].items()},
+            analysis_time=data['analysis_time'],
+            timestamp=datetime.fromisoformat(data['timestamp']),
+            confidence_score=data['confidence_score'],
+            metrics=data.get('metrics'),
+            suggestions=data.get('suggestions'),
+            engine=data.get('engine', 'basic')
+        )
 
 @dataclass
 class FilterParameter:
@@ -47,6 +47,9 @@ class AnalysisResponse:
     confidence_score: float
     suggestions: List[str]
     message: str = "分析完成"
+    engine: str = 'basic'
+    metrics: Optional[Dict[str, Any]] = None
+    parameters_present: Optional[List[str]] = None  # 本次结果包含的参数
 
 @dataclass
 class GenerationResponse:
@@ -2,12 +2,18 @@
 参数分析路由
 """
 from flask import Blueprint, request, jsonify, current_app
-import os
+from werkzeug.exceptions import RequestEntityTooLarge
 import traceback
 
-from ..models.response import APIResponse, ResponseStatus, AnalysisResponse
-from ..services.image_analyzer import ImageAnalyzer
+import numpy as np
+
+from ..models.response import APIResponse, ResponseStatus, AnalysisResponse, UploadResponse
+from ..services.compute_pool import analyze_image as run_analysis, analyze_pixels
+from ..services.analyzers import ANALYZER_ENGINES
 from ..utils.constants import SUCCESS_MESSAGES, ERROR_MESSAGES, ANALYSIS_THRESHOLDS
+from ..utils.file_manager import decode_uploaded_image, save_image_async
+from ..utils.storage import get_storage
+from ..utils.validation import ValidationError, normalize_analysis_parameters, validate_image_file
 
 analysis_bp = Blueprint('analysis', __name__)
 
@@ -19,64 +25,41 @@ def analyze_image(image_id):
     Args:
         image_id: 图片ID
 
+    Query / Request body (可选):
+        engine: 分析引擎 basic/advanced/sampled，缺省使用 ANALYSIS_ENGINE 配置
+        parameters: 只分析这些参数 (查询参数用逗号分隔，请求体可用列表)，缺省为全部8类
+
     Returns:
-        分析结果包含8类参数信息
+        分析结果包含请求的参数信息及 parameters_present (advanced 引擎额外返回各项原始指标 metrics)
     """
     try:
+        engine = _requested_engine()
+        if engine not in ANALYZER_ENGINES:
+            return _invalid_engine_response(engine)
+
+        try:
+            parameters = _requested_parameters()
+        except ValidationError as e:
+            return _invalid_parameters_response(e)
+
         # 检查图片文件是否存在
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        image_path = os.path.join(upload_folder, f"{image_id}.jpg")
+        upload_storage = get_storage('uploads')
+        image_path = upload_storage.resolve(image_id)
 
-        if not os.path.exists(image_path):
+        if image_path is None:
             return jsonify(APIResponse(
                 status=ResponseStatus.ERROR,
                 message=ERROR_MESSAGES['file_not_found'],
                 error_code="FILE_NOT_FOUND"
             ).to_dict()), 404
 
-        # 初始化分析器
-        analyzer = ImageAnalyzer()
+        upload_storage.touch(image_path)
 
         try:
-            # 执行分析
-            analysis_result = analyzer.analyze_image(image_path)
-
-            # 检查是否有显著变化
-            significant_changes = []
-            all_parameters = {}
-
-            for param_name, param_value in analysis_result.parameters.items():
-                param_dict = {
-                    'name': param_value.name,
-                    'direction': param_value.direction,
-                    'value': round(param_value.value, 1),
-                    'unit': param_value.unit,
-                    'reference': param_value.reference
-                }
-                all_parameters[param_name] = param_dict
-
-                # 检查是否为显著变化
-                if param_value.value >= ANALYSIS_THRESHOLDS['min_change_threshold']:
-                    significant_changes.append(param_name)
-
-            # 生成建议
-            suggestions = _generate_suggestions(analysis_result, significant_changes)
-
-            # 如果没有显著变化
-            if len(significant_changes) == 0:
-                message = "该图片接近原始效果，未检测到显著滤镜参数调整"
-            else:
-                message = SUCCESS_MESSAGES['analysis_complete']
-
-            # 构造响应数据
-            analysis_data = AnalysisResponse(
-                image_id=image_id,
-                parameters=all_parameters,
-                analysis_time=round(analysis_result.analysis_time, 2),
-                confidence_score=analysis_result.confidence_score,
-                suggestions=suggestions,
-                message=message
-            )
+            # 执行分析 (配置了计算进程池时在计算进程中执行)
+            analysis_result = run_analysis(image_path, engine, parameters)
+
+            message, analysis_data = _analysis_response(image_id, analysis_result)
 
             return jsonify(APIResponse(
                 status=ResponseStatus.SUCCESS,
@@ -102,6 +85,116 @@ def analyze_image(image_id):
             error_code="INTERNAL_ERROR"
         ).to_dict()), 500
 
+@analysis_bp.route('/analyze/upload', methods=['POST'])
+def upload_and_analyze():
+    """
+    上传并分析图片 (一次请求完成 /upload 与 /analyze/<id>)
+
+    请求体中的图片只在内存中解码一次，分析直接使用解码后的像素；
+    上传文件在后台编码保存，保存完成前按该ID的后续请求会等待写入结束
+
+    Form:
+        image: 图片文件
+        engine / parameters: 同 /analyze/<id> (也可用查询参数)
+
+    Returns:
+        上传信息 (image_id、filename、file_size、dimensions) 与 analysis 分析结果
+    """
+    try:
+        if 'image' not in request.files:
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="未选择文件",
+                error_code="NO_FILE"
+            ).to_dict()), 400
+
+        engine = _requested_engine()
+        if engine not in ANALYZER_ENGINES:
+            return _invalid_engine_response(engine)
+
+        try:
+            parameters = _requested_parameters()
+        except ValidationError as e:
+            return _invalid_parameters_response(e)
+
+        file = request.files['image']
+        try:
+            validate_image_file(file, current_app.config['ALLOWED_EXTENSIONS'])
+        except ValidationError as e:
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message=str(e),
+                error_code="VALIDATION_ERROR"
+            ).to_dict()), 400
+
+        try:
+            image, file_size = decode_uploaded_image(file, current_app.config['MAX_IMAGE_SIZE'])
+        except Exception as e:
+            current_app.logger.error(f"图片解码失败: {str(e)}")
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message=f"无效的图片文件: {str(e)}",
+                error_code="VALIDATION_ERROR"
+            ).to_dict()), 400
+
+        # 后台编码保存，与分析同时进行
+        image_id, saved_filename, write_future = save_image_async(
+            image,
+            get_storage('uploads'),
+            current_app.config.get('UPLOAD_ENCODER_PROFILE', 'balanced')
+        )
+
+        try:
+            analysis_result = analyze_pixels(np.asarray(image), engine, parameters)
+        except Exception as e:
+            current_app.logger.error(f"图像分析失败: {str(e)}")
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message=ERROR_MESSAGES['analysis_failed'],
+                error_code="ANALYSIS_ERROR",
+                data={'image_id': image_id}
+            ).to_dict()), 500
+
+        # 分析的是编码保存之前的像素，不写入按保存文件索引的分析缓存，
+        # 之后的 /analyze/<id> 按实际保存的图片计算
+        logger = current_app.logger
+
+        def on_saved(future):
+            if future.exception() is not None:
+                logger.error(f"上传图片保存失败: {future.exception()}")
+        write_future.add_done_callback(on_saved)
+
+        message, analysis_data = _analysis_response(image_id, analysis_result)
+        upload_data = UploadResponse(
+            image_id=image_id,
+            filename=saved_filename,
+            file_size=file_size,
+            dimensions=image.size
+        )
+
+        return jsonify(APIResponse(
+            status=ResponseStatus.SUCCESS,
+            message=message,
+            data={**upload_data.__dict__, 'analysis': analysis_data.__dict__}
+        ).to_dict()), 200
+
+    except RequestEntityTooLarge:
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message=ERROR_MESSAGES['file_too_large'],
+            error_code="FILE_TOO_LARGE"
+        ).to_dict()), 413
+
+    except Exception as e:
+        current_app.logger.error(f"上传分析请求处理异常: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message="服务器内部错误",
+            error_code="INTERNAL_ERROR"
+        ).to_dict()), 500
+
 @analysis_bp.route('/analyze/batch', methods=['POST'])
 def analyze_batch():
     """
@@ -109,7 +202,9 @@ def analyze_batch():
 
     Request body:
         {
-            "image_ids": ["id1", "id2", "id3"]
+            "image_ids": ["id1", "id2", "id3"],
+            "engine": "basic",  // 可选
+            "parameters": ["brightness", "temperature"]  // 可选，缺省为全部8类
         }
 
     Returns:
@@ -124,6 +219,15 @@ def analyze_batch():
                 error_code="MISSING_IMAGE_IDS"
             ).to_dict()), 400
 
+        engine = _requested_engine()
+        if engine not in ANALYZER_ENGINES:
+            return _invalid_engine_response(engine)
+
+        try:
+            requested_parameters = _requested_parameters()
+        except ValidationError as e:
+            return _invalid_parameters_response(e)
+
         image_ids = data['image_ids']
         if len(image_ids) > 10:  # 限制批量处理数量
             return jsonify(APIResponse(
@@ -132,25 +236,26 @@ def analyze_batch():
                 error_code="TOO_MANY_IMAGES"
             ).to_dict()), 400
 
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        analyzer = ImageAnalyzer()
+        upload_storage = get_storage('uploads')
 
         results = []
         failed_images = []
 
         for image_id in image_ids:
             try:
-                image_path = os.path.join(upload_folder, f"{image_id}.jpg")
+                image_path = upload_storage.resolve(image_id)
 
-                if not os.path.exists(image_path):
+                if image_path is None:
                     failed_images.append({
                         'image_id': image_id,
                         'error': 'file_not_found'
                     })
                     continue
 
+                upload_storage.touch(image_path)
+
                 # 分析图片
-                analysis_result = analyzer.analyze_image(image_path)
+                analysis_result = run_analysis(image_path, engine, requested_parameters)
 
                 # 简化输出格式
                 parameters = {}
@@ -163,6 +268,7 @@ def analyze_batch():
                 results.append({
                     'image_id': image_id,
                     'parameters': parameters,
+                    'parameters_present': analysis_result.parameters_present,
                     'confidence_score': analysis_result.confidence_score
                 })
 
@@ -194,6 +300,97 @@ def analyze_batch():
             error_code="BATCH_ANALYSIS_ERROR"
         ).to_dict()), 500
 
+def _analysis_response(image_id, analysis_result):
+    """分析结果 -> (提示消息, AnalysisResponse)，参数值保留1位小数并标出显著变化"""
+    # 检查是否有显著变化
+    significant_changes = []
+    all_parameters = {}
+
+    for param_name, param_value in analysis_result.parameters.items():
+        param_dict = {
+            'name': param_value.name,
+            'direction': param_value.direction,
+            'value': round(param_value.value, 1),
+            'unit': param_value.unit,
+            'reference': param_value.reference
+        }
+        if param_value.confidence_interval is not None:
+            param_dict['confidence_interval'] = [round(bound, 1) for bound in param_value.confidence_interval]
+        all_parameters[param_name] = param_dict
+
+        # 检查是否为显著变化
+        if param_value.value >= ANALYSIS_THRESHOLDS['min_change_threshold']:
+            significant_changes.append(param_name)
+
+    # 生成建议 (引擎自带建议时优先使用)
+    suggestions = analysis_result.suggestions or _generate_suggestions(analysis_result, significant_changes)
+
+    # 如果没有显著变化
+    if len(significant_changes) == 0:
+        message = "该图片接近原始效果，未检测到显著滤镜参数调整"
+    else:
+        message = SUCCESS_MESSAGES['analysis_complete']
+
+    # 构造响应数据
+    analysis_data = AnalysisResponse(
+        image_id=image_id,
+        parameters=all_parameters,
+        analysis_time=round(analysis_result.analysis_time, 2),
+        confidence_score=analysis_result.confidence_score,
+        suggestions=suggestions,
+        message=message,
+        engine=analysis_result.engine,
+        metrics=analysis_result.metrics,
+        parameters_present=analysis_result.parameters_present
+    )
+
+    return message, analysis_data
+
+def _requested_engine() -> str:
+    """请求指定的分析引擎: 查询参数优先，其次为JSON请求体或表单字段，缺省使用配置"""
+    engine = request.args.get('engine')
+    if not engine:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            engine = body.get('engine')
+        else:
+            engine = request.form.get('engine')
+    return engine or current_app.config.get('ANALYSIS_ENGINE', 'basic')
+
+def _requested_parameters():
+    """
+    请求分析的参数子集: 查询参数(逗号分隔)优先，其次为JSON请求体(列表或逗号分隔)或表单字段
+
+    Raises:
+        ValidationError: 包含未知的参数名
+    """
+    names = request.args.get('parameters')
+    if not names:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            names = body.get('parameters')
+        else:
+            names = request.form.get('parameters')
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(',') if name.strip()]
+    elif names is not None and not (isinstance(names, list) and all(isinstance(name, str) for name in names)):
+        raise ValidationError("parameters 应为参数名列表")
+    return normalize_analysis_parameters(names)
+
+def _invalid_parameters_response(error):
+    return jsonify(APIResponse(
+        status=ResponseStatus.ERROR,
+        message=f"{ERROR_MESSAGES['invalid_analysis_parameters']}: {error}",
+        error_code="INVALID_ANALYSIS_PARAMETERS"
+    ).to_dict()), 400
+
+def _invalid_engine_response(engine):
+    return jsonify(APIResponse(
+        status=ResponseStatus.ERROR,
+        message=f"{ERROR_MESSAGES['invalid_analysis_engine']}: {engine}",
+        error_code="INVALID_ANALYSIS_ENGINE"
+    ).to_dict()), 400
+
 def _generate_suggestions(analysis_result, significant_changes):
     """生成参数应用建议"""
     suggestions = []
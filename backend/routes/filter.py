@@ -1,15 +1,25 @@
 """
 滤镜生成路由
 """
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app, send_file, Response, stream_with_context
 import os
+import json
+import time
 import traceback
 
 from ..models.response import APIResponse, ResponseStatus, GenerationResponse
 from ..models.parameter import FilterParameter
 from ..services.filter_generator import FilterGenerator
+from ..services.batch_generator import BatchFilterGenerator
+from ..services.compute_pool import apply_filters
 from ..utils.validation import validate_filter_parameters
-from ..utils.constants import SUCCESS_MESSAGES, ERROR_MESSAGES
+from ..utils.image_encoder import (
+    validate_encoder_options, get_output_mimetype, get_output_extension, iter_encoded_chunks
+)
+from ..utils.file_manager import generate_image_id, write_file_atomic
+from ..utils.storage import get_storage
+from ..utils.single_flight import coalesce, json_codec
+from ..utils.constants import SUCCESS_MESSAGES, ERROR_MESSAGES, BATCH_PROCESSING, OUTPUT_FORMATS
 
 filter_bp = Blueprint('filter', __name__)
 
@@ -25,7 +35,9 @@ def generate_filter():
                 "brightness": 20,
                 "contrast": -10,
                 ...
-            }
+            },
+            "encoder_profile": "fast",  # 可选: fast/balanced/smallest
+            "output_format": "jpeg"     # 可选: jpeg/webp
         }
 
     Returns:
@@ -59,17 +71,27 @@ def generate_filter():
                 error_code="INVALID_PARAMETERS"
             ).to_dict()), 400
 
+        encoder_profile, output_format = _get_encoder_options(data)
+        if not validate_encoder_options(encoder_profile, output_format):
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="不支持的编码配置或输出格式",
+                error_code="INVALID_ENCODER_OPTIONS"
+            ).to_dict()), 400
+
         # 检查原始图片是否存在
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        original_image_path = os.path.join(upload_folder, f"{original_image_id}.jpg")
+        upload_storage = get_storage('uploads')
+        original_image_path = upload_storage.resolve(original_image_id)
 
-        if not os.path.exists(original_image_path):
+        if original_image_path is None:
             return jsonify(APIResponse(
                 status=ResponseStatus.ERROR,
                 message="原始图片不存在",
                 error_code="ORIGINAL_IMAGE_NOT_FOUND"
             ).to_dict()), 404
 
+        upload_storage.touch(original_image_path)
+
         try:
             # 创建滤镜参数对象
             filter_params = FilterParameter.from_dict(parameters_dict)
@@ -77,12 +99,16 @@ def generate_filter():
             # 初始化滤镜生成器
             generator = FilterGenerator()
 
-            # 生成滤镜图片
-            output_image_id, output_filename, processing_time = generator.generate_filter_image(
-                original_image_path,
-                filter_params,
-                current_app.config['OUTPUT_FOLDER']
+            # 生成滤镜图片 (配置了计算进程池时在计算进程中处理)
+            start_time = time.time()
+            processed_image = apply_filters(original_image_path, filter_params, generator)
+            output_image_id, output_filename = generator.save_image(
+                processed_image,
+                get_storage('outputs'),
+                encoder_profile,
+                output_format
             )
+            processing_time = time.time() - start_time
 
             # 构造响应数据
             generation_data = GenerationResponse(
@@ -117,6 +143,239 @@ def generate_filter():
             error_code="INTERNAL_ERROR"
         ).to_dict()), 500
 
+@filter_bp.route('/generate/stream', methods=['POST'])
+def generate_filter_stream():
+    """
+    生成滤镜图片并直接流式返回图片数据 (分块传输，不经过磁盘)
+
+    Request body:
+        {
+            "original_image_id": "图片ID",
+            "parameters": {...},
+            "encoder_profile": "fast",  # 可选
+            "output_format": "jpeg",    # 可选
+            "persist": false            # 可选，为true时先写入输出目录再发送，之后可通过/download下载
+        }
+
+    Returns:
+        图片数据流；持久化时响应头 X-Output-Image-Id 给出输出图片ID
+    """
+    try:
+        data = request.get_json()
+        if not data or 'original_image_id' not in data or 'parameters' not in data:
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="缺少原始图片ID或参数",
+                error_code="MISSING_REQUIRED_FIELDS"
+            ).to_dict()), 400
+
+        original_image_id = data['original_image_id']
+        parameters_dict = data['parameters']
+        persist = bool(data.get('persist', False))
+
+        # 验证参数
+        if not validate_filter_parameters(parameters_dict):
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="参数值超出有效范围",
+                error_code="INVALID_PARAMETERS"
+            ).to_dict()), 400
+
+        encoder_profile, output_format = _get_encoder_options(data)
+        if not validate_encoder_options(encoder_profile, output_format):
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="不支持的编码配置或输出格式",
+                error_code="INVALID_ENCODER_OPTIONS"
+            ).to_dict()), 400
+
+        # 检查原始图片是否存在
+        upload_storage = get_storage('uploads')
+        original_image_path = upload_storage.resolve(original_image_id)
+
+        if original_image_path is None:
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="原始图片不存在",
+                error_code="ORIGINAL_IMAGE_NOT_FOUND"
+            ).to_dict()), 404
+
+        upload_storage.touch(original_image_path)
+
+        try:
+            # 解码和滤镜处理在响应开始前完成，失败时仍可返回JSON错误
+            filter_params = FilterParameter.from_dict(parameters_dict)
+            generator = FilterGenerator()
+            processed_image = apply_filters(original_image_path, filter_params, generator)
+        except Exception as e:
+            current_app.logger.error(f"滤镜生成失败: {str(e)}")
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message=ERROR_MESSAGES['generation_failed'],
+                error_code="GENERATION_ERROR"
+            ).to_dict()), 500
+
+        output_image_id = generate_image_id()
+        extension = get_output_extension(output_format)
+        headers = {
+            'Content-Disposition': f'attachment; filename="filter_{output_image_id}.{extension}"',
+            'Cache-Control': 'no-store'
+        }
+
+        if persist:
+            # 先编码写入输出存储再从文件发送: 响应头中的ID在发送时已可下载，
+            # 客户端中途断开也不影响保存，编码结果不在内存中整体缓存
+            output_storage = get_storage('outputs')
+            output_path = output_storage.new_path(output_image_id, extension)
+            try:
+                write_file_atomic(
+                    output_path,
+                    iter_encoded_chunks(processed_image, encoder_profile, output_format),
+                    output_storage
+                )
+            except Exception as e:
+                current_app.logger.error(f"输出图片保存失败: {str(e)}")
+                return jsonify(APIResponse(
+                    status=ResponseStatus.ERROR,
+                    message=ERROR_MESSAGES['generation_failed'],
+                    error_code="GENERATION_ERROR"
+                ).to_dict()), 500
+
+            headers['X-Output-Image-Id'] = output_image_id
+            response = send_file(output_path, mimetype=get_output_mimetype(output_format))
+            response.headers.update(headers)
+            return response
+
+        return Response(
+            iter_encoded_chunks(processed_image, encoder_profile, output_format),
+            mimetype=get_output_mimetype(output_format),
+            headers=headers,
+            direct_passthrough=True
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"滤镜流式生成请求处理异常: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message="服务器内部错误",
+            error_code="INTERNAL_ERROR"
+        ).to_dict()), 500
+
+@filter_bp.route('/generate/batch', methods=['POST'])
+def generate_filter_batch():
+    """
+    将同一组滤镜参数批量应用到多张图片
+
+    Request body:
+        {
+            "image_ids": ["id1", "id2", ...],
+            "parameters": {...},
+            "encoder_profile": "fast",  # 可选
+            "output_format": "jpeg"     # 可选
+        }
+
+    Returns:
+        NDJSON流，每完成一张图片输出一行结果，最后一行为汇总信息
+    """
+    try:
+        data = request.get_json()
+        if not data or 'image_ids' not in data or 'parameters' not in data:
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="缺少图片ID列表或参数",
+                error_code="MISSING_REQUIRED_FIELDS"
+            ).to_dict()), 400
+
+        image_ids = data['image_ids']
+        parameters_dict = data['parameters']
+
+        if not isinstance(image_ids, list) or len(image_ids) == 0:
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="图片ID列表不能为空",
+                error_code="MISSING_IMAGE_IDS"
+            ).to_dict()), 400
+
+        if len(image_ids) > BATCH_PROCESSING['max_images']:
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message=f"批量生成最多支持{BATCH_PROCESSING['max_images']}张图片",
+                error_code="TOO_MANY_IMAGES"
+            ).to_dict()), 400
+
+        # 验证参数
+        if not validate_filter_parameters(parameters_dict):
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="参数值超出有效范围",
+                error_code="INVALID_PARAMETERS"
+            ).to_dict()), 400
+
+        encoder_profile, output_format = _get_encoder_options(data)
+        if not validate_encoder_options(encoder_profile, output_format):
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message="不支持的编码配置或输出格式",
+                error_code="INVALID_ENCODER_OPTIONS"
+            ).to_dict()), 400
+
+        filter_params = FilterParameter.from_dict(parameters_dict)
+        upload_storage = get_storage('uploads')
+        output_storage = get_storage('outputs')
+
+        def generate_lines():
+            missing = []
+            images = []
+            for image_id in image_ids:
+                image_path = upload_storage.resolve(image_id)
+                if image_path is not None:
+                    upload_storage.touch(image_path)
+                    images.append((image_id, image_path))
+                else:
+                    missing.append(image_id)
+
+            failed_count = len(missing)
+            for image_id in missing:
+                yield json.dumps({
+                    'original_image_id': image_id,
+                    'status': 'error',
+                    'error': 'file_not_found'
+                }) + '\n'
+
+            successful_count = 0
+            batch = BatchFilterGenerator()
+            for result in batch.generate(images, filter_params, output_storage, encoder_profile, output_format):
+                if result['status'] == 'success':
+                    successful_count += 1
+                else:
+                    failed_count += 1
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+
+            yield json.dumps({
+                'summary': {
+                    'successful_count': successful_count,
+                    'failed_count': failed_count,
+                    'applied_parameters': parameters_dict
+                }
+            }) + '\n'
+
+        return Response(
+            stream_with_context(generate_lines()),
+            mimetype='application/x-ndjson'
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"批量生成请求处理异常: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message="服务器内部错误",
+            error_code="INTERNAL_ERROR"
+        ).to_dict()), 500
+
 @filter_bp.route('/download/<output_image_id>', methods=['GET'])
 def download_filter_image(output_image_id):
     """
@@ -129,22 +388,30 @@ def download_filter_image(output_image_id):
         图片文件流
     """
     try:
-        output_folder = current_app.config['OUTPUT_FOLDER']
-        output_path = os.path.join(output_folder, f"{output_image_id}.jpg")
+        output_storage = get_storage('outputs')
+
+        # 输出图片可能是任一支持的格式
+        output_path = None
+        for output_format, format_info in OUTPUT_FORMATS.items():
+            output_path = output_storage.resolve(output_image_id, format_info['extension'])
+            if output_path is not None:
+                break
 
-        if not os.path.exists(output_path):
+        if output_path is None:
             return jsonify(APIResponse(
                 status=ResponseStatus.ERROR,
                 message="输出图片不存在",
                 error_code="OUTPUT_IMAGE_NOT_FOUND"
             ).to_dict()), 404
 
+        output_storage.touch(output_path)
+
         # 返回文件
         return send_file(
             output_path,
-            mimetype='image/jpeg',
+            mimetype=get_output_mimetype(output_format),
             as_attachment=True,
-            download_name=f"filter_{output_image_id}.jpg"
+            download_name=f"filter_{os.path.basename(output_path)}"
         )
 
     except Exception as e:
@@ -191,39 +458,50 @@ def preview_filter():
             ).to_dict()), 400
 
         # 检查原始图片
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        original_image_path = os.path.join(upload_folder, f"{original_image_id}.jpg")
+        upload_storage = get_storage('uploads')
+        original_image_path = upload_storage.resolve(original_image_id)
 
-        if not os.path.exists(original_image_path):
+        if original_image_path is None:
             return jsonify(APIResponse(
                 status=ResponseStatus.ERROR,
                 message="原始图片不存在",
                 error_code="ORIGINAL_IMAGE_NOT_FOUND"
             ).to_dict()), 404
 
+        upload_storage.touch(original_image_path)
+
         try:
-            # 生成预览
+            # 生成预览 (同一图片内容与参数的并发请求共享一次生成与编码)
             filter_params = FilterParameter.from_dict(parameters_dict)
-            generator = FilterGenerator()
-
-            preview_image = generator.preview_filter_effect(
-                original_image_path,
-                filter_params,
-                max_size=(400, 400)
+            max_size = (400, 400)
+
+            def render_preview():
+                import io
+                import base64
+
+                generator = FilterGenerator()
+                preview_image = generator.preview_filter_effect(
+                    original_image_path,
+                    filter_params,
+                    max_size=max_size
+                )
+
+                # 转换为Base64
+                buffer = io.BytesIO()
+                preview_image.save(buffer, format='JPEG', quality=80)
+                return base64.b64encode(buffer.getvalue()).decode('utf-8'), preview_image.size
+
+            img_base64, preview_size = coalesce(
+                original_image_path, 'preview',
+                (tuple(sorted(filter_params.to_dict().items())), max_size),
+                render_preview,
+                codec=json_codec(from_data=tuple)
             )
 
-            # 转换为Base64
-            import io
-            import base64
-
-            buffer = io.BytesIO()
-            preview_image.save(buffer, format='JPEG', quality=80)
-            img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-
             preview_data = {
                 'preview_base64': f"data:image/jpeg;base64,{img_base64}",
                 'original_image_id': original_image_id,
-                'preview_size': preview_image.size
+                'preview_size': preview_size
             }
 
             return jsonify(APIResponse(
@@ -247,4 +525,10 @@ def preview_filter():
             status=ResponseStatus.ERROR,
             message="服务器内部错误",
             error_code="INTERNAL_ERROR"
-        ).to_dict()), 500
\ No newline at end of file
+        ).to_dict()), 500
+
+def _get_encoder_options(data):
+    """从请求数据中读取编码配置与输出格式，缺省时使用应用配置"""
+    encoder_profile = data.get('encoder_profile') or current_app.config.get('OUTPUT_ENCODER_PROFILE', 'balanced')
+    output_format = data.get('output_format') or current_app.config.get('OUTPUT_FORMAT', 'jpeg')
+    return encoder_profile, output_format
\ No newline at end of file
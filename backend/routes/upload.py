@@ -1,14 +1,24 @@
 """
 图片上传路由
 """
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from werkzeug.datastructures import FileStorage
 from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.wsgi import get_input_stream
+from datetime import datetime
 import os
+import json
 import traceback
 
 from ..models.response import APIResponse, ResponseStatus, UploadResponse
-from ..utils.validation import validate_image_file, ValidationError
+from ..utils.validation import validate_image_file, allowed_file, ValidationError
 from ..utils.file_manager import save_uploaded_image
+from ..utils.storage import get_storage
+from ..services.speculative import get_speculative_worker
+from ..services.bulk_uploader import BulkUploader
+from ..utils.bulk_reader import iter_upload_entries
+from ..utils.constants import BULK_UPLOAD, RESUMABLE_UPLOAD
+from ..utils.upload_sessions import UploadOffsetMismatch, get_upload_sessions
 from ..utils.constants import SUCCESS_MESSAGES, ERROR_MESSAGES
 
 upload_bp = Blueprint('upload', __name__)
@@ -46,10 +56,14 @@ def upload_image():
         try:
             image_id, saved_filename, dimensions, file_size = save_uploaded_image(
                 file,
-                current_app.config['UPLOAD_FOLDER'],
-                current_app.config['MAX_IMAGE_SIZE']
+                get_storage('uploads'),
+                current_app.config['MAX_IMAGE_SIZE'],
+                current_app.config.get('UPLOAD_ENCODER_PROFILE', 'balanced')
             )
 
+            # 推测性预处理: 响应返回、前台空闲后再在后台分析并准备预览
+            _submit_speculative(image_id)
+
             # 构造响应数据
             upload_data = UploadResponse(
                 image_id=image_id,
@@ -89,6 +103,341 @@ def upload_image():
             error_code="INTERNAL_ERROR"
         ).to_dict()), 500
 
+@upload_bp.route('/upload/bulk', methods=['POST'])
+def upload_bulk():
+    """
+    批量上传接口
+
+    请求体可以是:
+        - multipart/form-data: 任意数量的文件字段
+        - application/x-tar (可gzip压缩) 或 application/zip: 图片归档
+
+    请求体边读边拆分，文件在校验/规范化流水线中并行处理，
+    单个请求体的大小上限为 BULK_UPLOAD_MAX_BYTES (不受 MAX_CONTENT_LENGTH 限制)
+
+    Returns:
+        NDJSON流，每处理完一个文件输出一行结果，最后一行为汇总信息
+    """
+    try:
+        stream = get_input_stream(request.environ, max_content_length=current_app.config['BULK_UPLOAD_MAX_BYTES'])
+        try:
+            entries = iter_upload_entries(
+                stream,
+                request.headers.get('Content-Type', ''),
+                BULK_UPLOAD['max_file_bytes'],
+                BULK_UPLOAD['zip_spool_bytes'],
+                BULK_UPLOAD['read_chunk_bytes']
+            )
+        except ValidationError as e:
+            return jsonify(APIResponse(
+                status=ResponseStatus.ERROR,
+                message=str(e),
+                error_code="UNSUPPORTED_BULK_FORMAT"
+            ).to_dict()), 400
+
+        upload_storage = get_storage('uploads')
+        allowed_extensions = current_app.config['ALLOWED_EXTENSIONS']
+        max_size = current_app.config['MAX_IMAGE_SIZE']
+        encoder_profile = current_app.config.get('UPLOAD_ENCODER_PROFILE', 'balanced')
+
+        def generate_lines():
+            successful_count = 0
+            failed_count = 0
+            bulk = BulkUploader()
+            for result in bulk.upload(entries, upload_storage, allowed_extensions, max_size, encoder_profile):
+                if result['status'] == 'success':
+                    successful_count += 1
+                else:
+                    failed_count += 1
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+
+            yield json.dumps({
+                'summary': {
+                    'successful_count': successful_count,
+                    'failed_count': failed_count
+                }
+            }) + '\n'
+
+        return Response(
+            stream_with_context(generate_lines()),
+            mimetype='application/x-ndjson'
+        )
+
+    except RequestEntityTooLarge:
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message=ERROR_MESSAGES['file_too_large'],
+            error_code="FILE_TOO_LARGE"
+        ).to_dict()), 413
+
+    except Exception as e:
+        current_app.logger.error(f"批量上传请求处理异常: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message="服务器内部错误",
+            error_code="INTERNAL_ERROR"
+        ).to_dict()), 500
+
+@upload_bp.route('/upload/sessions', methods=['POST'])
+def create_upload_session():
+    """
+    创建可续传的上传会话
+
+    Request body:
+        {
+            "filename": "photo.jpg",
+            "total_size": 15728640,
+            "sha256": "..."  // 可选，完成时校验
+        }
+
+    Returns:
+        会话信息 (session_id、建议分块大小 chunk_size、已接收字节数 offset)
+    """
+    sessions = get_upload_sessions()
+    if sessions is None:
+        return _resumable_disabled_response()
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('filename') or 'total_size' not in data:
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message="缺少必需参数",
+            error_code="MISSING_REQUIRED_FIELDS"
+        ).to_dict()), 400
+
+    filename = str(data['filename'])
+    if not allowed_file(filename, current_app.config['ALLOWED_EXTENSIONS']):
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message=f"不支持的文件格式，仅支持: {', '.join(current_app.config['ALLOWED_EXTENSIONS'])}",
+            error_code="VALIDATION_ERROR"
+        ).to_dict()), 400
+
+    try:
+        total_size = int(data['total_size'])
+        session = sessions.create(filename, total_size, data.get('sha256'))
+    except (TypeError, ValueError, ValidationError) as e:
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message=str(e) if isinstance(e, ValidationError) else "total_size 应为整数",
+            error_code="INVALID_UPLOAD_SESSION"
+        ).to_dict()), 400
+
+    return jsonify(APIResponse(
+        status=ResponseStatus.SUCCESS,
+        message="上传会话已创建",
+        data=_session_data(session, sessions)
+    ).to_dict()), 201
+
+@upload_bp.route('/upload/sessions/<session_id>', methods=['GET'])
+def get_upload_session(session_id):
+    """查询上传进度，断线后客户端从返回的 offset 继续上传"""
+    sessions = get_upload_sessions()
+    if sessions is None:
+        return _resumable_disabled_response()
+
+    session = sessions.get(session_id)
+    if session is None:
+        return _session_not_found_response()
+
+    return jsonify(APIResponse(
+        status=ResponseStatus.SUCCESS,
+        message="查询成功",
+        data=_session_data(session, sessions)
+    ).to_dict()), 200
+
+@upload_bp.route('/upload/sessions/<session_id>', methods=['PUT'])
+def upload_session_chunk(session_id):
+    """
+    上传一个分块，请求体为原始字节
+
+    分块起始位置由查询参数 offset 或 Content-Range 头 (bytes start-end/total) 指定，
+    必须等于已接收的字节数；不一致时返回409及当前 offset
+    """
+    sessions = get_upload_sessions()
+    if sessions is None:
+        return _resumable_disabled_response()
+
+    session = sessions.get(session_id)
+    if session is None:
+        return _session_not_found_response()
+
+    offset = _chunk_offset()
+    if offset is None:
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message="缺少或无效的分块偏移 (offset 或 Content-Range)",
+            error_code="INVALID_CHUNK_OFFSET"
+        ).to_dict()), 400
+
+    try:
+        session.offset = sessions.append(session, offset, request.stream, request.content_length)
+    except UploadOffsetMismatch as e:
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message=str(e),
+            error_code="UPLOAD_OFFSET_MISMATCH",
+            data={'offset': e.offset}
+        ).to_dict()), 409
+    except ValidationError as e:
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message=str(e),
+            error_code="INVALID_CHUNK"
+        ).to_dict()), 400
+    except RequestEntityTooLarge:
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message=ERROR_MESSAGES['file_too_large'],
+            error_code="FILE_TOO_LARGE"
+        ).to_dict()), 413
+
+    return jsonify(APIResponse(
+        status=ResponseStatus.SUCCESS,
+        message="分块已接收",
+        data=_session_data(session, sessions)
+    ).to_dict()), 200
+
+@upload_bp.route('/upload/sessions/<session_id>/complete', methods=['POST'])
+def complete_upload_session(session_id):
+    """
+    完成上传: 校验摘要后把暂存文件交给与普通上传相同的校验和规范化流程
+
+    Returns:
+        与 /upload 相同的上传结果，另含内容摘要 sha256
+    """
+    sessions = get_upload_sessions()
+    if sessions is None:
+        return _resumable_disabled_response()
+
+    session = sessions.get(session_id)
+    if session is None:
+        return _session_not_found_response()
+
+    if not session.complete:
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message=f"上传未完成: 已接收 {session.offset}/{session.total_size} 字节",
+            error_code="UPLOAD_INCOMPLETE",
+            data={'offset': session.offset}
+        ).to_dict()), 409
+
+    digest = sessions.digest(session)
+    if session.expected_sha256 and digest != session.expected_sha256:
+        sessions.discard(session_id)
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message="文件摘要不一致，请重新上传",
+            error_code="CHECKSUM_MISMATCH"
+        ).to_dict()), 400
+
+    try:
+        with sessions.open_staged(session) as staged:
+            file = FileStorage(stream=staged, filename=session.filename)
+            try:
+                validate_image_file(file, current_app.config['ALLOWED_EXTENSIONS'])
+            except ValidationError as e:
+                sessions.discard(session_id)
+                return jsonify(APIResponse(
+                    status=ResponseStatus.ERROR,
+                    message=str(e),
+                    error_code="VALIDATION_ERROR"
+                ).to_dict()), 400
+
+            image_id, saved_filename, dimensions, file_size = save_uploaded_image(
+                file,
+                get_storage('uploads'),
+                current_app.config['MAX_IMAGE_SIZE'],
+                current_app.config.get('UPLOAD_ENCODER_PROFILE', 'balanced')
+            )
+    except Exception as e:
+        current_app.logger.error(f"文件保存失败: {str(e)}")
+        return jsonify(APIResponse(
+            status=ResponseStatus.ERROR,
+            message="文件保存失败",
+            error_code="SAVE_ERROR"
+        ).to_dict()), 500
+
+    sessions.discard(session_id)
+    _submit_speculative(image_id)
+
+    upload_data = UploadResponse(
+        image_id=image_id,
+        filename=saved_filename,
+        file_size=file_size,
+        dimensions=dimensions
+    )
+
+    return jsonify(APIResponse(
+        status=ResponseStatus.SUCCESS,
+        message=SUCCESS_MESSAGES['upload_success'],
+        data={**upload_data.__dict__, 'sha256': digest}
+    ).to_dict()), 200
+
+@upload_bp.route('/upload/sessions/<session_id>', methods=['DELETE'])
+def abort_upload_session(session_id):
+    """放弃上传，删除暂存数据"""
+    sessions = get_upload_sessions()
+    if sessions is None:
+        return _resumable_disabled_response()
+
+    if sessions.get(session_id) is None:
+        return _session_not_found_response()
+
+    sessions.discard(session_id)
+    return jsonify(APIResponse(
+        status=ResponseStatus.SUCCESS,
+        message="上传会话已取消"
+    ).to_dict()), 200
+
+def _submit_speculative(image_id):
+    """配置了推测性预处理时登记新上传的图片"""
+    speculative_worker = get_speculative_worker()
+    if speculative_worker is not None:
+        image_path = get_storage('uploads').resolve(image_id)
+        if image_path is not None:
+            speculative_worker.submit(image_id, image_path)
+
+def _chunk_offset():
+    """分块起始偏移: 查询参数 offset 优先，其次为 Content-Range 头"""
+    offset = request.args.get('offset')
+    if offset is None:
+        content_range = request.headers.get('Content-Range', '')
+        if content_range.startswith('bytes ') and '-' in content_range:
+            offset = content_range[len('bytes '):].split('-', 1)[0]
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        return None
+    return offset if offset >= 0 else None
+
+def _session_data(session, sessions):
+    return {
+        'session_id': session.session_id,
+        'filename': session.filename,
+        'total_size': session.total_size,
+        'offset': session.offset,
+        'complete': session.complete,
+        'chunk_size': min(RESUMABLE_UPLOAD['chunk_bytes'], current_app.config['MAX_CONTENT_LENGTH']),
+        'expires_at': datetime.fromtimestamp(session.created_at + sessions.ttl_seconds).isoformat()
+    }
+
+def _session_not_found_response():
+    return jsonify(APIResponse(
+        status=ResponseStatus.ERROR,
+        message="上传会话不存在或已过期",
+        error_code="UPLOAD_SESSION_NOT_FOUND"
+    ).to_dict()), 404
+
+def _resumable_disabled_response():
+    return jsonify(APIResponse(
+        status=ResponseStatus.ERROR,
+        message="未启用可续传上传",
+        error_code="RESUMABLE_UPLOAD_DISABLED"
+    ).to_dict()), 503
+
 @upload_bp.route('/upload/status/<image_id>', methods=['GET'])
 def get_upload_status(image_id):
     """
@@ -102,10 +451,9 @@ def get_upload_status(image_id):
     """
     try:
         # 检查文件是否存在
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = os.path.join(upload_folder, f"{image_id}.jpg")
+        file_path = get_storage('uploads').resolve(image_id)
 
-        if not os.path.exists(file_path):
+        if file_path is None:
             return jsonify(APIResponse(
                 status=ResponseStatus.ERROR,
                 message="文件不存在",
@@ -1,5 +1,18 @@
 # services/__init__.py
 from .image_analyzer import ImageAnalyzer
+from .sampled_analyzer import SampledImageAnalyzer
+from .advanced_analyzer import AdvancedImageAnalyzer
+from .analyzers import ANALYZER_ENGINES, create_analyzer
 from .filter_generator import FilterGenerator
+from .batch_generator import BatchFilterGenerator
+from .batch_analyzer import BatchImageAnalyzer
+from .bulk_uploader import BulkUploader
+from .compute_pool import ComputePool, configure_compute_pool, get_compute_pool
+from .analysis_cache import AnalysisCache, configure_analysis_cache, get_analysis_cache
+from .speculative import SpeculativeWorker, configure_speculative_worker, get_speculative_worker
 
-__all__ = ['ImageAnalyzer', 'FilterGenerator']
\ No newline at end of file
+__all__ = ['ImageAnalyzer', 'SampledImageAnalyzer', 'AdvancedImageAnalyzer', 'ANALYZER_ENGINES', 'create_analyzer', 'FilterGenerator', 'BatchFilterGenerator',
+           'BatchImageAnalyzer', 'BulkUploader',
+           'ComputePool', 'configure_compute_pool', 'get_compute_pool',
+           'AnalysisCache', 'configure_analysis_cache', 'get_analysis_cache',
+           'SpeculativeWorker', 'configure_speculative_worker', 'get_speculative_worker']
\ No newline at end of file
@@ -0,0 +1,427 @@
+"""
+增强分析引擎
+移植自 real_analysis_server 的多指标分析 (亮度/对比度/饱和度/锐度/色温/色调/阴影高光)，
+各指标共用同一个 AnalysisContext: 颜色空间只转换一次，均值/中位数/占比等统计量由直方图得到
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..engine.analysis import AnalysisContext, AnalysisPlan, estimate_high_freq_energy, histogram_mean_std, \
+    histogram_median, local_window_stats
+from ..models.parameter import ParameterValue, AnalysisResult
+from ..utils.constants import PARAMETER_NAMES, PARAMETER_UNITS, DIRECTION_MAPPING
+from .image_analyzer import ImageAnalyzer
+
+class AdvancedImageAnalyzer(ImageAnalyzer):
+    """多指标增强分析，结果额外包含各项原始指标与智能建议"""
+
+    engine = 'advanced'
+
+    # 指标组 -> 直接使用的中间结果，键的顺序即计算顺序
+    METRIC_INPUTS = {
+        'sharpness': ('laplacian', 'sobel_magnitude', 'gray'),
+        'saturation': ('saturation_hist', 'lab'),
+        'contrast': ('gray', 'gray_mean_std'),
+        'brightness': ('gray_hist', 'gray_mean_std', 'lab'),
+        'hue': ('hue_hist',),
+        'shadow_highlight': ('gray_hist', 'gray_mean_std'),
+        'temperature': ('channel_means',),
+    }
+    # 参数 -> 计算它的指标组 (阴影与高光来自同一组指标)
+    PARAMETER_GROUPS = {
+        **{name: name for name in PARAMETER_NAMES},
+        'shadow': 'shadow_highlight',
+        'highlight': 'shadow_highlight',
+    }
+
+    def _metric_functions(self) -> Dict[str, Callable[[AnalysisContext], Dict[str, Any]]]:
+        return {
+            'sharpness': self._sharpness_metrics,
+            'saturation': self._saturation_metrics,
+            'contrast': self._contrast_metrics,
+            'brightness': self._brightness_metrics,
+            'hue': self._hue_metrics,
+            'shadow_highlight': self._shadow_highlight_metrics,
+            'temperature': self._temperature_metrics,
+        }
+
+    def _build_result(self, plan: AnalysisPlan, values: Dict[str, Any], analysis_time: float) -> AnalysisResult:
+        """各组原始指标 -> 请求参数的调整量"""
+        metrics = {group: _to_builtin(values[group]) for group in plan.groups}
+
+        adjustments = {}
+        for group, group_metrics in metrics.items():
+            if group == 'shadow_highlight':
+                adjustments['shadow'], adjustments['highlight'] = self._shadow_highlight_adjustment(group_metrics)
+            else:
+                adjustments[group] = getattr(self, f'_{group}_adjustment')(group_metrics)
+
+        references = _references(metrics)
+        parameters = {
+            name: ParameterValue(
+                name=PARAMETER_NAMES[name],
+                direction=_direction(name, adjustments[name]),
+                value=abs(adjustments[name]),
+                unit=PARAMETER_UNITS[name],
+                reference=references[name]
+            ) for name in plan.parameters
+        }
+        return self.assemble_result(parameters, metrics, analysis_time)
+
+    def assemble_result(self, parameters: Dict[str, ParameterValue],
+                        metrics: Optional[Dict[str, Dict[str, Any]]] = None,
+                        analysis_time: float = 0.0) -> AnalysisResult:
+        """组装分析结果 (含 metrics 与 suggestions)，置信度为所含各项指标置信度的平均"""
+        metrics = metrics or {}
+        confidences = [values[key] for values in metrics.values()
+                       for key in values if key.endswith('confidence')]
+
+        from ..utils.file_manager import generate_image_id
+
+        return AnalysisResult(
+            image_id=generate_image_id(),
+            parameters=parameters,
+            analysis_time=analysis_time,
+            timestamp=datetime.now(),
+            confidence_score=round(float(np.mean(confidences)), 2) if confidences else 0.0,
+            metrics=metrics,
+            suggestions=self._suggestions(metrics),
+            engine=self.engine
+        )
+
+    # ========== 指标 ==========
+
+    def _brightness_metrics(self, context: AnalysisContext) -> Dict[str, float]:
+        """增强的亮度分析"""
+        mean_brightness, brightness_std = context.gray_mean_std
+        median_brightness = histogram_median(context.gray_hist)
+        # LAB颜色空间中的L通道更准确表示亮度
+        lab_brightness = cv2.mean(context.lab)[0]
+        hist_peak = int(np.argmax(context.gray_hist))
+
+        # 置信度计算：基于多指标的一致性
+        indicators = [mean_brightness, median_brightness, lab_brightness * 2.55, hist_peak]
+        confidence = 1.0 - (np.std(indicators) / np.mean(indicators))
+        confidence = max(0.5, min(1.0, confidence))
+
+        return {
+            'mean': mean_brightness,
+            'median': median_brightness,
+            'lab': lab_brightness,
+            'hist_peak': hist_peak,
+            'std': brightness_std,
+            'confidence': confidence
+        }
+
+    def _contrast_metrics(self, context: AnalysisContext) -> Dict[str, float]:
+        """增强的对比度分析"""
+        mean_value, global_contrast = context.gray_mean_std
+
+        # 局部对比度（像素与5x5邻域均值的平均绝对差）
+        local_mean, _ = local_window_stats(context.gray, 5)
+        local_contrast = cv2.mean(cv2.absdiff(context.gray.astype(np.float32), local_mean))[0]
+
+        # RMS对比度即相对全局均值的均方根，与总体标准差相同；直方图加权均值即灰度均值
+        rms_contrast = global_contrast
+        hist_spread = mean_value
+
+        contrasts = [global_contrast, local_contrast, rms_contrast]
+        confidence = 1.0 - (np.std(contrasts) / (np.mean(contrasts) + 1e-6))
+        confidence = max(0.6, min(1.0, confidence))
+
+        return {
+            'global': global_contrast,
+            'local': local_contrast,
+            'rms': rms_contrast,
+            'hist_spread': hist_spread,
+            'confidence': confidence
+        }
+
+    def _saturation_metrics(self, context: AnalysisContext) -> Dict[str, float]:
+        """增强的饱和度分析 (HSV饱和度 + LAB色度)"""
+        hsv_saturation, sat_std = histogram_mean_std(context.saturation_hist)
+
+        # LAB空间的色度（A和B通道）
+        lab = context.lab
+        a_channel = lab[:, :, 1].astype(np.float32) - 128
+        b_channel = lab[:, :, 2].astype(np.float32) - 128
+        lab_chroma = cv2.mean(cv2.magnitude(a_channel, b_channel))[0]
+
+        # 高饱和度像素比例
+        high_sat_ratio = context.saturation_hist[129:].sum() / context.pixel_count
+
+        confidence = min(1.0, (hsv_saturation / 255) * 2 + 0.3)
+
+        return {
+            'hsv': hsv_saturation,
+            'lab': lab_chroma,
+            'std': sat_std,
+            'high_sat_ratio': high_sat_ratio,
+            'confidence': confidence
+        }
+
+    def _sharpness_metrics(self, context: AnalysisContext) -> Dict[str, float]:
+        """增强的锐度分析 (拉普拉斯方差 + Sobel梯度 + 高频能量)"""
+        laplacian_var = cv2.meanStdDev(context.laplacian)[1][0, 0] ** 2
+        sobel_mean = cv2.mean(context.sobel_magnitude)[0]
+        high_freq_energy = estimate_high_freq_energy(context.gray)
+
+        sharpness_indicators = [laplacian_var / 1000, sobel_mean / 100]
+        confidence = min(1.0, np.mean(sharpness_indicators) / 50 + 0.4)
+
+        return {
+            'laplacian': laplacian_var,
+            'sobel': sobel_mean,
+            'high_freq': high_freq_energy,
+            'confidence': confidence
+        }
+
+    def _temperature_metrics(self, context: AnalysisContext) -> Dict[str, float]:
+        """增强的色温分析 (灰度世界白平衡)"""
+        r_avg, g_avg, b_avg = context.channel_means
+        total = r_avg + g_avg + b_avg
+
+        gray_world = [channel / total if total > 0 else 1 / 3 for channel in (r_avg, g_avg, b_avg)]
+
+        # 估计色温 (简化的算法)
+        if b_avg > 0:
+            color_temp_ratio = r_avg / b_avg
+            estimated_temp = 6500 / color_temp_ratio if color_temp_ratio > 0 else 6500
+        else:
+            estimated_temp = 6500
+
+        wb_deviation = sum(abs(ratio - 1 / 3) for ratio in gray_world)
+        confidence = max(0.5, 1.0 - wb_deviation * 3)
+
+        return {
+            'r_avg': r_avg,
+            'g_avg': g_avg,
+            'b_avg': b_avg,
+            'estimated_temp': estimated_temp,
+            'wb_deviation': wb_deviation,
+            'confidence': confidence
+        }
+
+    def _hue_metrics(self, context: AnalysisContext) -> Dict[str, float]:
+        """增强的色调分析 (主导色调与分布)"""
+        hue_hist = context.hue_hist
+        dominant_hue = int(np.argmax(hue_hist))
+
+        # 排除无色调(H=0)的像素
+        hue_mean, hue_std = histogram_mean_std(hue_hist, start=1)
+        if np.isnan(hue_mean):
+            hue_mean, hue_std = 0.0, 0.0
+
+        # 色调集中度
+        hue_concentration = np.sum(hue_hist > np.max(hue_hist) * 0.1) / 180
+        confidence = min(1.0, (1 - hue_concentration) + 0.3)
+
+        return {
+            'dominant_hue': dominant_hue * 2,  # 转换为360度制
+            'mean': hue_mean * 2,
+            'variance': hue_std,
+            'concentration': hue_concentration,
+            'confidence': confidence
+        }
+
+    def _shadow_highlight_metrics(self, context: AnalysisContext) -> Dict[str, float]:
+        """增强的阴影/高光分析 (动态阈值，各区域统计由灰度直方图得到)"""
+        hist = context.gray_hist
+        total = context.pixel_count
+        levels = np.arange(256)
+
+        mean_brightness = context.gray_mean_std[0]
+        shadow_threshold = max(mean_brightness * 0.3, 32)
+        highlight_threshold = min(mean_brightness * 1.8, 224)
+
+        shadow_bins = levels < shadow_threshold
+        highlight_bins = levels > highlight_threshold
+        shadow_count = hist[shadow_bins].sum()
+        highlight_count = hist[highlight_bins].sum()
+
+        shadow_ratio = shadow_count / total
+        shadow_mean = (hist[shadow_bins] * levels[shadow_bins]).sum() / shadow_count if shadow_count > 0 else 0
+        highlight_ratio = highlight_count / total
+        highlight_mean = (hist[highlight_bins] * levels[highlight_bins]).sum() / highlight_count \
+            if highlight_count > 0 else 255
+        midtone_ratio = hist[~shadow_bins & ~highlight_bins].sum() / total
+
+        return {
+            'shadow_ratio': shadow_ratio,
+            'shadow_mean': shadow_mean,
+            'highlight_ratio': highlight_ratio,
+            'highlight_mean': highlight_mean,
+            'midtone_ratio': midtone_ratio,
+            'shadow_confidence': min(1.0, shadow_ratio * 5 + 0.3),
+            'highlight_confidence': min(1.0, highlight_ratio * 5 + 0.3)
+        }
+
+    # ========== 调整量 ==========
+
+    def _brightness_adjustment(self, metrics: Dict[str, float]) -> float:
+        """加权亮度，理想范围 120-140"""
+        weighted_brightness = (metrics['mean'] * 0.3 +
+                               metrics['median'] * 0.2 +
+                               metrics['lab'] * 2.55 * 0.4 +
+                               metrics['hist_peak'] * 0.1)
+
+        if weighted_brightness < 80:
+            return round(30 + (80 - weighted_brightness) * 0.4, 1)
+        elif weighted_brightness < 120:
+            return round((120 - weighted_brightness) * 0.8, 1)
+        elif weighted_brightness > 180:
+            return round(-(weighted_brightness - 180) * 0.6, 1)
+        elif weighted_brightness > 140:
+            return round(-(weighted_brightness - 140) * 0.4, 1)
+        return 0.0
+
+    def _contrast_adjustment(self, metrics: Dict[str, float]) -> float:
+        weighted_contrast = (metrics['global'] * 0.4 +
+                             metrics['local'] * 0.3 +
+                             metrics['rms'] * 0.3)
+
+        if weighted_contrast < 25:
+            return round(35 + (25 - weighted_contrast) * 0.8, 1)
+        elif weighted_contrast < 40:
+            return round((40 - weighted_contrast) * 1.0, 1)
+        elif weighted_contrast > 90:
+            return round(-(weighted_contrast - 90) * 0.5, 1)
+        return 0.0
+
+    def _saturation_adjustment(self, metrics: Dict[str, float]) -> float:
+        normalized_lab = min(metrics['lab'] * 2, 255)  # 归一化LAB色度
+        weighted_saturation = metrics['hsv'] * 0.6 + normalized_lab * 0.4
+
+        if weighted_saturation < 60:
+            return round(20 + (60 - weighted_saturation) * 0.4, 1)
+        elif weighted_saturation < 90:
+            return round((90 - weighted_saturation) * 0.6, 1)
+        elif weighted_saturation > 180:
+            return round(-(weighted_saturation - 180) * 0.4, 1)
+        return 0.0
+
+    def _sharpness_adjustment(self, metrics: Dict[str, float]) -> float:
+        normalized_laplacian = min(metrics['laplacian'] / 100, 50)
+        normalized_sobel = min(metrics['sobel'] / 10, 50)
+        weighted_sharpness = normalized_laplacian * 0.6 + normalized_sobel * 0.4
+
+        if weighted_sharpness < 10:
+            return round(25 + (10 - weighted_sharpness) * 1.5, 1)
+        elif weighted_sharpness < 20:
+            return round((20 - weighted_sharpness) * 1.0, 1)
+        return 0.0
+
+    def _temperature_adjustment(self, metrics: Dict[str, float]) -> float:
+        """目标色温6500K"""
+        estimated_temp = metrics['estimated_temp']
+        if estimated_temp < 5000:
+            return round((5500 - estimated_temp) / 50, 0)  # 偏冷，需要加温
+        elif estimated_temp > 7500:
+            return round(-(estimated_temp - 7000) / 50, 0)  # 偏暖，需要降温
+        return 0.0
+
+    def _hue_adjustment(self, metrics: Dict[str, float]) -> float:
+        """根据主导色调进行细微调整"""
+        dominant_hue = metrics['dominant_hue']
+        if 15 <= dominant_hue <= 45:  # 橙色范围
+            return -3.0
+        elif 45 <= dominant_hue <= 75:  # 黄色范围
+            return 2.0
+        elif 75 <= dominant_hue <= 150:  # 绿色范围
+            return -1.0
+        elif 280 <= dominant_hue <= 320:  # 紫色范围
+            return 2.0
+        return 0.0
+
+    def _shadow_highlight_adjustment(self, metrics: Dict[str, float]) -> Tuple[float, float]:
+        shadow_adjust = 0.0
+        highlight_adjust = 0.0
+
+        if metrics['shadow_ratio'] > 0.4:  # 阴影过多
+            shadow_adjust = round(20 + (metrics['shadow_ratio'] - 0.4) * 40, 1)
+        elif metrics['shadow_ratio'] > 0.25:
+            shadow_adjust = round((metrics['shadow_ratio'] - 0.25) * 60, 1)
+
+        if metrics['highlight_ratio'] > 0.2:  # 高光过多
+            highlight_adjust = round(-15 - (metrics['highlight_ratio'] - 0.2) * 50, 1)
+        elif metrics['highlight_ratio'] > 0.1:
+            highlight_adjust = round(-(metrics['highlight_ratio'] - 0.1) * 80, 1)
+
+        return shadow_adjust, highlight_adjust
+
+    def _suggestions(self, metrics: Dict[str, Dict[str, float]]) -> List[str]:
+        """基于各项指标与置信度生成建议 (最多3条)，只分析了部分参数时只依据已有的指标"""
+        suggestions = []
+        high_confidence_threshold = 0.8
+
+        brightness = metrics.get('brightness')
+        if brightness and brightness['confidence'] > high_confidence_threshold:
+            if brightness['mean'] < 100:
+                suggestions.append(f"图片整体偏暗(置信度: {brightness['confidence']:.1%})，建议增加曝光和阴影提亮")
+            elif brightness['mean'] > 160:
+                suggestions.append(f"图片整体偏亮(置信度: {brightness['confidence']:.1%})，建议降低高光和整体曝光")
+
+        contrast = metrics.get('contrast')
+        if contrast and contrast['confidence'] > high_confidence_threshold and contrast['global'] < 35:
+            suggestions.append(f"图片对比度偏低(置信度: {contrast['confidence']:.1%})，建议增加对比度以提升层次感")
+
+        saturation = metrics.get('saturation')
+        if saturation and saturation['confidence'] > 0.7 and saturation['hsv'] < 80:  # 饱和度分析相对困难，阈值较低
+            suggestions.append(f"色彩饱和度偏低(置信度: {saturation['confidence']:.1%})，建议适当增加以提升色彩鲜明度")
+
+        sharpness = metrics.get('sharpness')
+        if sharpness and sharpness['confidence'] > 0.6 and sharpness['laplacian'] < 150:
+            suggestions.append(f"图片清晰度一般(置信度: {sharpness['confidence']:.1%})，建议适当增加锐化以提升细节")
+
+        temperature = metrics.get('temperature')
+        if temperature and temperature['confidence'] > 0.7:
+            if temperature['estimated_temp'] < 5000:
+                suggestions.append(f"图片色调偏冷(色温约{temperature['estimated_temp']:.0f}K)，可适当提高色温增加温暖感")
+            elif temperature['estimated_temp'] > 7500:
+                suggestions.append(f"图片色调偏暖(色温约{temperature['estimated_temp']:.0f}K)，如需自然效果可适当降低色温")
+
+        if not suggestions:
+            suggestions.append("图片整体曝光和色彩平衡良好，可根据个人偏好进行微调")
+
+        return suggestions[:3]
+
+def _direction(name: str, adjustment: float) -> str:
+    """调整量符号 -> 方向描述 (与 extract_filter_parameters 的方向判断一致)"""
+    if adjustment == 0:
+        return '适中'
+    return DIRECTION_MAPPING[name][1 if adjustment > 0 else -1]
+
+def _references(metrics: Dict[str, Dict[str, float]]) -> Dict[str, str]:
+    """各参数的参考说明，给出计算所依据的主要指标 (只包含已计算的指标组)"""
+    references = {}
+    if 'brightness' in metrics:
+        brightness = metrics['brightness']
+        references['brightness'] = f"平均亮度: {brightness['mean']:.1f}/255, 中位数: {brightness['median']:.1f}"
+    if 'contrast' in metrics:
+        contrast = metrics['contrast']
+        references['contrast'] = f"全局对比度: {contrast['global']:.1f}, 局部对比度: {contrast['local']:.1f}"
+    if 'saturation' in metrics:
+        saturation = metrics['saturation']
+        references['saturation'] = f"HSV饱和度: {saturation['hsv']:.1f}, LAB色度: {saturation['lab']:.1f}"
+    if 'sharpness' in metrics:
+        sharpness = metrics['sharpness']
+        references['sharpness'] = f"拉普拉斯: {sharpness['laplacian']:.1f}, Sobel: {sharpness['sobel']:.1f}"
+    if 'temperature' in metrics:
+        temperature = metrics['temperature']
+        references['temperature'] = \
+            f"估计色温: {temperature['estimated_temp']:.0f}K, 白平衡偏差: {temperature['wb_deviation']:.2f}"
+    if 'hue' in metrics:
+        hue = metrics['hue']
+        references['hue'] = f"主导色调: {hue['dominant_hue']:.1f}°, 分布方差: {hue['variance']:.1f}"
+    if 'shadow_highlight' in metrics:
+        shadow_highlight = metrics['shadow_highlight']
+        references['shadow'] = f"阴影区域占比: {shadow_highlight['shadow_ratio']:.1%}"
+        references['highlight'] = f"高光区域占比: {shadow_highlight['highlight_ratio']:.1%}"
+    return references
+
+def _to_builtin(values: Dict[str, Any]) -> Dict[str, Any]:
+    """NumPy标量转为Python数值，便于JSON序列化"""
+    return {key: value.item() if isinstance(value, np.generic) else value for key, value in values.items()}
@@ -0,0 +1,91 @@
+"""
+分析结果缓存
+按源文件(路径/大小/修改时间)与分析引擎保存已计算的参数；
+同一张图片之后请求更多参数时只需计算缓存中缺少的部分
+"""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Optional, Tuple
+
+from ..models.parameter import AnalysisResult
+from ..utils.constants import PARAMETER_NAMES
+from .analyzers import create_analyzer
+
+class AnalysisCache:
+    """进程内LRU缓存，条目为合并后的分析结果，其 parameters_present 标明已包含的参数"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple, AnalysisResult]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(image_path: str, engine: str) -> Optional[Tuple]:
+        """源文件被覆盖后大小或修改时间变化，旧条目自然失效"""
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        return os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns, engine
+
+    def get(self, image_path: str, engine: str) -> Optional[AnalysisResult]:
+        """已缓存的(可能只含部分参数的)分析结果"""
+        key = self._key(image_path, engine)
+        with self._lock:
+            result = self._entries.get(key) if key is not None else None
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def merge(self, image_path: str, engine: str, result: AnalysisResult) -> AnalysisResult:
+        """
+        把新计算的参数并入缓存条目，返回合并后的结果
+
+        置信度与建议由引擎按合并后的全部参数(及指标)重新计算，而不是沿用新结果中只针对部分参数的值
+        """
+        key = self._key(image_path, engine)
+        if key is None:
+            return result
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                parameters = {**cached.parameters, **result.parameters}
+                metrics = None
+                if cached.metrics is not None or result.metrics is not None:
+                    metrics = {**(cached.metrics or {}), **(result.metrics or {})}
+                merged = create_analyzer(engine).assemble_result(
+                    {name: parameters[name] for name in PARAMETER_NAMES if name in parameters},
+                    metrics,
+                    cached.analysis_time + result.analysis_time
+                )
+                result = replace(merged, image_id=cached.image_id, timestamp=result.timestamp)
+
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+# 进程内共享的缓存实例，由应用启动时配置
+_active_cache: Optional[AnalysisCache] = None
+
+def configure_analysis_cache(max_entries: int) -> Optional[AnalysisCache]:
+    """配置分析结果缓存，max_entries为0时关闭"""
+    global _active_cache
+    _active_cache = AnalysisCache(max_entries) if max_entries and max_entries > 0 else None
+    return _active_cache
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    return _active_cache
@@ -0,0 +1,21 @@
+"""
+分析引擎注册表
+分析接口、分析结果缓存与计算进程池按引擎名创建分析器
+"""
+from .image_analyzer import ImageAnalyzer
+from .advanced_analyzer import AdvancedImageAnalyzer
+from .sampled_analyzer import SampledImageAnalyzer
+
+# 可按请求选择的分析引擎
+ANALYZER_ENGINES = {
+    'basic': ImageAnalyzer,
+    'advanced': AdvancedImageAnalyzer,
+    'sampled': SampledImageAnalyzer,
+}
+
+def create_analyzer(engine: str = 'basic') -> ImageAnalyzer:
+    """按引擎名创建分析器"""
+    try:
+        return ANALYZER_ENGINES[engine]()
+    except KeyError:
+        raise ValueError(f"未知的分析引擎: {engine}") from None
@@ -0,0 +1,124 @@
+"""
+批量图片分析服务
+把多张图片缩放到统一的分析尺寸并堆叠为 (N, H, W, 3) 图像栈，整栈一次计算各项全局统计量，
+适合成千上万张小图的离线分析。统计量在分析尺寸上计算: 均值类参数与原图结果接近，
+锐化(梯度幅值)与尺度相关，数值与原图分析不可直接比较
+"""
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ..engine.analysis import stack_statistics
+from ..models.parameter import AnalysisResult
+from ..utils.constants import BATCH_ANALYSIS
+from .image_analyzer import ImageAnalyzer
+
+class BatchImageAnalyzer:
+    def __init__(self, analyzer: Optional[ImageAnalyzer] = None,
+                 analysis_size: Optional[Tuple[int, int]] = None,
+                 stack_size: Optional[int] = None,
+                 decode_workers: Optional[int] = None):
+        """
+        Args:
+            analyzer: 把统计量换算为参数的基础分析器
+            analysis_size: 统一的分析尺寸 (宽, 高)
+            stack_size: 每次堆叠计算的图片数
+            decode_workers: 解码线程数 (PIL解码时释放GIL)
+        """
+        self.analyzer = analyzer or ImageAnalyzer()
+        self.analysis_size = tuple(analysis_size or BATCH_ANALYSIS['analysis_size'])
+        self.stack_size = max(1, stack_size or BATCH_ANALYSIS['stack_size'])
+        self.decode_workers = max(1, decode_workers or BATCH_ANALYSIS['decode_workers'] or os.cpu_count() or 1)
+
+    def load_thumbnail(self, image_path: str) -> np.ndarray:
+        """解码并缩放到分析尺寸，返回BGR数组；JPEG直接按1/2~1/8比例缩小解码"""
+        width, height = self.analysis_size
+        with Image.open(image_path) as image:
+            image.draft('RGB', (width, height))
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            pixels = np.asarray(image)
+        thumbnail = cv2.resize(pixels, (width, height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(thumbnail, cv2.COLOR_RGB2BGR)
+
+    def analyze_stack(self, stack_bgr: np.ndarray) -> np.ndarray:
+        """
+        分析已堆叠的图像栈
+
+        Args:
+            stack_bgr: (N, H, W, 3) 的BGR图像栈
+
+        Returns:
+            长度为N的结构化数组，字段见 engine.analysis.STACK_STATISTICS_DTYPE
+        """
+        return stack_statistics(stack_bgr)
+
+    def to_results(self, statistics: np.ndarray) -> List[AnalysisResult]:
+        """结构化统计量 -> 每张图片的分析结果 (与基础引擎相同的参数与置信度)"""
+        return [self.analyzer.assemble_result(self.analyzer.parameters_from_statistics(row))
+                for row in statistics]
+
+    def analyze(self, images: Iterable[Tuple[Hashable, str]]) -> Iterator[Dict]:
+        """
+        批量分析图片
+
+        Args:
+            images: (image_id, image_path) 序列
+
+        Returns:
+            按输入顺序产出每张图片的结果字典；解码下一组图片与计算当前组重叠进行
+        """
+        with ThreadPoolExecutor(max_workers=self.decode_workers) as pool:
+            pending = None
+            for chunk in _chunks(images, self.stack_size):
+                futures = [pool.submit(self.load_thumbnail, path) for _, path in chunk]
+                if pending is not None:
+                    yield from self._finish(*pending)
+                pending = (chunk, futures)
+            if pending is not None:
+                yield from self._finish(*pending)
+
+    def _finish(self, chunk: List[Tuple[Hashable, str]], futures: List[Future]) -> Iterator[Dict]:
+        thumbnails, errors = {}, {}
+        for index, future in enumerate(futures):
+            try:
+                thumbnails[index] = future.result()
+            except Exception as e:
+                errors[index] = e
+
+        results = {}
+        if thumbnails:
+            statistics = self.analyze_stack(np.stack(list(thumbnails.values())))
+            results = dict(zip(thumbnails, self.to_results(statistics)))
+
+        for index, (image_id, _) in enumerate(chunk):
+            if index in errors:
+                yield {
+                    'image_id': image_id,
+                    'status': 'error',
+                    'stage': 'decode',
+                    'error': str(errors[index])
+                }
+                continue
+
+            result = results[index]
+            yield {
+                'image_id': image_id,
+                'status': 'success',
+                'parameters': {name: param.to_dict() for name, param in result.parameters.items()},
+                'confidence_score': result.confidence_score
+            }
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
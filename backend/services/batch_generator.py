@@ -0,0 +1,74 @@
+"""
+批量滤镜生成服务
+把同一组滤镜参数应用到多张图片，解码/处理/编码三阶段流水线并行
+"""
+import os
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from ..models.parameter import FilterParameter
+from ..utils.constants import BATCH_PROCESSING
+from ..utils.pipeline import PipelineStage, run_staged_pipeline
+from ..utils.image_encoder import DEFAULT_ENCODER_PROFILE, DEFAULT_OUTPUT_FORMAT
+from ..utils.storage import ImageStorage
+from .filter_generator import FilterGenerator
+
+class BatchFilterGenerator:
+    def __init__(self, generator: Optional[FilterGenerator] = None,
+                 decode_workers: Optional[int] = None,
+                 process_workers: Optional[int] = None,
+                 encode_workers: Optional[int] = None,
+                 queue_size: Optional[int] = None):
+        cpu_count = os.cpu_count() or 1
+
+        self.generator = generator or FilterGenerator()
+
+        # 滤镜处理最耗CPU，默认占满所有核；解码/编码在PIL中释放GIL，分配较少线程即可
+        self.decode_workers = max(1, decode_workers or BATCH_PROCESSING['decode_workers'] or cpu_count // 4)
+        self.process_workers = max(1, process_workers or BATCH_PROCESSING['process_workers'] or cpu_count)
+        self.encode_workers = max(1, encode_workers or BATCH_PROCESSING['encode_workers'] or cpu_count // 2)
+        self.queue_size = queue_size or BATCH_PROCESSING['queue_size']
+
+    def generate(self, images: Iterable[Tuple[str, str]], parameters: FilterParameter,
+                 output_folder: Union[str, ImageStorage], encoder_profile: str = DEFAULT_ENCODER_PROFILE,
+                 output_format: str = DEFAULT_OUTPUT_FORMAT) -> Iterator[Dict]:
+        """
+        批量生成滤镜图片
+
+        Args:
+            images: (original_image_id, image_path) 序列
+            parameters: 滤镜参数
+            output_folder: 输出文件夹或输出存储
+            encoder_profile: 编码配置 (fast/balanced/smallest)
+            output_format: 输出格式 (jpeg/webp)
+
+        Returns:
+            按完成顺序产出每张图片的结果字典
+        """
+        stages = [
+            PipelineStage('decode', lambda _, path: self.generator.load_image(path), self.decode_workers),
+            PipelineStage('process', lambda _, image: self.generator.apply_filters(image, parameters),
+                          self.process_workers),
+            PipelineStage('encode',
+                          lambda _, image: self.generator.save_image(
+                              image, output_folder, encoder_profile, output_format),
+                          self.encode_workers),
+        ]
+
+        for result in run_staged_pipeline(images, stages, self.queue_size):
+            if result.error is not None:
+                yield {
+                    'original_image_id': result.key,
+                    'status': 'error',
+                    'stage': result.failed_stage,
+                    'error': str(result.error)
+                }
+                continue
+
+            output_image_id, output_filename = result.value
+            yield {
+                'original_image_id': result.key,
+                'status': 'success',
+                'output_image_id': output_image_id,
+                'output_filename': output_filename,
+                'processing_time': round(result.elapsed, 2)
+            }
@@ -0,0 +1,101 @@
+"""
+批量上传服务
+请求体中的文件逐个拆出后进入 校验 -> 规范化(解码/缩放/编码保存) 两阶段流水线，
+每个阶段有独立的线程池；阶段间队列有界，读取请求体的速度受处理速度约束，
+同时在内存中的文件数与请求体大小无关
+"""
+import io
+import os
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple, Union
+
+from werkzeug.datastructures import FileStorage
+
+from ..utils.bulk_reader import UploadEntry, entry_basename
+from ..utils.constants import BULK_UPLOAD
+from ..utils.file_manager import save_uploaded_image
+from ..utils.image_encoder import DEFAULT_ENCODER_PROFILE
+from ..utils.pipeline import PipelineStage, run_staged_pipeline
+from ..utils.storage import ImageStorage
+from ..utils.validation import ValidationError, allowed_file, validate_image_file
+
+class BulkUploader:
+    def __init__(self, validate_workers: Optional[int] = None,
+                 normalize_workers: Optional[int] = None,
+                 queue_size: Optional[int] = None,
+                 max_files: Optional[int] = None):
+        cpu_count = os.cpu_count() or 1
+
+        # 校验只解析文件头，线程较少即可；规范化(解码/缩放/编码)最耗CPU，默认占满所有核
+        self.validate_workers = max(1, validate_workers or BULK_UPLOAD['validate_workers'] or cpu_count // 4)
+        self.normalize_workers = max(1, normalize_workers or BULK_UPLOAD['normalize_workers'] or cpu_count)
+        self.queue_size = queue_size or BULK_UPLOAD['queue_size']
+        self.max_files = max_files or BULK_UPLOAD['max_files']
+
+    def upload(self, entries: Iterable[UploadEntry], upload_folder: Union[str, ImageStorage],
+               allowed_extensions: Set[str], max_size: Tuple[int, int] = (2048, 2048),
+               encoder_profile: str = DEFAULT_ENCODER_PROFILE) -> Iterator[Dict]:
+        """
+        批量保存上传的图片
+
+        Args:
+            entries: (文件名, 内容或错误) 序列，惰性读取
+            upload_folder: 上传目录或上传存储
+            allowed_extensions: 允许的扩展名
+            max_size: 超出该尺寸的图片等比缩小
+            encoder_profile: 保存时的编码配置
+
+        Returns:
+            按完成顺序产出每个文件的结果字典
+        """
+        def validate(filename: str, payload: Union[bytes, Exception]) -> bytes:
+            if isinstance(payload, Exception):
+                raise payload
+            validate_image_file(_as_file(filename, payload), allowed_extensions)
+            return payload
+
+        def normalize(filename: str, data: bytes) -> tuple:
+            return save_uploaded_image(_as_file(filename, data), upload_folder, max_size, encoder_profile)
+
+        stages = [
+            PipelineStage('validate', validate, self.validate_workers),
+            PipelineStage('normalize', normalize, self.normalize_workers),
+        ]
+
+        for result in run_staged_pipeline(self._limited(entries, allowed_extensions), stages, self.queue_size):
+            if result.error is not None:
+                yield {
+                    'source_filename': result.key or None,
+                    'status': 'error',
+                    'stage': result.failed_stage,
+                    'error': str(result.error)
+                }
+                continue
+
+            image_id, saved_filename, dimensions, file_size = result.value
+            yield {
+                'source_filename': result.key,
+                'status': 'success',
+                'image_id': image_id,
+                'filename': saved_filename,
+                'file_size': file_size,
+                'dimensions': dimensions,
+                'processing_time': round(result.elapsed, 2)
+            }
+
+    def _limited(self, entries: Iterable[UploadEntry], allowed_extensions: Set[str]) -> Iterator[UploadEntry]:
+        """跳过归档中的隐藏文件，扩展名不支持的文件直接记为错误，超出文件数上限时停止读取"""
+        count = 0
+        for name, payload in entries:
+            basename = entry_basename(name)
+            if basename.startswith('.') or name.startswith('__MACOSX/'):
+                continue
+            if not isinstance(payload, Exception) and not allowed_file(basename, allowed_extensions):
+                payload = ValidationError(f"不支持的文件格式，仅支持: {', '.join(sorted(allowed_extensions))}")
+
+            count += 1
+            if count > self.max_files:
+                raise ValidationError(f"批量上传最多支持{self.max_files}个文件")
+            yield name, payload
+
+def _as_file(filename: str, data: bytes) -> FileStorage:
+    return FileStorage(stream=io.BytesIO(data), filename=entry_basename(filename))
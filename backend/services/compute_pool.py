@@ -0,0 +1,212 @@
+"""
+计算进程池
+把图像分析与滤镜处理放到独立进程中执行，绕开GIL；
+像素通过共享内存传递，进程间只传递描述符和少量结果数据
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ..models.parameter import AnalysisResult, FilterParameter
+from ..utils.pixel_cache import load_rgb_image
+from ..utils.shared_frames import SharedFrame, SharedFrameArena, attach_frame
+from ..utils.single_flight import IMAGE_CODEC, coalesce, json_codec
+from ..utils.validation import normalize_analysis_parameters
+from .analysis_cache import get_analysis_cache
+from .analyzers import ANALYZER_ENGINES, create_analyzer
+from .filter_generator import FilterGenerator
+from .image_analyzer import ImageAnalyzer
+
+# 跨进程合并时分析结果以JSON共享
+ANALYSIS_RESULT_CODEC = json_codec(AnalysisResult.to_dict, AnalysisResult.from_dict)
+
+# 计算进程内复用的分析器(按引擎)/生成器实例
+_worker_analyzers: Dict[str, ImageAnalyzer] = {}
+_worker_generator: Optional[FilterGenerator] = None
+
+def _init_worker() -> None:
+    global _worker_analyzers, _worker_generator
+    # 每个进程单线程运行OpenCV，并行度由进程数决定
+    cv2.setNumThreads(1)
+    _worker_analyzers = {engine: create_analyzer(engine) for engine in ANALYZER_ENGINES}
+    _worker_generator = FilterGenerator()
+
+def _analyze_worker(source: SharedFrame, engine: str, parameters: Optional[Tuple[str, ...]]) -> AnalysisResult:
+    """在计算进程中分析共享内存中的RGB像素"""
+    with attach_frame(source) as pixels:
+        image_cv = cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+    return _worker_analyzers[engine].analyze_pixels(image_cv, parameters)
+
+def _filter_worker(source: SharedFrame, target: SharedFrame, parameters: FilterParameter) -> None:
+    """在计算进程中对共享内存中的像素应用滤镜，结果写入目标段"""
+    with attach_frame(source) as pixels:
+        image = Image.fromarray(pixels.copy())
+    processed = np.asarray(_worker_generator.apply_filters(image, parameters).convert('RGB'))
+
+    if processed.shape != target.shape:
+        raise ValueError(f"滤镜输出尺寸 {processed.shape} 与预期 {target.shape} 不一致")
+    with attach_frame(target) as output:
+        np.copyto(output, processed)
+
+class ComputePool:
+    """分析与滤镜处理的进程池，计算进程崩溃后自动重建"""
+
+    def __init__(self, max_workers: Optional[int] = None, start_method: str = 'spawn'):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, func, *args):
+        executor = self._get_executor()
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            # 有计算进程异常退出: 丢弃整个池，下次调用时重建
+            self._reset_executor(executor)
+            raise
+
+    def analyze(self, image_path: str, engine: str = 'basic',
+                parameters: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """分析图片，解码在当前进程完成(可命中像素缓存)，计算在进程池中完成"""
+        if engine not in ANALYZER_ENGINES:
+            raise ValueError(f"未知的分析引擎: {engine}")
+        return self.analyze_pixels(load_rgb_image(image_path), engine, parameters)
+
+    def analyze_pixels(self, pixels: np.ndarray, engine: str = 'basic',
+                       parameters: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """分析已解码的RGB像素 (如请求体中直接解码的图片)"""
+        if engine not in ANALYZER_ENGINES:
+            raise ValueError(f"未知的分析引擎: {engine}")
+        parameters = normalize_analysis_parameters(parameters)
+        with SharedFrameArena() as arena:
+            source = arena.put(pixels)
+            return self._run(_analyze_worker, source, engine, parameters)
+
+    def apply_filters(self, image_path: str, parameters: FilterParameter) -> Image.Image:
+        """对图片应用滤镜，返回处理后的图片"""
+        pixels = load_rgb_image(image_path)
+        with SharedFrameArena() as arena:
+            source = arena.put(pixels)
+            target = arena.allocate(pixels.shape, pixels.dtype)
+            self._run(_filter_worker, source, target, parameters)
+            return Image.fromarray(arena.view(target).copy())
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+# 进程内共享的计算池，由应用启动时配置；未配置时在请求线程内计算
+_active_pool: Optional[ComputePool] = None
+
+def configure_compute_pool(max_workers: int) -> Optional[ComputePool]:
+    """配置计算进程池，max_workers为0时关闭"""
+    global _active_pool
+    if _active_pool is not None:
+        _active_pool.shutdown()
+    _active_pool = ComputePool(max_workers) if max_workers and max_workers > 0 else None
+    return _active_pool
+
+def get_compute_pool() -> Optional[ComputePool]:
+    return _active_pool
+
+def _compute_analysis(image_path: str, engine: str, parameters: Tuple[str, ...],
+                      in_process: bool = False) -> AnalysisResult:
+    pool = _active_pool
+    if pool is None or in_process:
+        return create_analyzer(engine).analyze_image(image_path, parameters)
+    return pool.analyze(image_path, engine, parameters)
+
+def analyze_image(image_path: str, engine: str = 'basic',
+                  parameters: Optional[Iterable[str]] = None, in_process: bool = False) -> AnalysisResult:
+    """
+    分析图片: 配置了计算池时在计算进程中执行；
+    配置了分析结果缓存时，只计算缓存中还没有的参数，再与已有结果合并；
+    配置了请求合并时，同一图片内容/引擎/参数的并发请求共享一次计算
+
+    Args:
+        image_path: 图片路径
+        engine: 分析引擎 (basic/advanced/sampled)
+        parameters: 只分析这些参数，缺省为全部8类
+        in_process: 即使配置了计算池也在调用线程内计算 (后台低优先级任务不占用计算进程)
+
+    Returns:
+        AnalysisResult: 只包含请求的参数 (见 parameters_present)
+    """
+    requested = normalize_analysis_parameters(parameters)
+    return coalesce(image_path, 'analyze', (engine, requested),
+                    lambda: _analyze_cached(image_path, engine, requested, in_process),
+                    codec=ANALYSIS_RESULT_CODEC)
+
+def _analyze_cached(image_path: str, engine: str, requested: Tuple[str, ...],
+                    in_process: bool = False) -> AnalysisResult:
+    cache = get_analysis_cache()
+    if cache is None:
+        return _compute_analysis(image_path, engine, requested, in_process)
+
+    analyzer = create_analyzer(engine)
+    start_time = time.time()
+    cached = cache.get(image_path, engine)
+    missing = tuple(name for name in requested if cached is None or name not in cached.parameters)
+    if missing:
+        cached = cache.merge(image_path, engine, _compute_analysis(image_path, engine, missing, in_process))
+    return analyzer.select(cached, requested, time.time() - start_time)
+
+def analyze_pixels(pixels: np.ndarray, engine: str = 'basic',
+                   parameters: Optional[Iterable[str]] = None) -> AnalysisResult:
+    """
+    分析内存中已解码的RGB像素 (不经过磁盘与像素缓存): 配置了计算池时在计算进程中执行
+
+    Args:
+        pixels: RGB数组 (uint8, H x W x 3)
+        engine: 分析引擎 (basic/advanced/sampled)
+        parameters: 只分析这些参数，缺省为全部8类
+    """
+    requested = normalize_analysis_parameters(parameters)
+    pool = _active_pool
+    if pool is not None:
+        return pool.analyze_pixels(pixels, engine, requested)
+    analyzer = create_analyzer(engine)
+    return analyzer.analyze_pixels(cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR), requested)
+
+def apply_filters(image_path: str, parameters: FilterParameter,
+                  generator: Optional[FilterGenerator] = None) -> Image.Image:
+    """
+    加载图片并应用滤镜: 配置了计算池时在计算进程中执行；
+    配置了请求合并时，同一图片内容/滤镜参数的并发请求共享一次计算 (各自得到图片副本)
+    """
+    def compute() -> Image.Image:
+        pool = _active_pool
+        if pool is None:
+            local_generator = generator or FilterGenerator()
+            return local_generator.apply_filters(local_generator.load_image(image_path), parameters)
+        return pool.apply_filters(image_path, parameters)
+
+    key = tuple(sorted(parameters.to_dict().items()))
+    return coalesce(image_path, 'filter', key, compute, detach=Image.Image.copy, codec=IMAGE_CODEC)
@@ -2,19 +2,36 @@
 滤镜生成服务
 基于分析参数对新图片应用滤镜效果
 """
-import cv2
 import numpy as np
-from PIL import Image, ImageEnhance, ImageFilter
-from typing import Tuple
+from PIL import Image
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+import threading
 import time
 import os
 
 from ..models.parameter import FilterParameter
-from ..utils.file_manager import generate_image_id, get_file_path
-from ..utils.constants import IMAGE_PROCESSING
+from ..utils.file_manager import downscale_to_fit, generate_image_id
+from ..utils.storage import ImageStorage, as_storage
+from ..utils.pixel_cache import load_rgb_image
+from ..utils.strips import StripExecutor, get_strip_executor
+from ..utils.image_encoder import (
+    DEFAULT_ENCODER_PROFILE, DEFAULT_OUTPUT_FORMAT, encode_image, get_output_extension
+)
+from ..engine import filters as engine
+
+# 预览底图缓存: (源文件路径, 大小, 修改时间, 预览尺寸) -> 缩小后的RGB图片
+_PREVIEW_SOURCE_ENTRIES = 32
+_preview_sources: 'OrderedDict[Tuple, Image.Image]' = OrderedDict()
+_preview_sources_lock = threading.Lock()
 
 class FilterGenerator:
-    def __init__(self):
+    def __init__(self, strip_executor: Optional[StripExecutor] = None):
+        """
+        Args:
+            strip_executor: 条带并行执行器，缺省时使用进程内配置的执行器 (未配置则逐图单线程处理)
+        """
+        self.strip_executor = strip_executor
         self.processing_methods = {
             'brightness': self._adjust_brightness,
             'contrast': self._adjust_contrast,
@@ -27,14 +44,17 @@ class FilterGenerator:
         }
 
     def generate_filter_image(self, original_image_path: str, parameters: FilterParameter,
-                            output_folder: str) -> Tuple[str, str, float]:
+                            output_folder: Union[str, ImageStorage], encoder_profile: str = DEFAULT_ENCODER_PROFILE,
+                            output_format: str = DEFAULT_OUTPUT_FORMAT) -> Tuple[str, str, float]:
         """
         基于参数生成滤镜图片
 
         Args:
             original_image_path: 原始图片路径
             parameters: 滤镜参数
-            output_folder: 输出文件夹
+            output_folder: 输出文件夹或输出存储
+            encoder_profile: 编码配置 (fast/balanced/smallest)
+            output_format: 输出格式 (jpeg/webp)
 
         Returns:
             (output_image_id, output_filename, processing_time)
@@ -42,164 +62,97 @@ class FilterGenerator:
         start_time = time.time()
 
         # 加载原始图片
-        image = Image.open(original_image_path)
-
-        # 确保图片为RGB模式
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        image = self.load_image(original_image_path)
 
         # 按顺序应用各种滤镜效果
-        processed_image = self._apply_all_filters(image, parameters)
-
-        # 生成输出文件信息
-        output_image_id = generate_image_id()
-        output_filename = f"{output_image_id}.jpg"
-        output_path = get_file_path(output_folder, output_image_id, 'jpg')
+        processed_image = self.apply_filters(image, parameters)
 
         # 保存处理后的图片
-        processed_image.save(
-            output_path,
-            'JPEG',
-            quality=IMAGE_PROCESSING['default_quality'],
-            optimize=True
+        output_image_id, output_filename = self.save_image(
+            processed_image, output_folder, encoder_profile, output_format
         )
 
         processing_time = time.time() - start_time
 
         return output_image_id, output_filename, processing_time
 
-    def _apply_all_filters(self, image: Image.Image, parameters: FilterParameter) -> Image.Image:
-        """应用所有滤镜效果"""
-        result_image = image.copy()
+    def load_image(self, image_path: str) -> Image.Image:
+        """加载图片并完成解码 (RGB模式)"""
+        # 经由像素缓存读取，命中时跳过JPEG解码；返回的图片已完成解码，
+        # 便于批处理流水线把解码与处理分到不同阶段
+        return Image.fromarray(load_rgb_image(image_path))
 
-        # 1. 亮度调整
-        if abs(parameters.brightness) > 1:
-            result_image = self._adjust_brightness(result_image, parameters.brightness)
+    def apply_filters(self, image: Image.Image, parameters: FilterParameter) -> Image.Image:
+        """对已解码的图片应用滤镜参数"""
+        return self._apply_all_filters(image, parameters)
 
-        # 2. 对比度调整
-        if abs(parameters.contrast) > 1:
-            result_image = self._adjust_contrast(result_image, parameters.contrast)
+    def save_image(self, image: Image.Image, output_folder: Union[str, ImageStorage],
+                   encoder_profile: str = DEFAULT_ENCODER_PROFILE,
+                   output_format: str = DEFAULT_OUTPUT_FORMAT) -> Tuple[str, str]:
+        """
+        编码并保存处理后的图片
 
-        # 3. 饱和度调整
-        if abs(parameters.saturation) > 1:
-            result_image = self._adjust_saturation(result_image, parameters.saturation)
+        Returns:
+            (output_image_id, output_filename)
+        """
+        extension = get_output_extension(output_format)
+        output_image_id = generate_image_id()
+        storage = as_storage(output_folder, 'outputs')
+        output_path = storage.new_path(output_image_id, extension)
+        output_filename = os.path.basename(output_path)
 
-        # 4. 色温调整
-        if abs(parameters.temperature) > 10:
-            result_image = self._adjust_temperature(result_image, parameters.temperature)
+        encode_image(image, output_path, encoder_profile, output_format)
+        storage.register(output_path)
 
-        # 5. 色调调整
-        if abs(parameters.hue) > 5:
-            result_image = self._adjust_hue(result_image, parameters.hue)
+        return output_image_id, output_filename
 
-        # 6. 阴影/高光调整
-        if abs(parameters.shadow) > 1 or abs(parameters.highlight) > 1:
-            result_image = self._adjust_shadow_highlight(result_image, parameters.shadow, parameters.highlight)
+    def _apply_all_filters(self, image: Image.Image, parameters: FilterParameter) -> Image.Image:
+        """应用所有滤镜效果 (滤镜引擎的pillow语义)"""
+        stages = engine.build_filter_stages(parameters.to_dict(), 'pillow')
 
-        # 7. 锐化调整 (最后应用)
-        if abs(parameters.sharpness) > 1:
-            result_image = self._adjust_sharpness(result_image, parameters.sharpness)
+        # 配置了条带并行时，大图的多个条带在线程池中同时处理
+        executor = self.strip_executor or get_strip_executor()
+        pixels = np.asarray(image if image.mode == 'RGB' else image.convert('RGB'))
+        return Image.fromarray(engine.apply_filter_stages(pixels, stages, executor))
 
-        return result_image
+    def _apply_stage(self, image: Image.Image, stage: engine.FilterStage) -> Image.Image:
+        return Image.fromarray(stage(np.asarray(image)))
 
     def _adjust_brightness(self, image: Image.Image, value: float) -> Image.Image:
         """调整亮度 (-100 to +100)"""
-        # 转换为增强因子 (0.5 to 1.5)
-        factor = 1.0 + (value / 100.0)
-        factor = max(0.1, min(2.0, factor))  # 限制范围
-
-        enhancer = ImageEnhance.Brightness(image)
-        return enhancer.enhance(factor)
+        return self._apply_stage(image, engine.pillow_brightness_stage(value))
 
     def _adjust_contrast(self, image: Image.Image, value: float) -> Image.Image:
         """调整对比度 (-100 to +100)"""
-        factor = 1.0 + (value / 100.0)
-        factor = max(0.1, min(2.0, factor))
-
-        enhancer = ImageEnhance.Contrast(image)
-        return enhancer.enhance(factor)
+        return self._apply_stage(image, engine.pillow_contrast_stage(value))
 
     def _adjust_saturation(self, image: Image.Image, value: float) -> Image.Image:
         """调整饱和度 (-100 to +100)"""
-        factor = 1.0 + (value / 100.0)
-        factor = max(0.0, min(2.0, factor))
-
-        enhancer = ImageEnhance.Color(image)
-        return enhancer.enhance(factor)
+        return self._apply_stage(image, engine.pillow_saturation_stage(value))
 
     def _adjust_sharpness(self, image: Image.Image, value: float) -> Image.Image:
-        """调整锐化 (-100 to +100)"""
-        if value > 0:
-            # 增强锐化
-            factor = 1.0 + (value / 100.0)
-            enhancer = ImageEnhance.Sharpness(image)
-            return enhancer.enhance(factor)
-        else:
-            # 模糊处理
-            blur_radius = abs(value) / 50.0  # 0-2的模糊半径
-            return image.filter(ImageFilter.GaussianBlur(radius=blur_radius))
+        """调整锐化 (-100 to +100)，负值为高斯模糊"""
+        return self._apply_stage(image, engine.pillow_sharpness_stage(value))
 
     def _adjust_temperature(self, image: Image.Image, value: float) -> Image.Image:
         """调整色温 (-500K to +500K)"""
-        # 转换PIL图像为numpy数组
-        img_array = np.array(image, dtype=np.float32)
-
-        # 色温调整系数
-        temp_factor = value / 500.0  # -1 to +1
-
-        if temp_factor > 0:
-            # 偏暖：增加红色，减少蓝色
-            img_array[:, :, 0] *= (1.0 + temp_factor * 0.3)  # R
-            img_array[:, :, 2] *= (1.0 - temp_factor * 0.3)  # B
-        else:
-            # 偏冷：减少红色，增加蓝色
-            img_array[:, :, 0] *= (1.0 + temp_factor * 0.3)  # R
-            img_array[:, :, 2] *= (1.0 - temp_factor * 0.3)  # B
-
-        # 限制像素值范围
-        img_array = np.clip(img_array, 0, 255)
-
-        return Image.fromarray(img_array.astype(np.uint8))
+        return self._apply_stage(image, engine.temperature_stage(value))
 
     def _adjust_hue(self, image: Image.Image, value: float) -> Image.Image:
         """调整色调 (-180° to +180°)"""
-        # 转换为HSV
-        img_array = np.array(image)
-        hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV).astype(np.float32)
+        return self._apply_stage(image, engine.pillow_hue_stage(value))
 
-        # 调整色调 (H通道)
-        hue_shift = (value / 180.0) * 90  # 转换为OpenCV范围
-        hsv[:, :, 0] = (hsv[:, :, 0] + hue_shift) % 180
+    def _adjust_shadow(self, image: Image.Image, value: float) -> Image.Image:
+        """调整阴影 (-100 to +100)"""
+        return self._adjust_shadow_highlight(image, value, 0)
 
-        # 转换回RGB
-        rgb = cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2RGB)
-        return Image.fromarray(rgb)
+    def _adjust_highlight(self, image: Image.Image, value: float) -> Image.Image:
+        """调整高光 (-100 to +100)"""
+        return self._adjust_shadow_highlight(image, 0, value)
 
     def _adjust_shadow_highlight(self, image: Image.Image, shadow: float, highlight: float) -> Image.Image:
-        """调整阴影和高光"""
-        img_array = np.array(image, dtype=np.float32) / 255.0
-
-        # 计算亮度
-        luminance = 0.299 * img_array[:, :, 0] + 0.587 * img_array[:, :, 1] + 0.114 * img_array[:, :, 2]
-
-        # 阴影调整 (暗部)
-        if abs(shadow) > 1:
-            shadow_factor = 1.0 + (shadow / 100.0)
-            shadow_mask = luminance < 0.3
-            for c in range(3):
-                img_array[:, :, c][shadow_mask] *= shadow_factor
-
-        # 高光调整 (亮部)
-        if abs(highlight) > 1:
-            highlight_factor = 1.0 + (highlight / 100.0)
-            highlight_mask = luminance > 0.7
-            for c in range(3):
-                img_array[:, :, c][highlight_mask] *= highlight_factor
-
-        # 限制像素值范围
-        img_array = np.clip(img_array * 255, 0, 255)
-
-        return Image.fromarray(img_array.astype(np.uint8))
+        """调整阴影和高光 (亮度增益查表，阴影/高光权重平滑过渡)"""
+        return self._apply_stage(image, engine.shadow_highlight_stage(shadow, highlight))
 
     def preview_filter_effect(self, original_image_path: str, parameters: FilterParameter,
                             max_size: Tuple[int, int] = (400, 400)) -> Image.Image:
@@ -214,12 +167,31 @@ class FilterGenerator:
         Returns:
             处理后的预览图
         """
-        # 加载并缩放图片
-        image = Image.open(original_image_path)
-        image.thumbnail(max_size, Image.Resampling.LANCZOS)
-
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        # 加载缩小后的预览底图 (同一张图片的多次预览只缩放一次)
+        image = self.load_preview_source(original_image_path, max_size)
 
         # 应用滤镜效果
-        return self._apply_all_filters(image, parameters)
\ No newline at end of file
+        return self._apply_all_filters(image, parameters)
+
+    def load_preview_source(self, original_image_path: str,
+                            max_size: Tuple[int, int] = (400, 400)) -> Image.Image:
+        """
+        读取缩小到预览尺寸的原图，结果按源文件版本缓存
+
+        返回的图片被多个预览共享，调用方不应原地修改
+        """
+        stat = os.stat(original_image_path)
+        key = (os.path.abspath(original_image_path), stat.st_size, stat.st_mtime_ns, tuple(max_size))
+        with _preview_sources_lock:
+            image = _preview_sources.get(key)
+            if image is not None:
+                _preview_sources.move_to_end(key)
+                return image
+
+        image = downscale_to_fit(self.load_image(original_image_path), max_size)
+
+        with _preview_sources_lock:
+            _preview_sources[key] = image
+            while len(_preview_sources) > _PREVIEW_SOURCE_ENTRIES:
+                _preview_sources.popitem(last=False)
+        return image
\ No newline at end of file
@@ -4,19 +4,45 @@
 """
 import cv2
 import numpy as np
-from PIL import Image, ImageStat
-from typing import Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
 import time
 from datetime import datetime
 
+from ..engine.analysis import AnalysisContext, AnalysisPlan, plan_analysis
 from ..models.parameter import ParameterValue, AnalysisResult, FilterParameter
 from ..utils.constants import (
     PARAMETER_NAMES, PARAMETER_UNITS, PARAMETER_REFERENCES,
     DIRECTION_MAPPING, ANALYSIS_THRESHOLDS
 )
+from ..utils.pixel_cache import load_rgb_image
+from ..utils.metric_pool import evaluate_metrics, get_metric_pool
+from ..utils.validation import normalize_analysis_parameters
 
 class ImageAnalyzer:
-    def __init__(self):
+    engine = 'basic'
+
+    # 指标组 -> 直接使用的中间结果 (见 AnalysisContext.DEPENDENCIES)；
+    # 键的顺序即计算顺序: 锐化(Sobel)与HSV转换开销最大，排在前面尽早开始
+    METRIC_INPUTS = {
+        'sharpness': ('sobel_magnitude',),
+        'saturation': ('hsv',),
+        'hue': ('hsv',),
+        'contrast': ('gray',),
+        'shadow': ('gray',),
+        'highlight': ('gray',),
+        'brightness': ('gray',),
+        'temperature': ('channel_means',),
+    }
+    # 参数 -> 计算它的指标组
+    PARAMETER_GROUPS = {name: name for name in PARAMETER_NAMES}
+
+    def __init__(self, metric_pool: Optional[ThreadPoolExecutor] = None):
+        """
+        Args:
+            metric_pool: 指标线程池，缺省时使用进程内配置的线程池 (未配置则逐项顺序计算)
+        """
+        self.metric_pool = metric_pool
         self.reference_values = {
             'brightness': 128,    # RGB中值
             'contrast': 50,       # 标准对比度
@@ -25,83 +51,128 @@ class ImageAnalyzer:
             'hue': 0,            # 色调中值
         }
 
-    def analyze_image(self, image_path: str) -> AnalysisResult:
+    def analyze_image(self, image_path: str, parameters: Optional[Iterable[str]] = None) -> AnalysisResult:
         """
         分析图片并提取滤镜参数
 
         Args:
             image_path: 图片路径
+            parameters: 只分析这些参数，缺省为全部8类
 
         Returns:
             AnalysisResult: 分析结果
         """
         start_time = time.time()
 
-        # 加载图片
-        image_cv = cv2.imread(image_path)
-        image_pil = Image.open(image_path)
-
-        if image_cv is None:
-            raise ValueError("无法加载图片")
-
-        # 执行各项分析
-        parameters = {}
-
-        # 1. 亮度分析
-        brightness_param = self._analyze_brightness(image_cv)
-        parameters['brightness'] = brightness_param
-
-        # 2. 对比度分析
-        contrast_param = self._analyze_contrast(image_cv)
-        parameters['contrast'] = contrast_param
+        # 加载图片 (配置了像素缓存时重复分析不再解码)
+        try:
+            image_cv = cv2.cvtColor(load_rgb_image(image_path), cv2.COLOR_RGB2BGR)
+        except Exception as e:
+            raise ValueError("无法加载图片") from e
 
-        # 3. 饱和度分析
-        saturation_param = self._analyze_saturation(image_cv)
-        parameters['saturation'] = saturation_param
+        result = self.analyze_pixels(image_cv, parameters)
+        result.analysis_time = time.time() - start_time
+        return result
 
-        # 4. 锐化分析
-        sharpness_param = self._analyze_sharpness(image_cv)
-        parameters['sharpness'] = sharpness_param
+    def plan(self, parameters: Optional[Iterable[str]] = None) -> AnalysisPlan:
+        """请求的参数 -> 需要计算的指标组与中间结果"""
+        return plan_analysis(normalize_analysis_parameters(parameters), self.PARAMETER_GROUPS, self.METRIC_INPUTS)
 
-        # 5. 色温分析
-        temperature_param = self._analyze_temperature(image_cv)
-        parameters['temperature'] = temperature_param
-
-        # 6. 色调分析
-        hue_param = self._analyze_hue(image_cv)
-        parameters['hue'] = hue_param
+    def analyze_pixels(self, image_cv: np.ndarray, parameters: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """
+        分析已解码的图片 (BGR数组)，供计算进程直接处理共享内存中的像素
 
-        # 7. 阴影分析
-        shadow_param = self._analyze_shadow(image_cv)
-        parameters['shadow'] = shadow_param
+        Args:
+            image_cv: BGR图像 (uint8, H x W x 3)
+            parameters: 只分析这些参数，缺省为全部8类；只计算它们需要的颜色空间与中间结果
 
-        # 8. 高光分析
-        highlight_param = self._analyze_highlight(image_cv)
-        parameters['highlight'] = highlight_param
+        Returns:
+            AnalysisResult: 分析结果
+        """
+        start_time = time.time()
+        plan = self.plan(parameters)
+        context = AnalysisContext(image_cv)
+
+        # 多个指标共用的中间结果先准备好，并行计算时不必互相等待
+        context.prepare(plan.shared)
+
+        # 各指标相互独立，配置了线程池时并行计算
+        metric_functions = self._metric_functions()
+        values = evaluate_metrics([
+            (group, metric_functions[group], (context,)) for group in plan.groups
+        ], self.metric_pool or get_metric_pool())
+
+        return self._build_result(plan, values, time.time() - start_time)
+
+    def _metric_functions(self) -> Dict[str, Callable[[AnalysisContext], Any]]:
+        """指标组 -> 计算函数"""
+        return {
+            'sharpness': self._analyze_sharpness,
+            'saturation': self._analyze_saturation,
+            'hue': self._analyze_hue,
+            'contrast': self._analyze_contrast,
+            'shadow': self._analyze_shadow,
+            'highlight': self._analyze_highlight,
+            'brightness': self._analyze_brightness,
+            'temperature': self._analyze_temperature,
+        }
 
-        analysis_time = time.time() - start_time
+    def _build_result(self, plan: AnalysisPlan, values: Dict[str, Any], analysis_time: float) -> AnalysisResult:
+        """指标组的计算结果 -> 分析结果 (基础引擎中每个指标组即一个参数)"""
+        return self.assemble_result({name: values[name] for name in plan.parameters}, analysis_time=analysis_time)
 
-        # 计算置信度
-        confidence_score = self._calculate_confidence(parameters)
+    def assemble_result(self, parameters: Dict[str, ParameterValue],
+                        metrics: Optional[Dict[str, Dict[str, Any]]] = None,
+                        analysis_time: float = 0.0) -> AnalysisResult:
+        """
+        由已计算的参数(及原始指标)组装分析结果，置信度只依据其中包含的参数
 
+        也用于把缓存中已有的部分结果组装为响应
+        """
         # 生成图片ID
         from ..utils.file_manager import generate_image_id
-        image_id = generate_image_id()
 
         return AnalysisResult(
-            image_id=image_id,
+            image_id=generate_image_id(),
             parameters=parameters,
             analysis_time=analysis_time,
             timestamp=datetime.now(),
-            confidence_score=confidence_score
+            confidence_score=self._calculate_confidence(parameters),
+            metrics=metrics,
+            engine=self.engine
         )
 
-    def _analyze_brightness(self, image: np.ndarray) -> ParameterValue:
+    def select(self, result: AnalysisResult, parameters: Iterable[str], analysis_time: float = 0.0) -> AnalysisResult:
+        """从(缓存中合并的)分析结果取出部分参数，组装为新的分析结果"""
+        parameters = {name: result.parameters[name] for name in parameters}
+        metrics = None
+        if result.metrics is not None:
+            groups = {self.PARAMETER_GROUPS[name] for name in parameters}
+            metrics = {group: values for group, values in result.metrics.items() if group in groups}
+        return self.assemble_result(parameters, metrics, analysis_time)
+
+    def parameters_from_statistics(self, statistics: Mapping[str, float]) -> Dict[str, ParameterValue]:
+        """
+        由已算好的全局统计量得到8类参数 (字段见 engine.analysis.STACK_STATISTICS_DTYPE)，
+        供批量分析等自行计算统计量的调用方使用
+        """
+        return {
+            'brightness': self._brightness_parameter(float(statistics['brightness'])),
+            'contrast': self._contrast_parameter(float(statistics['contrast'])),
+            'saturation': self._saturation_parameter(float(statistics['saturation'])),
+            'sharpness': self._sharpness_parameter(float(statistics['sharpness'])),
+            'temperature': self._temperature_parameter(float(statistics['mean_r']), float(statistics['mean_b'])),
+            'hue': self._hue_parameter(float(statistics['hue'])),
+            'shadow': self._shadow_parameter(float(statistics['shadow'])),
+            'highlight': self._highlight_parameter(float(statistics['highlight'])),
+        }
+
+    def _analyze_brightness(self, context: AnalysisContext) -> ParameterValue:
         """分析亮度"""
-        # 转换为灰度图
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        mean_brightness = np.mean(gray)
+        return self._brightness_parameter(np.mean(context.gray))
 
+    def _brightness_parameter(self, mean_brightness: float) -> ParameterValue:
+        """平均灰度 -> 亮度参数"""
         # 计算相对于标准值的偏差
         reference = self.reference_values['brightness']
         diff_percent = ((mean_brightness - reference) / reference) * 100
@@ -116,13 +187,13 @@ class ImageAnalyzer:
             reference=PARAMETER_REFERENCES['brightness']
         )
 
-    def _analyze_contrast(self, image: np.ndarray) -> ParameterValue:
+    def _analyze_contrast(self, context: AnalysisContext) -> ParameterValue:
         """分析对比度"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
         # 使用标准差计算对比度
-        contrast_value = np.std(gray)
+        return self._contrast_parameter(np.std(context.gray))
 
+    def _contrast_parameter(self, contrast_value: float) -> ParameterValue:
+        """灰度标准差 -> 对比度参数"""
         # 标准对比度值约为50，根据这个计算偏差
         reference = 50
         diff_percent = ((contrast_value - reference) / reference) * 100
@@ -137,14 +208,13 @@ class ImageAnalyzer:
             reference=PARAMETER_REFERENCES['contrast']
         )
 
-    def _analyze_saturation(self, image: np.ndarray) -> ParameterValue:
+    def _analyze_saturation(self, context: AnalysisContext) -> ParameterValue:
         """分析饱和度"""
-        # 转换为HSV
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        saturation_channel = hsv[:, :, 1]
-
-        mean_saturation = np.mean(saturation_channel)
+        saturation_channel = context.hsv[:, :, 1]
+        return self._saturation_parameter(np.mean(saturation_channel))
 
+    def _saturation_parameter(self, mean_saturation: float) -> ParameterValue:
+        """HSV饱和度均值 -> 饱和度参数"""
         # HSV中S通道范围0-255，标准值约127
         reference = 127
         diff_percent = ((mean_saturation - reference) / reference) * 100
@@ -159,17 +229,13 @@ class ImageAnalyzer:
             reference=PARAMETER_REFERENCES['saturation']
         )
 
-    def _analyze_sharpness(self, image: np.ndarray) -> ParameterValue:
+    def _analyze_sharpness(self, context: AnalysisContext) -> ParameterValue:
         """分析锐化程度"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
         # 使用Sobel算子计算边缘强度
-        sobel_x = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        sobel_y = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-        sobel_magnitude = np.sqrt(sobel_x**2 + sobel_y**2)
-
-        sharpness_score = np.mean(sobel_magnitude)
+        return self._sharpness_parameter(cv2.mean(context.sobel_magnitude)[0])
 
+    def _sharpness_parameter(self, sharpness_score: float) -> ParameterValue:
+        """Sobel梯度幅值均值 -> 锐化参数"""
         # 经验值：标准锐化值约为15
         reference = 15
         diff_percent = ((sharpness_score - reference) / reference) * 100
@@ -184,15 +250,14 @@ class ImageAnalyzer:
             reference=PARAMETER_REFERENCES['sharpness']
         )
 
-    def _analyze_temperature(self, image: np.ndarray) -> ParameterValue:
+    def _analyze_temperature(self, context: AnalysisContext) -> ParameterValue:
         """分析色温"""
         # 计算RGB通道平均值
-        b, g, r = cv2.split(image)
-
-        mean_r = np.mean(r)
-        mean_g = np.mean(g)
-        mean_b = np.mean(b)
+        mean_r, mean_g, mean_b = context.channel_means
+        return self._temperature_parameter(mean_r, mean_b)
 
+    def _temperature_parameter(self, mean_r: float, mean_b: float) -> ParameterValue:
+        """R/B通道均值 -> 色温参数"""
         # 计算色温偏向 (简化算法)
         # 暖色调：红色分量高，蓝色分量低
         # 冷色调：蓝色分量高，红色分量低
@@ -211,14 +276,15 @@ class ImageAnalyzer:
             reference=PARAMETER_REFERENCES['temperature']
         )
 
-    def _analyze_hue(self, image: np.ndarray) -> ParameterValue:
+    def _analyze_hue(self, context: AnalysisContext) -> ParameterValue:
         """分析色调"""
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        hue_channel = hsv[:, :, 0]
+        hue_channel = context.hsv[:, :, 0]
 
         # HSV中H通道范围0-179 (OpenCV)
-        mean_hue = np.mean(hue_channel)
+        return self._hue_parameter(np.mean(hue_channel))
 
+    def _hue_parameter(self, mean_hue: float) -> ParameterValue:
+        """H通道均值 -> 色调参数"""
         # 转换为标准色调角度 (0-360°)
         hue_angle = (mean_hue / 179) * 360
 
@@ -241,9 +307,9 @@ class ImageAnalyzer:
             reference=PARAMETER_REFERENCES['hue']
         )
 
-    def _analyze_shadow(self, image: np.ndarray) -> ParameterValue:
+    def _analyze_shadow(self, context: AnalysisContext) -> ParameterValue:
         """分析阴影"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = context.gray
 
         # 定义阴影区域 (亮度 < 85)
         shadow_mask = gray < 85
@@ -253,7 +319,10 @@ class ImageAnalyzer:
             shadow_brightness = 85
         else:
             shadow_brightness = np.mean(shadow_pixels)
+        return self._shadow_parameter(shadow_brightness)
 
+    def _shadow_parameter(self, shadow_brightness: float) -> ParameterValue:
+        """阴影区域平均亮度 -> 阴影参数"""
         # 标准阴影亮度约为60
         reference = 60
         diff_percent = ((shadow_brightness - reference) / reference) * 100
@@ -268,9 +337,9 @@ class ImageAnalyzer:
             reference=PARAMETER_REFERENCES['shadow']
         )
 
-    def _analyze_highlight(self, image: np.ndarray) -> ParameterValue:
+    def _analyze_highlight(self, context: AnalysisContext) -> ParameterValue:
         """分析高光"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = context.gray
 
         # 定义高光区域 (亮度 > 170)
         highlight_mask = gray > 170
@@ -280,7 +349,10 @@ class ImageAnalyzer:
             highlight_brightness = 170
         else:
             highlight_brightness = np.mean(highlight_pixels)
+        return self._highlight_parameter(highlight_brightness)
 
+    def _highlight_parameter(self, highlight_brightness: float) -> ParameterValue:
+        """高光区域平均亮度 -> 高光参数"""
         # 标准高光亮度约为200
         reference = 200
         diff_percent = ((highlight_brightness - reference) / reference) * 100
@@ -0,0 +1,126 @@
+"""
+抽样分析引擎
+在分层随机样本上估计基础引擎的各项全局指标，分析耗时基本不随图片尺寸增长；
+每个参数给出置信区间，区间跨过显著变化阈值(结论可能与整图计算不同)的参数改为整图计算
+"""
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from ..engine.sampling import StratifiedSample
+from ..models.parameter import ParameterValue, AnalysisResult
+from ..utils.constants import ANALYSIS_SAMPLING, ANALYSIS_THRESHOLDS
+from ..utils.validation import normalize_analysis_parameters
+from .image_analyzer import ImageAnalyzer
+
+# 估计结果: (参数值, 参数值的标准误差)，样本不足以估计时为 None
+Estimate = Optional[Tuple[ParameterValue, float]]
+
+class SampledImageAnalyzer(ImageAnalyzer):
+    """基础引擎的抽样版本，参数值附带置信区间"""
+
+    engine = 'sampled'
+
+    def __init__(self, metric_pool=None, sampling: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            metric_pool: 整图计算时使用的指标线程池
+            sampling: 覆盖 ANALYSIS_SAMPLING 中的抽样配置
+        """
+        super().__init__(metric_pool)
+        self.sampling = {**ANALYSIS_SAMPLING, **(sampling or {})}
+
+    def analyze_pixels(self, image_cv: np.ndarray, parameters: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """
+        在分层样本上分析图片 (BGR数组)
+
+        Args:
+            image_cv: BGR图像 (uint8, H x W x 3)
+            parameters: 只分析这些参数，缺省为全部8类
+
+        Returns:
+            AnalysisResult: 抽样估计的参数带 confidence_interval，整图计算的参数不带
+        """
+        start_time = time.time()
+        requested = normalize_analysis_parameters(parameters)
+
+        height, width = image_cv.shape[:2]
+        if height * width < self.sampling['sample_size'] * self.sampling['min_pixels_ratio']:
+            # 小图整图计算同样很快
+            return super().analyze_pixels(image_cv, requested)
+
+        sample = StratifiedSample(image_cv, self.sampling['sample_size'],
+                                  self.sampling['grid'], self.sampling['seed'])
+        estimates = {name: getattr(self, f'_estimate_{name}')(sample) for name in requested}
+
+        # 置信区间跨过显著变化阈值、或样本不足以估计的参数，改为整图计算
+        threshold = ANALYSIS_THRESHOLDS['min_change_threshold']
+        z = self.sampling['confidence_z']
+        exact = []
+        for name, estimate in estimates.items():
+            if estimate is None:
+                exact.append(name)
+                continue
+            value, standard_error = estimate
+            low, high = value.value - z * standard_error, value.value + z * standard_error
+            if low < threshold <= high:
+                exact.append(name)
+            else:
+                value.confidence_interval = (max(0.0, low), high)
+
+        parameters = {name: estimate[0] for name, estimate in estimates.items() if name not in exact}
+        if exact:
+            parameters.update(super().analyze_pixels(image_cv, exact).parameters)
+
+        return self.assemble_result({name: parameters[name] for name in requested},
+                                    analysis_time=time.time() - start_time)
+
+    # ========== 估计 (标准误差换算到参数值的单位) ==========
+
+    def _estimate_brightness(self, sample: StratifiedSample) -> Estimate:
+        mean, standard_error = sample.mean(sample.gray)
+        return self._brightness_parameter(mean), standard_error * 100 / self.reference_values['brightness']
+
+    def _estimate_contrast(self, sample: StratifiedSample) -> Estimate:
+        """标准差 = sqrt(方差)，方差按 (x - 均值)² 的均值估计，误差按线性化传递"""
+        mean, _ = sample.mean(sample.gray)
+        variance, variance_error = sample.mean((sample.gray - mean) ** 2)
+        contrast_value = np.sqrt(variance)
+        return self._contrast_parameter(contrast_value), variance_error / (2 * max(contrast_value, 1e-6)) * 100 / 50
+
+    def _estimate_saturation(self, sample: StratifiedSample) -> Estimate:
+        mean, standard_error = sample.mean(sample.hsv[:, 1])
+        return self._saturation_parameter(mean), standard_error * 100 / 127
+
+    def _estimate_sharpness(self, sample: StratifiedSample) -> Estimate:
+        mean, standard_error = sample.mean(sample.sobel_magnitude)
+        return self._sharpness_parameter(mean), standard_error * 100 / 15
+
+    def _estimate_temperature(self, sample: StratifiedSample) -> Estimate:
+        """色温偏移 300 * (R - B) / (R + B)，误差按对R、B均值的线性化传递"""
+        red = sample.bgr[:, 2].astype(np.float64)
+        blue = sample.bgr[:, 0].astype(np.float64)
+        mean_r, _ = sample.mean(red)
+        mean_b, _ = sample.mean(blue)
+        linearized = 300 * 2 * (mean_b * red - mean_r * blue) / (mean_r + mean_b + 1e-6) ** 2
+        _, standard_error = sample.mean(linearized)
+        return self._temperature_parameter(mean_r, mean_b), standard_error
+
+    def _estimate_hue(self, sample: StratifiedSample) -> Estimate:
+        mean, standard_error = sample.mean(sample.hsv[:, 0])
+        return self._hue_parameter(mean), standard_error * 360 / 179
+
+    def _estimate_shadow(self, sample: StratifiedSample) -> Estimate:
+        gray = sample.gray
+        estimate = sample.ratio_mean(gray, gray < 85, self.sampling['min_region_samples'])
+        if estimate is None:
+            return None
+        return self._shadow_parameter(estimate[0]), estimate[1] * 100 / 60
+
+    def _estimate_highlight(self, sample: StratifiedSample) -> Estimate:
+        gray = sample.gray
+        estimate = sample.ratio_mean(gray, gray > 170, self.sampling['min_region_samples'])
+        if estimate is None:
+            return None
+        return self._highlight_parameter(estimate[0]), estimate[1] * 100 / 200
@@ -0,0 +1,208 @@
+"""
+上传后的推测性预处理
+客户端上传后几乎总是紧接着请求分析和预览: 上传响应返回后，在后台低优先级线程中
+预先解码(写入像素缓存)、准备预览底图并完成默认引擎的分析(写入分析结果缓存)。
+推测任务只在没有前台请求时执行，前台请求到达后不再开始新的步骤；
+已经开始的步骤不可抢占，会在后台线程中执行完 (前台请求同一图片的分析时会合并到这次计算上)。
+排队中的任务可以随时取消，队列满时丢弃最早的任务。
+所有步骤都在本线程内执行: 计算进程池中的进程不降低优先级，配置了进程池时推测分析也不提交到池中
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..utils.pixel_cache import load_rgb_image
+from .analysis_cache import get_analysis_cache
+from .compute_pool import analyze_image
+from .filter_generator import FilterGenerator
+
+class _Task:
+    def __init__(self, image_id: str, image_path: str):
+        self.image_id = image_id
+        self.image_path = image_path
+        self.submitted_at = time.time()
+        self.cancelled = False
+
+class SpeculativeWorker:
+    """空闲时执行的推测任务队列 (单个低优先级后台线程)"""
+
+    def __init__(self, engine: str = 'basic', max_pending: int = 64, max_age: float = 60.0,
+                 preview_size: Tuple[int, int] = (400, 400), idle_grace: float = 0.05):
+        """
+        Args:
+            engine: 预先分析使用的引擎 (与分析接口的默认引擎一致)
+            max_pending: 排队任务上限，超出时丢弃最早的任务
+            max_age: 排队超过该时间(秒)的任务直接丢弃
+            preview_size: 预览底图尺寸 (与预览接口一致)
+            idle_grace: 前台请求全部结束后再等待的时间(秒)，避免在请求间隙抢占
+        """
+        self.engine = engine
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.preview_size = preview_size
+        self.idle_grace = idle_grace
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.dropped = 0
+        self.failed = 0
+        self._pending: 'OrderedDict[str, _Task]' = OrderedDict()
+        self._current: Optional[_Task] = None
+        self._foreground = 0
+        self._last_foreground = 0.0
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='speculative-worker', daemon=True)
+        self._thread.start()
+
+    # ---- 前台请求 ----
+
+    def foreground_started(self) -> None:
+        with self._condition:
+            self._foreground += 1
+
+    def foreground_finished(self) -> None:
+        with self._condition:
+            self._foreground = max(0, self._foreground - 1)
+            self._last_foreground = time.monotonic()
+            self._condition.notify_all()
+
+    # ---- 任务 ----
+
+    def submit(self, image_id: str, image_path: str) -> None:
+        """登记新上传图片的推测任务"""
+        with self._condition:
+            if self._stopped:
+                return
+            previous = self._pending.pop(image_id, None)
+            if previous is not None:
+                previous.cancelled = True
+            self._pending[image_id] = _Task(image_id, image_path)
+            self.submitted += 1
+            while len(self._pending) > self.max_pending:
+                _, oldest = self._pending.popitem(last=False)
+                oldest.cancelled = True
+                self.dropped += 1
+            self._condition.notify_all()
+
+    def cancel(self, image_id: str) -> bool:
+        """取消图片的推测任务；正在执行的任务在当前步骤完成后停止"""
+        with self._condition:
+            task = self._pending.pop(image_id, None)
+            if task is None and self._current is not None and self._current.image_id == image_id:
+                task = self._current
+            if task is None or task.cancelled:
+                return False
+            task.cancelled = True
+            self.cancelled += 1
+            return True
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._stopped = True
+            for task in self._pending.values():
+                task.cancelled = True
+            self._pending.clear()
+            self._condition.notify_all()
+        self._thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'pending': len(self._pending)
+            }
+
+    # ---- 后台线程 ----
+
+    def _wait_idle(self) -> bool:
+        """等到没有前台请求且空闲超过 idle_grace；停止时返回False。调用时需持有条件锁"""
+        while not self._stopped:
+            if self._foreground == 0:
+                idle_for = time.monotonic() - self._last_foreground
+                if idle_for >= self.idle_grace:
+                    return True
+                self._condition.wait(self.idle_grace - idle_for)
+            else:
+                self._condition.wait()
+        return False
+
+    def _next_task(self) -> Optional[_Task]:
+        with self._condition:
+            while not self._stopped:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                if not self._wait_idle() or not self._pending:
+                    continue
+                _, task = self._pending.popitem(last=False)
+                if time.time() - task.submitted_at > self.max_age:
+                    self.dropped += 1
+                    continue
+                self._current = task
+                return task
+        return None
+
+    def _steps(self, task: _Task) -> List[Callable[[], object]]:
+        steps = [
+            lambda: load_rgb_image(task.image_path),
+            lambda: FilterGenerator().load_preview_source(task.image_path, self.preview_size)
+        ]
+        # 未配置分析结果缓存时预先分析的结果无处保存
+        if get_analysis_cache() is not None:
+            steps.append(lambda: analyze_image(task.image_path, self.engine, in_process=True))
+        return steps
+
+    def _run(self) -> None:
+        _lower_thread_priority()
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+
+            outcome = 'completed'
+            try:
+                for step in self._steps(task):
+                    # 每一步开始前重新确认: 未被取消，且前台仍然空闲 (步骤开始后不可中断)
+                    with self._condition:
+                        if task.cancelled or not self._wait_idle():
+                            outcome = 'cancelled'
+                            break
+                    step()
+            except Exception:
+                outcome = 'failed'  # 文件已被删除等，前台请求会给出正式的错误
+
+            with self._condition:
+                self._current = None
+                if outcome == 'completed':
+                    self.completed += 1
+                elif outcome == 'failed':
+                    self.failed += 1
+
+def _lower_thread_priority() -> None:
+    """Linux下线程可单独设置nice值，让推测任务让出CPU；其他平台忽略"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+# 进程内共享的推测任务队列，由应用启动时配置；未配置时上传后不做推测处理
+_active_worker: Optional[SpeculativeWorker] = None
+
+def configure_speculative_worker(enabled: bool, engine: str = 'basic',
+                                 max_pending: int = 64) -> Optional[SpeculativeWorker]:
+    """配置上传后的推测性预处理"""
+    global _active_worker
+    if _active_worker is not None:
+        _active_worker.shutdown()
+    _active_worker = SpeculativeWorker(engine, max_pending) if enabled else None
+    return _active_worker
+
+def get_speculative_worker() -> Optional[SpeculativeWorker]:
+    return _active_worker
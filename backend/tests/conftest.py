@@ -0,0 +1,10 @@
+"""
+测试公共配置
+被测代码以 backend 包的形式相对导入，在 backend 目录下运行 pytest 时把仓库根目录加入导入路径
+"""
+import os
+import sys
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
@@ -0,0 +1,290 @@
+"""
+滤镜的原实现 (基线提交 48c4748，未经查表/合并等优化)，作为滤镜引擎一致性测试的参照
+- FilterGenerator 的 ImageEnhance 链 (backend/services/filter_generator.py)
+- real_analysis_server.apply_filter_to_image
+- real_analysis_server_fixed.apply_filter_to_image
+
+代码按原样复制，只去掉了读取文件/JPEG编码与日志输出，输入输出改为 uint8 RGB 数组
+"""
+import cv2
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+from backend.models.parameter import FilterParameter
+
+class LegacyFilterGenerator:
+    def _apply_all_filters(self, image: Image.Image, parameters: FilterParameter) -> Image.Image:
+        """应用所有滤镜效果"""
+        result_image = image.copy()
+
+        # 1. 亮度调整
+        if abs(parameters.brightness) > 1:
+            result_image = self._adjust_brightness(result_image, parameters.brightness)
+
+        # 2. 对比度调整
+        if abs(parameters.contrast) > 1:
+            result_image = self._adjust_contrast(result_image, parameters.contrast)
+
+        # 3. 饱和度调整
+        if abs(parameters.saturation) > 1:
+            result_image = self._adjust_saturation(result_image, parameters.saturation)
+
+        # 4. 色温调整
+        if abs(parameters.temperature) > 10:
+            result_image = self._adjust_temperature(result_image, parameters.temperature)
+
+        # 5. 色调调整
+        if abs(parameters.hue) > 5:
+            result_image = self._adjust_hue(result_image, parameters.hue)
+
+        # 6. 阴影/高光调整
+        if abs(parameters.shadow) > 1 or abs(parameters.highlight) > 1:
+            result_image = self._adjust_shadow_highlight(result_image, parameters.shadow, parameters.highlight)
+
+        # 7. 锐化调整 (最后应用)
+        if abs(parameters.sharpness) > 1:
+            result_image = self._adjust_sharpness(result_image, parameters.sharpness)
+
+        return result_image
+
+    def _adjust_brightness(self, image: Image.Image, value: float) -> Image.Image:
+        """调整亮度 (-100 to +100)"""
+        # 转换为增强因子 (0.5 to 1.5)
+        factor = 1.0 + (value / 100.0)
+        factor = max(0.1, min(2.0, factor))  # 限制范围
+
+        enhancer = ImageEnhance.Brightness(image)
+        return enhancer.enhance(factor)
+
+    def _adjust_contrast(self, image: Image.Image, value: float) -> Image.Image:
+        """调整对比度 (-100 to +100)"""
+        factor = 1.0 + (value / 100.0)
+        factor = max(0.1, min(2.0, factor))
+
+        enhancer = ImageEnhance.Contrast(image)
+        return enhancer.enhance(factor)
+
+    def _adjust_saturation(self, image: Image.Image, value: float) -> Image.Image:
+        """调整饱和度 (-100 to +100)"""
+        factor = 1.0 + (value / 100.0)
+        factor = max(0.0, min(2.0, factor))
+
+        enhancer = ImageEnhance.Color(image)
+        return enhancer.enhance(factor)
+
+    def _adjust_sharpness(self, image: Image.Image, value: float) -> Image.Image:
+        """调整锐化 (-100 to +100)"""
+        if value > 0:
+            # 增强锐化
+            factor = 1.0 + (value / 100.0)
+            enhancer = ImageEnhance.Sharpness(image)
+            return enhancer.enhance(factor)
+        else:
+            # 模糊处理
+            blur_radius = abs(value) / 50.0  # 0-2的模糊半径
+            return image.filter(ImageFilter.GaussianBlur(radius=blur_radius))
+
+    def _adjust_temperature(self, image: Image.Image, value: float) -> Image.Image:
+        """调整色温 (-500K to +500K)"""
+        # 转换PIL图像为numpy数组
+        img_array = np.array(image, dtype=np.float32)
+
+        # 色温调整系数
+        temp_factor = value / 500.0  # -1 to +1
+
+        if temp_factor > 0:
+            # 偏暖：增加红色，减少蓝色
+            img_array[:, :, 0] *= (1.0 + temp_factor * 0.3)  # R
+            img_array[:, :, 2] *= (1.0 - temp_factor * 0.3)  # B
+        else:
+            # 偏冷：减少红色，增加蓝色
+            img_array[:, :, 0] *= (1.0 + temp_factor * 0.3)  # R
+            img_array[:, :, 2] *= (1.0 - temp_factor * 0.3)  # B
+
+        # 限制像素值范围
+        img_array = np.clip(img_array, 0, 255)
+
+        return Image.fromarray(img_array.astype(np.uint8))
+
+    def _adjust_hue(self, image: Image.Image, value: float) -> Image.Image:
+        """调整色调 (-180° to +180°)"""
+        # 转换为HSV
+        img_array = np.array(image)
+        hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV).astype(np.float32)
+
+        # 调整色调 (H通道)
+        hue_shift = (value / 180.0) * 90  # 转换为OpenCV范围
+        hsv[:, :, 0] = (hsv[:, :, 0] + hue_shift) % 180
+
+        # 转换回RGB
+        rgb = cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2RGB)
+        return Image.fromarray(rgb)
+
+    def _adjust_shadow_highlight(self, image: Image.Image, shadow: float, highlight: float) -> Image.Image:
+        """调整阴影和高光"""
+        img_array = np.array(image, dtype=np.float32) / 255.0
+
+        # 计算亮度
+        luminance = 0.299 * img_array[:, :, 0] + 0.587 * img_array[:, :, 1] + 0.114 * img_array[:, :, 2]
+
+        # 阴影调整 (暗部)
+        if abs(shadow) > 1:
+            shadow_factor = 1.0 + (shadow / 100.0)
+            shadow_mask = luminance < 0.3
+            for c in range(3):
+                img_array[:, :, c][shadow_mask] *= shadow_factor
+
+        # 高光调整 (亮部)
+        if abs(highlight) > 1:
+            highlight_factor = 1.0 + (highlight / 100.0)
+            highlight_mask = luminance > 0.7
+            for c in range(3):
+                img_array[:, :, c][highlight_mask] *= highlight_factor
+
+        # 限制像素值范围
+        img_array = np.clip(img_array * 255, 0, 255)
+
+        return Image.fromarray(img_array.astype(np.uint8))
+
+def legacy_pillow(pixels: np.ndarray, parameters: dict) -> np.ndarray:
+    """FilterGenerator._apply_all_filters"""
+    image = Image.fromarray(pixels)
+    return np.asarray(LegacyFilterGenerator()._apply_all_filters(image, FilterParameter(**parameters)))
+
+def legacy_opencv(img_rgb: np.ndarray, filter_parameters: dict) -> np.ndarray:
+    """real_analysis_server.apply_filter_to_image"""
+    # 应用亮度调整
+    if 'brightness' in filter_parameters:
+        brightness_param = filter_parameters['brightness']
+        if isinstance(brightness_param, dict) and 'value' in brightness_param:
+            brightness_val = brightness_param['value']
+        else:
+            brightness_val = brightness_param
+
+        if brightness_val != 0:
+            # 亮度调整：添加常数值
+            brightness_change = int(brightness_val * 2.5)  # 增强效果
+            # 确保数据类型匹配
+            img_rgb = img_rgb.astype(np.int16)
+            img_rgb = img_rgb + brightness_change
+            img_rgb = np.clip(img_rgb, 0, 255).astype(np.uint8)
+
+    # 应用对比度调整
+    if 'contrast' in filter_parameters:
+        contrast_param = filter_parameters['contrast']
+        if isinstance(contrast_param, dict) and 'value' in contrast_param:
+            contrast_val = contrast_param['value']
+        else:
+            contrast_val = contrast_param
+
+        if contrast_val != 0:
+            # 对比度调整：乘以比例因子
+            factor = 1.0 + (contrast_val / 100.0)
+            img_rgb = img_rgb.astype(np.float32)
+            img_rgb = img_rgb * factor
+            img_rgb = np.clip(img_rgb, 0, 255).astype(np.uint8)
+
+    # 应用饱和度调整
+    if 'saturation' in filter_parameters:
+        saturation_param = filter_parameters['saturation']
+        if isinstance(saturation_param, dict) and 'value' in saturation_param:
+            saturation_val = saturation_param['value']
+        else:
+            saturation_val = saturation_param
+
+        if saturation_val != 0:
+            # 转换到HSV进行饱和度调整
+            img_hsv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HSV).astype(np.float32)
+            factor = 1.0 + (saturation_val / 100.0)
+            img_hsv[:, :, 1] = img_hsv[:, :, 1] * factor
+            img_hsv[:, :, 1] = np.clip(img_hsv[:, :, 1], 0, 255)
+            img_rgb = cv2.cvtColor(img_hsv.astype(np.uint8), cv2.COLOR_HSV2RGB)
+
+    # 应用色调调整
+    if 'hue' in filter_parameters:
+        hue_param = filter_parameters['hue']
+        if isinstance(hue_param, dict) and 'value' in hue_param:
+            hue_val = hue_param['value']
+        else:
+            hue_val = hue_param
+
+        if hue_val != 0:
+            # 转换到HSV进行色调调整
+            img_hsv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HSV).astype(np.float32)
+            img_hsv[:, :, 0] = (img_hsv[:, :, 0] + hue_val) % 180
+            img_rgb = cv2.cvtColor(img_hsv.astype(np.uint8), cv2.COLOR_HSV2RGB)
+
+    # 应用锐化
+    if 'sharpness' in filter_parameters:
+        sharpness_param = filter_parameters['sharpness']
+        if isinstance(sharpness_param, dict) and 'value' in sharpness_param:
+            sharpness_val = sharpness_param['value']
+        else:
+            sharpness_val = sharpness_param
+
+        if sharpness_val > 0:
+            # 使用锐化核
+            amount = sharpness_val / 100.0
+            kernel = np.array([[-1,-1,-1], [-1,9+amount,-1], [-1,-1,-1]])
+            img_rgb = cv2.filter2D(img_rgb, -1, kernel)
+            img_rgb = np.clip(img_rgb, 0, 255).astype(np.uint8)
+
+    return img_rgb
+
+def legacy_opencv_basic(img_rgb: np.ndarray, filter_parameters: dict) -> np.ndarray:
+    """real_analysis_server_fixed.apply_filter_to_image"""
+    # 应用亮度调整
+    if 'brightness' in filter_parameters:
+        brightness_param = filter_parameters['brightness']
+        if isinstance(brightness_param, dict) and 'value' in brightness_param:
+            brightness_val = brightness_param['value']
+        else:
+            brightness_val = brightness_param
+
+        if brightness_val != 0:
+            # 亮度调整：添加常数值
+            brightness_change = int(brightness_val * 2.5)  # 增强效果
+            # 确保数据类型匹配
+            img_rgb = img_rgb.astype(np.int16)
+            img_rgb = img_rgb + brightness_change
+            img_rgb = np.clip(img_rgb, 0, 255).astype(np.uint8)
+
+    # 应用对比度调整
+    if 'contrast' in filter_parameters:
+        contrast_param = filter_parameters['contrast']
+        if isinstance(contrast_param, dict) and 'value' in contrast_param:
+            contrast_val = contrast_param['value']
+        else:
+            contrast_val = contrast_param
+
+        if contrast_val != 0:
+            # 对比度调整：乘以比例因子
+            factor = 1.0 + (contrast_val / 100.0)
+            img_rgb = img_rgb.astype(np.float32)
+            img_rgb = img_rgb * factor
+            img_rgb = np.clip(img_rgb, 0, 255).astype(np.uint8)
+
+    # 应用饱和度调整
+    if 'saturation' in filter_parameters:
+        saturation_param = filter_parameters['saturation']
+        if isinstance(saturation_param, dict) and 'value' in saturation_param:
+            saturation_val = saturation_param['value']
+        else:
+            saturation_val = saturation_param
+
+        if saturation_val != 0:
+            # 转换到HSV进行饱和度调整
+            img_hsv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HSV).astype(np.float32)
+            factor = 1.0 + (saturation_val / 100.0)
+            img_hsv[:, :, 1] = img_hsv[:, :, 1] * factor
+            img_hsv[:, :, 1] = np.clip(img_hsv[:, :, 1], 0, 255)
+            img_rgb = cv2.cvtColor(img_hsv.astype(np.uint8), cv2.COLOR_HSV2RGB)
+
+    return img_rgb
+
+# 语义模式 -> 原实现
+LEGACY_FILTERS = {
+    'pillow': legacy_pillow,
+    'opencv': legacy_opencv,
+    'opencv_basic': legacy_opencv_basic,
+}
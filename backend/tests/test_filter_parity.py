@@ -0,0 +1,117 @@
+"""
+滤镜引擎与各入口原实现的一致性测试 (原实现见 legacy_filters)
+
+每个阶段单独比对，容差按阶段给出:
+- 逐点查表、Pillow空间滤波等阶段与原实现逐位一致 (容差0)
+- 阴影/高光改为平滑过渡权重: 过渡区间之外与原实现相差不超过1 (取整方式不同)，
+  过渡区间内的差异不超过调整量本身 (|值|/100 x 255)
+- opencv语义的饱和度与色调合并为一次HSV转换，原实现各转换一次，相差不超过3
+"""
+import random
+
+import numpy as np
+import pytest
+
+from backend.engine import filters as engine
+from backend.tools.bench_corpus import make_synthetic_image
+
+from .legacy_filters import LEGACY_FILTERS
+
+PARAMETER_NAMES = ('brightness', 'contrast', 'saturation', 'sharpness', 'temperature', 'hue', 'shadow', 'highlight')
+
+# 逐位一致的阶段: 语义模式 -> {参数: 测试取值}
+EXACT_STAGES = {
+    'pillow': {
+        'brightness': [-60, -15, 1.5, 25, 80],
+        'contrast': [-50, -10, 30, 90],
+        'saturation': [-100, -40, 20, 75],
+        'temperature': [-400, -120, 60, 450],
+        'hue': [-150, -33.3, 7, 45, 100.01, 170],
+        'sharpness': [-80, -20, 35, 90],
+    },
+    'opencv': {
+        'brightness': [-60, -15, 0.5, 25, 80],
+        'contrast': [-50, -10, 30, 90],
+        'saturation': [-100, -40, 20, 75],
+        'hue': [-150, -33.3, 0.4, 7, 45, 170],
+        'sharpness': [-80, 35, 90],
+    },
+    'opencv_basic': {
+        'brightness': [-60, -15, 25, 80],
+        'contrast': [-50, -10, 30, 90],
+        'saturation': [-100, -40, 20, 75],
+        'hue': [45],  # 该入口不处理色调
+        'sharpness': [35],  # 该入口不处理锐化
+    },
+}
+
+# 阴影/高光权重的过渡区间 (归一化亮度)，区间外权重为0或1，与原来的硬阈值相同
+TONE_TRANSITION_BANDS = ((0.2, 0.4), (0.6, 0.8))
+TONE_OUTSIDE_TOLERANCE = 1
+
+HSV_COMBINED_TOLERANCE = 3
+
+def _parameters(**values) -> dict:
+    parameters = {name: 0 for name in PARAMETER_NAMES}
+    parameters.update(values)
+    return parameters
+
+def _difference(semantics: str, pixels: np.ndarray, parameters: dict) -> np.ndarray:
+    legacy = LEGACY_FILTERS[semantics](pixels, parameters)
+    result = engine.apply_filter_parameters(pixels, parameters, semantics)
+    assert result.shape == legacy.shape and result.dtype == np.uint8
+    return np.abs(legacy.astype(np.int16) - result.astype(np.int16))
+
+@pytest.fixture(scope='module')
+def pixels() -> np.ndarray:
+    return make_synthetic_image(320, 240, 7)
+
+@pytest.mark.parametrize('semantics,name,value', [
+    (semantics, name, value)
+    for semantics, stages in EXACT_STAGES.items()
+    for name, values in stages.items()
+    for value in values
+])
+def test_stage_matches_legacy_exactly(pixels, semantics, name, value):
+    assert _difference(semantics, pixels, _parameters(**{name: value})).max() == 0
+
+@pytest.mark.parametrize('shadow,highlight', [
+    (-70, 0), (1.5, 0), (60, 0), (0, -60), (0, 70), (45, -45), (-99, 99)
+])
+def test_shadow_highlight_within_transition_tolerance(pixels, shadow, highlight):
+    difference = _difference('pillow', pixels, _parameters(shadow=shadow, highlight=highlight)).max(axis=2)
+
+    normalized = pixels.astype(np.float32) / 255.0
+    luminance = 0.299 * normalized[:, :, 0] + 0.587 * normalized[:, :, 1] + 0.114 * normalized[:, :, 2]
+    in_band = np.zeros(luminance.shape, dtype=bool)
+    for low, high in TONE_TRANSITION_BANDS:
+        in_band |= (luminance >= low) & (luminance <= high)
+
+    assert difference[~in_band].max() <= TONE_OUTSIDE_TOLERANCE
+    band_tolerance = np.ceil(max(abs(shadow), abs(highlight)) / 100.0 * 255) + TONE_OUTSIDE_TOLERANCE
+    assert difference[in_band].max() <= band_tolerance
+
+@pytest.mark.parametrize('saturation,hue', [(30, 10), (-50, -40), (80, 170.5), (10, 0.4)])
+def test_opencv_saturation_and_hue_within_tolerance(pixels, saturation, hue):
+    difference = _difference('opencv', pixels, _parameters(saturation=saturation, hue=hue))
+    assert difference.max() <= HSV_COMBINED_TOLERANCE
+
+@pytest.mark.parametrize('semantics', sorted(LEGACY_FILTERS))
+def test_random_combinations_match_legacy(pixels, semantics):
+    """
+    随机参数组合 (约一半为0) 整条滤镜链逐位一致
+
+    排除有容差的阶段: pillow不含阴影/高光，opencv的饱和度与色调不同时出现
+    (其后的锐化会放大HSV的取整差异)
+    """
+    rng = random.Random(0)
+    for _ in range(30):
+        values = {name: rng.choice([0, round(rng.uniform(-100, 100), 1)]) for name in PARAMETER_NAMES}
+        values['temperature'] = rng.choice([0, round(rng.uniform(-500, 500), 1)])
+        values['hue'] = rng.choice([0, round(rng.uniform(-180, 180), 1)])
+        if semantics == 'pillow':
+            values['shadow'] = values['highlight'] = 0
+        elif values['saturation'] != 0:
+            values['hue'] = 0
+
+        assert _difference(semantics, pixels, _parameters(**values)).max() == 0, values
@@ -0,0 +1,4 @@
+# tools/__init__.py
+"""
+命令行工具 (在仓库根目录以 python -m backend.tools.<name> 方式运行)
+"""
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+批量图片分析命令行工具
+所有图片缩放到统一的分析尺寸后分组堆叠计算，适合大量小图的离线分析
+
+用法:
+    python -m backend.tools.batch_analyze photos/ [--size 256x256] [--stack-size 64]
+
+按输入顺序每张图片向标准输出写一行JSON结果
+"""
+import argparse
+import json
+import sys
+
+from ..services.batch_analyzer import BatchImageAnalyzer
+from .batch_generate import _iter_images
+
+def _parse_size(value: str):
+    try:
+        width, height = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"尺寸格式应为 宽x高: {value}") from None
+    if width < 3 or height < 3:
+        raise argparse.ArgumentTypeError("分析尺寸至少为 3x3")
+    return width, height
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="批量分析图片的滤镜参数 (缩略图堆叠)")
+    parser.add_argument('inputs', nargs='+', help="图片文件或目录")
+    parser.add_argument('--size', type=_parse_size, help="统一的分析尺寸，如 256x256")
+    parser.add_argument('--stack-size', type=int, help="每次堆叠计算的图片数")
+    parser.add_argument('--decode-workers', type=int, help="解码线程数")
+    args = parser.parse_args(argv)
+
+    batch = BatchImageAnalyzer(
+        analysis_size=args.size,
+        stack_size=args.stack_size,
+        decode_workers=args.decode_workers
+    )
+
+    failed_count = 0
+    for result in batch.analyze(_iter_images(args.inputs)):
+        if result['status'] != 'success':
+            failed_count += 1
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+
+    return 1 if failed_count else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+批量滤镜生成命令行工具
+
+用法:
+    python -m backend.tools.batch_generate photos/*.jpg -o output \
+        --param brightness=20 --param contrast=-10
+
+    python -m backend.tools.batch_generate photos/ -o output --params-json saved_filter.json
+
+每完成一张图片向标准输出写一行JSON结果
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+from ..models.parameter import FilterParameter
+from ..services.batch_generator import BatchFilterGenerator
+from ..utils.validation import allowed_file, validate_filter_parameters
+from ..utils.constants import ENCODER_PROFILES, OUTPUT_FORMATS
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+
+def _iter_images(inputs: List[str]) -> Iterator[Tuple[str, str]]:
+    """展开输入的文件和目录，产出(输入路径, 文件路径)"""
+    for path in inputs:
+        if os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                if allowed_file(filename, IMAGE_EXTENSIONS):
+                    file_path = os.path.join(path, filename)
+                    yield file_path, file_path
+        else:
+            yield path, path
+
+def _parse_parameters(args) -> Dict[str, float]:
+    """合并JSON文件与命令行中的滤镜参数"""
+    parameters = {}
+    if args.params_json:
+        with open(args.params_json, 'r', encoding='utf-8') as f:
+            parameters.update(json.load(f))
+
+    for item in args.param:
+        if '=' not in item:
+            raise ValueError(f"参数格式应为 name=value: {item}")
+        name, value = item.split('=', 1)
+        parameters[name.strip()] = float(value)
+
+    return parameters
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="将同一组滤镜参数批量应用到多张图片")
+    parser.add_argument('inputs', nargs='+', help="图片文件或目录")
+    parser.add_argument('-o', '--output', required=True, help="输出文件夹")
+    parser.add_argument('--param', action='append', default=[], help="滤镜参数，如 brightness=20，可重复")
+    parser.add_argument('--params-json', help="包含滤镜参数的JSON文件")
+    parser.add_argument('--profile', default='balanced', choices=sorted(ENCODER_PROFILES),
+                        help="编码配置")
+    parser.add_argument('--format', dest='output_format', default='jpeg', choices=sorted(OUTPUT_FORMATS),
+                        help="输出格式")
+    parser.add_argument('--decode-workers', type=int, help="解码线程数")
+    parser.add_argument('--process-workers', type=int, help="滤镜处理线程数")
+    parser.add_argument('--encode-workers', type=int, help="编码线程数")
+    parser.add_argument('--queue-size', type=int, help="阶段间队列长度")
+    args = parser.parse_args(argv)
+
+    try:
+        parameters_dict = _parse_parameters(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if not validate_filter_parameters(parameters_dict):
+        parser.error("参数值超出有效范围")
+
+    os.makedirs(args.output, exist_ok=True)
+
+    batch = BatchFilterGenerator(
+        decode_workers=args.decode_workers,
+        process_workers=args.process_workers,
+        encode_workers=args.encode_workers,
+        queue_size=args.queue_size
+    )
+
+    failed_count = 0
+    for result in batch.generate(_iter_images(args.inputs),
+                                 FilterParameter.from_dict(parameters_dict),
+                                 args.output,
+                                 args.profile,
+                                 args.output_format):
+        if result['status'] != 'success':
+            failed_count += 1
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+
+    return 1 if failed_count else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
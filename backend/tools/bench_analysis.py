@@ -0,0 +1,113 @@
+"""
+增强分析引擎基准测试
+对比 real_analysis_server 中逐项独立计算的增强分析与后端共享中间结果的 AdvancedImageAnalyzer:
+耗时、各项指标的最大相对偏差，以及最终调整量是否一致
+
+用法 (在仓库根目录运行):
+    python -m backend.tools.bench_analysis [--repeat 3] [--no-samples]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from ..services.advanced_analyzer import AdvancedImageAnalyzer
+from ..services.image_analyzer import ImageAnalyzer
+from .bench_corpus import iter_corpus
+
+def legacy_metrics(handler, image_bgr: np.ndarray) -> dict:
+    """real_analysis_server 的原实现: 每项指标各自计算所需的中间结果"""
+    img_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+    img_hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
+    img_gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    img_lab = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2LAB)
+    return {
+        'brightness': handler.analyze_brightness_advanced(img_gray, img_lab),
+        'contrast': handler.analyze_contrast_advanced(img_gray),
+        'saturation': handler.analyze_saturation_advanced(img_hsv, img_lab),
+        'sharpness': handler.analyze_sharpness_advanced(img_gray),
+        'temperature': handler.analyze_temperature_advanced(img_rgb),
+        'hue': handler.analyze_hue_advanced(img_hsv),
+        'shadow_highlight': handler.analyze_shadow_highlight_advanced(img_gray, img_rgb),
+    }
+
+def max_relative_deviation(legacy: dict, current: dict) -> float:
+    """所有数值指标中的最大相对偏差"""
+    worst = 0.0
+    for group, values in legacy.items():
+        for key, value in values.items():
+            if not isinstance(value, (int, float, np.number)) or key not in current[group]:
+                continue
+            reference = float(value)
+            if np.isnan(reference):
+                continue
+            deviation = abs(float(current[group][key]) - reference) / max(abs(reference), 1e-9)
+            worst = max(worst, deviation)
+    return worst
+
+def bench(func, repeat: int) -> float:
+    """返回中位耗时(ms)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="增强分析引擎基准测试")
+    parser.add_argument('--repeat', type=int, default=3, help="每种实现重复次数")
+    parser.add_argument('--no-samples', action='store_true', help="只使用合成图片")
+    args = parser.parse_args(argv)
+
+    try:
+        import real_analysis_server
+    except ImportError:
+        print("需要在仓库根目录运行 (导入 real_analysis_server)", file=sys.stderr)
+        return 1
+
+    handler = object.__new__(real_analysis_server.ImageAnalysisHandler)
+    advanced = AdvancedImageAnalyzer()
+    basic = ImageAnalyzer()
+
+    header = (f"{'image':<18}{'legacy_ms':>11}{'advanced_ms':>13}{'basic_ms':>10}"
+              f"{'max_rel_dev':>13}{'same_adjust':>13}")
+    print(header)
+    print('-' * len(header))
+
+    mismatched = 0
+    for name, pixels in iter_corpus(include_samples=not args.no_samples):
+        image_bgr = cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+
+        legacy = legacy_metrics(handler, image_bgr)
+        result = advanced.analyze_pixels(image_bgr)
+        deviation = max_relative_deviation(legacy, result.metrics)
+
+        legacy_adjust = [
+            handler.calculate_brightness_adjustment_advanced(legacy['brightness']),
+            handler.calculate_contrast_adjustment_advanced(legacy['contrast']),
+            handler.calculate_saturation_adjustment_advanced(legacy['saturation']),
+            handler.calculate_sharpness_adjustment_advanced(legacy['sharpness']),
+            handler.calculate_temperature_adjustment_advanced(legacy['temperature']),
+            handler.calculate_hue_adjustment_advanced(legacy['hue']),
+            *handler.calculate_shadow_highlight_adjustment_advanced(legacy['shadow_highlight']),
+        ]
+        current_adjust = [result.parameters[key].value for key in (
+            'brightness', 'contrast', 'saturation', 'sharpness', 'temperature', 'hue', 'shadow', 'highlight'
+        )]
+        same_adjust = [abs(v) for v in legacy_adjust] == current_adjust
+        mismatched += not same_adjust
+
+        legacy_ms = bench(lambda: legacy_metrics(handler, image_bgr), args.repeat)
+        advanced_ms = bench(lambda: advanced.analyze_pixels(image_bgr), args.repeat)
+        basic_ms = bench(lambda: basic.analyze_pixels(image_bgr), args.repeat)
+        print(f"{name:<18}{legacy_ms:>11.1f}{advanced_ms:>13.1f}{basic_ms:>10.1f}"
+              f"{deviation:>13.2e}{str(same_adjust):>13}")
+
+    return 1 if mismatched else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+批量分析吞吐量基准测试
+在临时目录生成一批小尺寸JPEG，对比:
+- 逐张 ImageAnalyzer.analyze_image (原图解码 + 原图分析)
+- 逐张经 ComputePool 分析 (多线程解码 + 进程池原图分析，服务端配置 COMPUTE_PROCESSES 时的路径)
+- BatchImageAnalyzer (缩小解码 + 缩略图堆叠分析)
+并给出缩略图结果相对原图结果的各参数平均绝对偏差
+
+用法:
+    python -m backend.tools.bench_batch_analysis [--count 500] [--width 800] [--height 600] [--stack-size 64] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from ..services.batch_analyzer import BatchImageAnalyzer
+from ..services.compute_pool import ComputePool
+from ..services.image_analyzer import ImageAnalyzer
+from ..utils.constants import PARAMETER_NAMES
+from .bench_corpus import make_synthetic_image
+
+def write_images(folder: str, count: int, width: int, height: int):
+    """由少量合成底图裁剪/翻转出 count 张不同的JPEG"""
+    bases = [make_synthetic_image(width * 2, height * 2, seed) for seed in range(4)]
+    rng = np.random.default_rng(0)
+    paths = []
+    for index in range(count):
+        base = bases[index % len(bases)]
+        top = int(rng.integers(0, height))
+        left = int(rng.integers(0, width))
+        crop = base[top:top + height, left:left + width]
+        if index % 2:
+            crop = crop[:, ::-1]
+        path = os.path.join(folder, f"{index:05d}.jpg")
+        Image.fromarray(np.ascontiguousarray(crop)).save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="批量分析吞吐量基准测试")
+    parser.add_argument('--count', type=int, default=500, help="图片数量")
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--stack-size', type=int, default=None, help="每次堆叠计算的图片数")
+    parser.add_argument('--workers', type=int, default=None, help="计算进程数 (默认CPU核数)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = write_images(folder, args.count, args.width, args.height)
+        images = [(path, path) for path in paths]
+
+        analyzer = ImageAnalyzer()
+        start = time.perf_counter()
+        full = {path: analyzer.analyze_image(path) for path in paths}
+        per_image_s = time.perf_counter() - start
+
+        pool = ComputePool(args.workers)
+        try:
+            pool.analyze(paths[0])  # 预先启动计算进程
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=pool.max_workers) as threads:
+                list(threads.map(pool.analyze, paths))
+            pool_s = time.perf_counter() - start
+        finally:
+            pool.shutdown()
+
+        batch = BatchImageAnalyzer(stack_size=args.stack_size)
+        start = time.perf_counter()
+        stacked = {result['image_id']: result for result in batch.analyze(images)}
+        batch_s = time.perf_counter() - start
+
+        # 仅堆叠计算部分 (缩略图已解码)
+        stack = np.stack([batch.load_thumbnail(path) for path in paths[:batch.stack_size]])
+        start = time.perf_counter()
+        batch.analyze_stack(stack)
+        stack_ms = (time.perf_counter() - start) * 1000 / len(stack)
+        start = time.perf_counter()
+        for thumbnail in stack:
+            analyzer.analyze_pixels(thumbnail)
+        thumbnail_ms = (time.perf_counter() - start) * 1000 / len(stack)
+
+    failed = sum(result['status'] != 'success' for result in stacked.values())
+    print(f"images: {args.count} ({args.width}x{args.height}), analysis size {batch.analysis_size}, "
+          f"stack size {batch.stack_size}, decode workers {batch.decode_workers}, "
+          f"compute processes {pool.max_workers}")
+    print(f"{'per-image analyze_image':<28}{args.count / per_image_s:>10.1f} img/s")
+    print(f"{'per-image ComputePool':<28}{args.count / pool_s:>10.1f} img/s")
+    print(f"{'BatchImageAnalyzer':<28}{args.count / batch_s:>10.1f} img/s  ({failed} failed)")
+    print(f"{'stack statistics':<28}{stack_ms:>10.3f} ms/img  (逐张分析同尺寸缩略图 {thumbnail_ms:.3f} ms/img)")
+
+    print("\n缩略图相对原图的平均绝对偏差:")
+    for name in PARAMETER_NAMES:
+        deviations = [abs(result.parameters[name].value - stacked[path]['parameters'][name]['value'])
+                      for path, result in full.items() if stacked[path]['status'] == 'success']
+        print(f"  {name:<12}{np.mean(deviations):>8.2f}")
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+基准测试用的固定图片语料
+合成图片由固定随机种子生成 (渐变 + 色块 + 纹理 + 噪声)，
+在任何机器上都得到完全相同的像素，保证不同版本的测试结果可比
+"""
+import os
+from typing import Iterator, List, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# (名称, 宽, 高, 随机种子)
+FIXED_CORPUS = [
+    ('synthetic_1mp', 1280, 800, 1),
+    ('synthetic_4mp', 2448, 1632, 2),
+    ('synthetic_12mp', 4032, 3024, 3),
+]
+
+# 仓库内附带的真实照片
+_SAMPLE_IMAGE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'frontend', 'public', 'images'
+)
+
+def make_synthetic_image(width: int, height: int, seed: int) -> np.ndarray:
+    """生成类照片的RGB图片 (uint8, H x W x 3)"""
+    rng = np.random.default_rng(seed)
+
+    # 平滑渐变背景
+    y = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+    x = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :]
+    base = np.empty((height, width, 3), dtype=np.float32)
+    for c in range(3):
+        a, b, phase = rng.uniform(0.2, 1.0, size=3)
+        base[:, :, c] = 255 * (0.5 + 0.25 * np.sin(2 * np.pi * (a * x + b * y + phase)))
+
+    image = base.astype(np.uint8)
+
+    # 随机色块和线条模拟物体边缘
+    for _ in range(40):
+        color = tuple(int(v) for v in rng.integers(0, 256, size=3))
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        radius = int(rng.integers(min(width, height) // 40, min(width, height) // 6))
+        cv2.circle(image, center, radius, color, thickness=-1, lineType=cv2.LINE_AA)
+    for _ in range(60):
+        color = tuple(int(v) for v in rng.integers(0, 256, size=3))
+        p1 = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        p2 = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.line(image, p1, p2, color, thickness=int(rng.integers(1, 6)), lineType=cv2.LINE_AA)
+
+    # 轻微模糊 + 传感器噪声
+    image = cv2.GaussianBlur(image, (0, 0), 1.2)
+    noise = rng.normal(0, 4, size=image.shape).astype(np.float32)
+    return np.clip(image.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+
+def load_sample_images() -> List[Tuple[str, np.ndarray]]:
+    """读取仓库内附带的真实照片 (RGB)"""
+    samples = []
+    if os.path.isdir(_SAMPLE_IMAGE_DIR):
+        for filename in sorted(os.listdir(_SAMPLE_IMAGE_DIR)):
+            if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
+                path = os.path.join(_SAMPLE_IMAGE_DIR, filename)
+                samples.append((os.path.splitext(filename)[0], np.array(Image.open(path).convert('RGB'))))
+    return samples
+
+def iter_corpus(include_samples: bool = True) -> Iterator[Tuple[str, np.ndarray]]:
+    """按固定顺序产出 (名称, RGB数组)"""
+    if include_samples:
+        yield from load_sample_images()
+    for name, width, height, seed in FIXED_CORPUS:
+        yield name, make_synthetic_image(width, height, seed)
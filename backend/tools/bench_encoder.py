@@ -0,0 +1,57 @@
+"""
+输出编码配置基准测试
+在固定语料上测量每种编码配置/输出格式的编码耗时与文件体积
+
+用法:
+    python -m backend.tools.bench_encoder [--repeat 5]
+"""
+import argparse
+import io
+import statistics
+import sys
+import time
+
+from PIL import Image
+
+from ..utils.constants import ENCODER_PROFILES, OUTPUT_FORMATS
+from ..utils.image_encoder import encode_image
+from .bench_corpus import iter_corpus
+
+def bench_encode(image: Image.Image, profile: str, output_format: str, repeat: int):
+    """返回 (中位耗时ms, 编码字节数)"""
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        encode_image(image, buffer, profile, output_format)
+        timings.append((time.perf_counter() - start) * 1000)
+        size = buffer.tell()
+    return statistics.median(timings), size
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="编码配置速度/体积基准测试")
+    parser.add_argument('--repeat', type=int, default=5, help="每个组合重复次数")
+    parser.add_argument('--no-samples', action='store_true', help="只使用合成图片")
+    args = parser.parse_args(argv)
+
+    header = f"{'image':<18}{'format':<8}{'profile':<10}{'time_ms':>10}{'size_kb':>10}{'vs_balanced':>13}"
+    print(header)
+    print('-' * len(header))
+
+    for name, pixels in iter_corpus(include_samples=not args.no_samples):
+        image = Image.fromarray(pixels)
+        for output_format in OUTPUT_FORMATS:
+            results = {
+                profile: bench_encode(image, profile, output_format, args.repeat)
+                for profile in ENCODER_PROFILES
+            }
+            baseline_ms = results['balanced'][0]
+            for profile, (elapsed_ms, size) in results.items():
+                print(f"{name:<18}{output_format:<8}{profile:<10}{elapsed_ms:>10.1f}"
+                      f"{size / 1024:>10.1f}{elapsed_ms / baseline_ms:>12.2f}x")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
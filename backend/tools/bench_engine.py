@@ -0,0 +1,69 @@
+"""
+滤镜引擎基准测试
+按阶段统计滤镜引擎各语义模式的耗时，并与各入口的原实现 (基线提交中的代码，见 backend/tests/legacy_filters.py) 对比；
+与原实现的逐像素一致性由 backend/tests/test_filter_parity.py 校验
+
+用法 (在仓库根目录):
+    python -m backend.tools.bench_engine [--repeat 3] [--no-samples]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from ..engine import filters as engine
+from ..tests.legacy_filters import LEGACY_FILTERS
+from .bench_corpus import iter_corpus
+
+# 覆盖全部阶段的参数组合 (opencv语义中的色调为OpenCV的H单位)
+STAGE_PARAMETERS = {
+    'pillow': {'brightness': 10, 'contrast': 20, 'saturation': 15, 'temperature': 100,
+               'hue': 20, 'shadow': 30, 'highlight': -20, 'sharpness': 40},
+    'opencv': {'brightness': 10, 'contrast': 20, 'saturation': 15, 'hue': 10, 'sharpness': 40},
+    'opencv_basic': {'brightness': 10, 'contrast': 20, 'saturation': 15},
+}
+
+# ========== 基准 ==========
+
+def bench(func, repeat: int) -> float:
+    """返回中位耗时(ms)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def report_stage_costs(corpus, repeat: int) -> None:
+    """各语义模式逐阶段耗时 (查表阶段合并前)"""
+    for semantics, params in STAGE_PARAMETERS.items():
+        print(f"\n[{semantics}]")
+        header = f"{'image':<18}" + ''.join(
+            f"{stage.name:>18}" for stage in engine.build_filter_stages(params, semantics)
+        ) + f"{'engine_total':>14}{'legacy_total':>14}"
+        print(header)
+        print('-' * len(header))
+
+        for name, pixels in corpus:
+            stages = engine.build_filter_stages(params, semantics)
+            if any(stage.needs_mean for stage in stages):
+                stages = [stage.with_mean(engine.pil_gray_mean(pixels)) if stage.needs_mean else stage
+                          for stage in stages]
+            costs = ''.join(f"{bench(lambda: stage(pixels), repeat):>18.1f}" for stage in stages)
+            total = bench(lambda: engine.apply_filter_parameters(pixels, params, semantics), repeat)
+            legacy = bench(lambda: LEGACY_FILTERS[semantics](pixels, params), repeat)
+            print(f"{name:<18}{costs}{total:>14.1f}{legacy:>14.1f}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="滤镜引擎基准测试")
+    parser.add_argument('--repeat', type=int, default=3, help="每项耗时重复次数")
+    parser.add_argument('--no-samples', action='store_true', help="只使用合成图片")
+    args = parser.parse_args(argv)
+
+    corpus = list(iter_corpus(include_samples=not args.no_samples))
+
+    report_stage_costs(corpus, args.repeat)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+滤镜处理基准测试
+对比逐图单线程处理与条带并行处理的耗时，并校验两者输出逐像素一致
+
+用法:
+    python -m backend.tools.bench_filters [--strip-workers 8] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from ..models.parameter import FilterParameter
+from ..services.filter_generator import FilterGenerator
+from ..utils.strips import StripExecutor
+from .bench_corpus import iter_corpus
+
+# 覆盖全部滤镜阶段的参数组合
+BENCH_PARAMETERS = {
+    'brightness': 10, 'contrast': 20, 'saturation': 15, 'temperature': 100,
+    'hue': 20, 'shadow': 30, 'highlight': -20, 'sharpness': 40
+}
+
+def bench(func, repeat: int) -> float:
+    """返回中位耗时(ms)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="滤镜条带并行基准测试")
+    parser.add_argument('--strip-workers', type=int, default=os.cpu_count() or 1, help="条带线程数")
+    parser.add_argument('--repeat', type=int, default=3, help="每种模式重复次数")
+    parser.add_argument('--no-samples', action='store_true', help="只使用合成图片")
+    args = parser.parse_args(argv)
+
+    if args.strip_workers < 2:
+        print("条带线程数需大于1", file=sys.stderr)
+        return 1
+
+    parameters = FilterParameter.from_dict(BENCH_PARAMETERS)
+    sequential = FilterGenerator()
+    parallel = FilterGenerator(StripExecutor(args.strip_workers))
+
+    header = f"{'image':<18}{'sequential_ms':>15}{'strips_ms':>12}{'speedup':>10}{'identical':>11}"
+    print(header)
+    print('-' * len(header))
+
+    mismatched = 0
+    for name, pixels in iter_corpus(include_samples=not args.no_samples):
+        image = Image.fromarray(pixels)
+
+        expected = np.asarray(sequential.apply_filters(image, parameters))
+        sequential_ms = bench(lambda: sequential.apply_filters(image, parameters), args.repeat)
+
+        identical = np.array_equal(expected, np.asarray(parallel.apply_filters(image, parameters)))
+        mismatched += not identical
+        strips_ms = bench(lambda: parallel.apply_filters(image, parameters), args.repeat)
+
+        print(f"{name:<18}{sequential_ms:>15.1f}{strips_ms:>12.1f}"
+              f"{sequential_ms / strips_ms:>9.2f}x{str(identical):>11}")
+
+    return 1 if mismatched else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
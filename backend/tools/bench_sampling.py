@@ -0,0 +1,76 @@
+"""
+抽样分析引擎基准测试
+对比基础引擎整图计算与 SampledImageAnalyzer: 耗时、各参数的绝对误差、
+整图值是否落在置信区间内，以及显著变化的判定是否一致
+
+用法:
+    python -m backend.tools.bench_sampling [--repeat 3] [--no-samples] [--sample-size 40000]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import cv2
+
+from ..services.image_analyzer import ImageAnalyzer
+from ..services.sampled_analyzer import SampledImageAnalyzer
+from ..utils.constants import ANALYSIS_THRESHOLDS, PARAMETER_NAMES
+from .bench_corpus import iter_corpus, make_synthetic_image
+
+def bench(func, repeat: int) -> float:
+    """返回中位耗时(ms)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="抽样分析引擎基准测试")
+    parser.add_argument('--repeat', type=int, default=3, help="每种实现重复次数")
+    parser.add_argument('--no-samples', action='store_true', help="只使用合成图片")
+    parser.add_argument('--sample-size', type=int, default=None, help="覆盖默认抽样像素数")
+    args = parser.parse_args(argv)
+
+    basic = ImageAnalyzer()
+    sampling = {'sample_size': args.sample_size} if args.sample_size else None
+    sampled = SampledImageAnalyzer(sampling=sampling)
+    threshold = ANALYSIS_THRESHOLDS['min_change_threshold']
+
+    corpus = list(iter_corpus(include_samples=not args.no_samples))
+    corpus.append(('synthetic_25mp', make_synthetic_image(6144, 4096, 4)))
+
+    header = (f"{'image':<18}{'full_ms':>10}{'sampled_ms':>12}{'max_abs_err':>13}"
+              f"{'covered':>10}{'exact':>7}{'same_signif':>13}")
+    print(header)
+    print('-' * len(header))
+
+    misclassified = 0
+    for name, pixels in corpus:
+        image_bgr = cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+        full = basic.analyze_pixels(image_bgr)
+        estimate = sampled.analyze_pixels(image_bgr)
+
+        errors, covered, exact, same = [], 0, 0, True
+        for key in PARAMETER_NAMES:
+            truth, value = full.parameters[key], estimate.parameters[key]
+            errors.append(abs(truth.value - value.value))
+            if value.confidence_interval is None:
+                exact += 1
+            else:
+                low, high = value.confidence_interval
+                covered += low <= truth.value <= high
+            same &= (truth.value >= threshold) == (value.value >= threshold)
+        misclassified += not same
+
+        full_ms = bench(lambda: basic.analyze_pixels(image_bgr), args.repeat)
+        sampled_ms = bench(lambda: sampled.analyze_pixels(image_bgr), args.repeat)
+        print(f"{name:<18}{full_ms:>10.1f}{sampled_ms:>12.1f}{max(errors):>13.3f}"
+              f"{f'{covered}/{len(PARAMETER_NAMES) - exact}':>10}{exact:>7}{str(same):>13}")
+
+    return 1 if misclassified else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+存储后端联调检查
+对配置的存储后端依次执行 put / head / get_stream / list / delete，
+并对比读穿透缓存未命中与命中时的读取耗时
+
+S3后端可以指向本地替身联调，例如:
+    minio server /tmp/minio-data                     # 或 moto_server -p 9000
+    STORAGE_BACKEND=s3 S3_BUCKET=filter-parser S3_ENDPOINT_URL=http://127.0.0.1:9000 \\
+        python -m backend.tools.check_storage --create-bucket
+
+用法:
+    python -m backend.tools.check_storage [--namespace uploads] [--size-kb 512]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from ..config import Config
+from ..utils.constants import STORAGE_NAMESPACES
+from ..utils.file_manager import generate_image_id
+from ..utils.storage import get_storage
+
+def run_checks(storage, size_kb: int) -> dict:
+    """执行一轮完整的读写检查，返回各步骤结果与耗时(ms)"""
+    image_id = f"storagecheck_{generate_image_id()}"
+    payload = os.urandom(size_kb * 1024)
+    report = {'backend': type(storage.backend).__name__, 'namespace': storage.namespace}
+
+    def timed(name, func):
+        start = time.perf_counter()
+        result = func()
+        report[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+    path = storage.new_path(image_id)
+    with open(path, 'wb') as f:
+        f.write(payload)
+    key = storage.key_of(path)
+
+    timed('put', lambda: storage.register(path))
+
+    info = timed('head', lambda: storage.backend.head(key))
+    report['head_ok'] = info is not None and info.size == len(payload)
+
+    data = timed('get_stream', lambda: b''.join(storage.backend.get_stream(key)))
+    report['get_ok'] = data == payload
+
+    listed = timed('list', lambda: [obj.key for obj in storage.backend.list(key.rsplit('/', 1)[0] + '/')])
+    report['list_ok'] = key in listed
+
+    if storage.cache is not None:
+        storage.cache.discard(key)
+        miss_path = timed('cache_miss', lambda: storage.resolve(image_id))
+        hit_path = timed('cache_hit', lambda: storage.resolve(image_id))
+        report['cache_ok'] = miss_path == hit_path and miss_path is not None
+        with open(hit_path, 'rb') as f:
+            report['cache_ok'] = report['cache_ok'] and f.read() == payload
+
+    timed('delete', lambda: storage.delete(key))
+    report['delete_ok'] = storage.backend.head(key) is None and storage.resolve(image_id) is None
+
+    report['ok'] = all(value for name, value in report.items() if name.endswith('_ok'))
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="存储后端读写检查")
+    parser.add_argument('--namespace', choices=sorted(STORAGE_NAMESPACES), default='uploads')
+    parser.add_argument('--size-kb', type=int, default=512, help="测试对象大小(KB)")
+    parser.add_argument('--create-bucket', action='store_true', help="S3后端时先创建存储桶 (用于本地替身)")
+    args = parser.parse_args(argv)
+
+    config = dict(vars(Config))
+    if config['STORAGE_BACKEND'] == 'local':
+        # 本地后端检查在临时目录中进行，不触碰真实数据
+        temp_dir = tempfile.mkdtemp(prefix='storage_check_')
+        config[STORAGE_NAMESPACES[args.namespace]] = temp_dir
+
+    storage = get_storage(args.namespace, config)
+    if args.create_bucket and storage.cache is not None:
+        client = storage.backend.client
+        existing = [bucket['Name'] for bucket in client.list_buckets().get('Buckets', [])]
+        if storage.backend.bucket not in existing:
+            client.create_bucket(Bucket=storage.backend.bucket)
+
+    report = run_checks(storage, args.size_kb)
+    print(json.dumps(report, ensure_ascii=False))
+    return 0 if report['ok'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+存储布局迁移工具
+把旧的平铺布局 {folder}/{image_id}.jpg 在线迁移到分片布局 {folder}/ab/cd/{image_id}.jpg
+
+迁移过程中服务无需停机: 每个文件通过同一文件系统内的原子重命名移动，
+读取方先查分片路径再查平铺路径，任何时刻都能找到文件；过期索引中的键同步更新
+
+用法:
+    python -m backend.tools.migrate_storage [--namespace uploads] [--batch-size 500] [--pause 0.5]
+    python -m backend.tools.migrate_storage --dry-run
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+
+from ..config import Config
+from ..utils.constants import STORAGE_NAMESPACES
+from ..utils.expiry_index import configure_expiry_index
+from ..utils.storage import get_storage
+
+def migrate_namespace(namespace: str, batch_size: int = 500, pause: float = 0.0,
+                      dry_run: bool = False) -> dict:
+    """
+    迁移一个命名空间下的全部平铺文件
+
+    Args:
+        batch_size: 每批移动的文件数，批之间暂停pause秒以限制对线上IO的影响
+        dry_run: 只统计不移动
+
+    Returns:
+        {'migrated': n, 'skipped': n, 'failed': n}
+    """
+    storage = get_storage(namespace, vars(Config))
+    stats = {'migrated': 0, 'skipped': 0, 'failed': 0}
+
+    legacy_files = storage.iter_legacy_files()
+    while True:
+        batch = list(itertools.islice(legacy_files, batch_size))
+        if not batch:
+            break
+
+        for filename in batch:
+            if dry_run:
+                stats['migrated'] += 1
+                continue
+            try:
+                if storage.migrate_legacy_file(filename) is None:
+                    stats['skipped'] += 1
+                else:
+                    stats['migrated'] += 1
+            except FileNotFoundError:
+                stats['skipped'] += 1  # 已被清理任务删除
+            except OSError as e:
+                stats['failed'] += 1
+                print(f"迁移失败 {namespace}/{filename}: {e}", file=sys.stderr)
+
+        if pause > 0:
+            time.sleep(pause)
+
+    return stats
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="把平铺存储迁移到分片目录布局")
+    parser.add_argument('--namespace', choices=sorted(STORAGE_NAMESPACES), action='append',
+                        help="要迁移的命名空间，可重复，默认全部")
+    parser.add_argument('--batch-size', type=int, default=500, help="每批移动的文件数")
+    parser.add_argument('--pause', type=float, default=0.0, help="批之间暂停的秒数")
+    parser.add_argument('--dry-run', action='store_true', help="只统计待迁移文件，不移动")
+    parser.add_argument('--no-index', action='store_true', help="不更新过期索引")
+    args = parser.parse_args(argv)
+
+    if not args.no_index and not args.dry_run:
+        configure_expiry_index(Config.EXPIRY_INDEX_PATH)
+
+    failed = 0
+    for namespace in args.namespace or sorted(STORAGE_NAMESPACES):
+        stats = migrate_namespace(namespace, args.batch_size, args.pause, args.dry_run)
+        failed += stats['failed']
+        print(json.dumps({'namespace': namespace, 'dry_run': args.dry_run, **stats}))
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,36 @@
 # utils/__init__.py
-from .validation import ValidationError, allowed_file, validate_image_file, validate_parameter_name, validate_filter_parameters
-from .file_manager import generate_image_id, get_file_path, save_uploaded_image, cleanup_old_files, get_folder_size, list_temp_files
+from .validation import ValidationError, allowed_file, validate_image_file, validate_parameter_name, validate_filter_parameters, \
+    normalize_analysis_parameters
+from .file_manager import generate_image_id, get_file_path, decode_uploaded_image, downscale_to_fit, save_uploaded_image, \
+    save_image_async, cleanup_old_files, get_folder_size, list_temp_files
+from .expiry_index import ExpiryIndex, configure_expiry_index, get_expiry_index
+from .storage import ImageStorage, get_storage, as_storage, is_valid_image_id, shard_key
+from .pixel_cache import PixelCache, configure_pixel_cache, get_pixel_cache, load_rgb_image
+from .shared_frames import SharedFrame, SharedFrameArena, attach_frame
+from .strips import StripExecutor, configure_strip_parallelism, get_strip_executor, plan_strips
+from .metric_pool import configure_metric_pool, get_metric_pool, evaluate_metrics
+from .bulk_reader import iter_upload_entries
+from .upload_sessions import UploadSession, UploadSessionStore, UploadOffsetMismatch, configure_upload_sessions, \
+    get_upload_sessions
+from .single_flight import SingleFlight, configure_single_flight, get_single_flight, coalesce, content_digest
+from .storage_backends import ObjectInfo, StorageBackend, LocalBackend, S3Backend, ReadThroughCache
 from .constants import *
 
 __all__ = [
     'ValidationError', 'allowed_file', 'validate_image_file', 'validate_parameter_name', 'validate_filter_parameters',
-    'generate_image_id', 'get_file_path', 'save_uploaded_image', 'cleanup_old_files', 'get_folder_size', 'list_temp_files',
+    'normalize_analysis_parameters',
+    'generate_image_id', 'get_file_path', 'decode_uploaded_image', 'downscale_to_fit', 'save_uploaded_image', 'save_image_async', 'cleanup_old_files', 'get_folder_size', 'list_temp_files',
+    'ExpiryIndex', 'configure_expiry_index', 'get_expiry_index',
+    'ImageStorage', 'get_storage', 'as_storage', 'is_valid_image_id', 'shard_key',
+    'PixelCache', 'configure_pixel_cache', 'get_pixel_cache', 'load_rgb_image',
+    'SharedFrame', 'SharedFrameArena', 'attach_frame',
+    'StripExecutor', 'configure_strip_parallelism', 'get_strip_executor', 'plan_strips',
+    'configure_metric_pool', 'get_metric_pool', 'evaluate_metrics',
+    'iter_upload_entries',
+    'UploadSession', 'UploadSessionStore', 'UploadOffsetMismatch', 'configure_upload_sessions', 'get_upload_sessions',
+    'SingleFlight', 'configure_single_flight', 'get_single_flight', 'coalesce', 'content_digest',
+    'ObjectInfo', 'StorageBackend', 'LocalBackend', 'S3Backend', 'ReadThroughCache',
     'PARAMETER_NAMES', 'PARAMETER_UNITS', 'PARAMETER_REFERENCES', 'DIRECTION_MAPPING',
-    'ANALYSIS_THRESHOLDS', 'IMAGE_PROCESSING', 'ERROR_MESSAGES', 'SUCCESS_MESSAGES'
+    'ANALYSIS_THRESHOLDS', 'ANALYSIS_SAMPLING', 'IMAGE_PROCESSING', 'STORAGE_NAMESPACES', 'STORAGE_LAYOUT', 'ENCODER_PROFILES', 'OUTPUT_FORMATS',
+    'BATCH_PROCESSING', 'BATCH_ANALYSIS', 'BULK_UPLOAD', 'RESUMABLE_UPLOAD', 'ERROR_MESSAGES', 'SUCCESS_MESSAGES'
 ]
\ No newline at end of file
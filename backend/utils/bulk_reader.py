@@ -0,0 +1,116 @@
+"""
+批量上传请求体的增量读取
+multipart 请求体或 tar 流边读边拆分为单个文件，每个文件读完即交给下游，
+不会把整个请求体读入内存；zip 的目录位于文件末尾，需先落到临时文件(超过阈值写磁盘)再逐个读取
+"""
+import os
+import tarfile
+import tempfile
+import zipfile
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
+
+from .validation import ValidationError
+
+# 单个条目: (文件名, 文件内容或该文件的错误)
+UploadEntry = Tuple[str, Union[bytes, Exception]]
+
+TAR_CONTENT_TYPES = {'application/x-tar', 'application/tar', 'application/gzip',
+                     'application/x-gzip', 'application/x-gtar'}
+ZIP_CONTENT_TYPES = {'application/zip', 'application/x-zip-compressed'}
+
+def _oversize_error(filename: str, max_file_bytes: int) -> ValidationError:
+    return ValidationError(f"文件 {filename} 超过单个文件大小限制 ({max_file_bytes // 1024 // 1024}MB)")
+
+def iter_multipart_files(stream: BinaryIO, boundary: str, max_file_bytes: int,
+                         chunk_size: int = 64 * 1024) -> Iterator[UploadEntry]:
+    """
+    增量解析 multipart/form-data，产出其中的每个文件 (普通表单字段被忽略)
+
+    超过 max_file_bytes 的文件丢弃其余数据并产出错误，不影响后续文件
+    """
+    decoder = MultipartDecoder(boundary.encode('latin-1'))
+    filename: Optional[str] = None
+    buffer: Optional[bytearray] = None
+    oversize = False
+
+    while True:
+        chunk = stream.read(chunk_size)
+        decoder.receive_data(chunk or None)
+
+        event = decoder.next_event()
+        while not isinstance(event, (NeedData, Epilogue)):
+            if isinstance(event, File):
+                filename, buffer, oversize = event.filename or '', bytearray(), False
+            elif isinstance(event, Data) and buffer is not None:
+                if not oversize:
+                    buffer += event.data
+                    if len(buffer) > max_file_bytes:
+                        oversize, buffer[:] = True, b''
+                if not event.more_data:
+                    yield filename, _oversize_error(filename, max_file_bytes) if oversize else bytes(buffer)
+                    filename, buffer = None, None
+            event = decoder.next_event()
+
+        if isinstance(event, Epilogue) or not chunk:
+            return
+
+def iter_tar_files(stream: BinaryIO, max_file_bytes: int) -> Iterator[UploadEntry]:
+    """顺序读取 tar 流 (可为 gzip/bz2/xz 压缩) 中的普通文件"""
+    with tarfile.open(fileobj=stream, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            if member.size > max_file_bytes:
+                yield member.name, _oversize_error(member.name, max_file_bytes)
+                continue
+            handle = archive.extractfile(member)
+            yield member.name, handle.read() if handle is not None else b''
+
+def iter_zip_files(stream: BinaryIO, max_file_bytes: int, spool_bytes: int,
+                   chunk_size: int = 64 * 1024) -> Iterator[UploadEntry]:
+    """zip 先写入临时文件 (超过 spool_bytes 后落盘)，再逐个读取其中的普通文件"""
+    with tempfile.SpooledTemporaryFile(max_size=spool_bytes) as spool:
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            spool.write(chunk)
+        spool.seek(0)
+
+        with zipfile.ZipFile(spool) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if info.file_size > max_file_bytes:
+                    yield info.filename, _oversize_error(info.filename, max_file_bytes)
+                    continue
+                with archive.open(info) as handle:
+                    # 不信任目录中登记的大小，解压时同样限制
+                    data = handle.read(max_file_bytes + 1)
+                if len(data) > max_file_bytes:
+                    yield info.filename, _oversize_error(info.filename, max_file_bytes)
+                    continue
+                yield info.filename, data
+
+def iter_upload_entries(stream: BinaryIO, content_type: str, max_file_bytes: int,
+                        spool_bytes: int, chunk_size: int = 64 * 1024) -> Iterator[UploadEntry]:
+    """
+    按请求的 Content-Type 选择读取方式，产出 (文件名, 内容或错误)
+
+    Raises:
+        ValidationError: 不支持的请求格式
+    """
+    mimetype, options = parse_options_header(content_type or '')
+    if mimetype == 'multipart/form-data':
+        if not options.get('boundary'):
+            raise ValidationError("multipart 请求缺少 boundary")
+        return iter_multipart_files(stream, options['boundary'], max_file_bytes, chunk_size)
+    if mimetype in TAR_CONTENT_TYPES:
+        return iter_tar_files(stream, max_file_bytes)
+    if mimetype in ZIP_CONTENT_TYPES:
+        return iter_zip_files(stream, max_file_bytes, spool_bytes, chunk_size)
+    raise ValidationError(f"不支持的批量上传格式: {mimetype or '未指定'}")
+
+def entry_basename(name: str) -> str:
+    """归档中的路径 -> 用于扩展名检查的文件名"""
+    return os.path.basename(name.replace('\\', '/'))
@@ -55,6 +55,16 @@ ANALYSIS_THRESHOLDS = {
     'max_analysis_time': 30,  # 最大分析时间(秒)
 }
 
+# 抽样分析 (sampled 引擎)
+ANALYSIS_SAMPLING = {
+    'sample_size': 40000,  # 分层抽样的像素数
+    'grid': 16,  # 分层网格 (grid x grid)
+    'seed': 0,  # 抽样随机种子，保证同一张图片的结果可复现
+    'confidence_z': 1.96,  # 置信区间的正态分位数 (95%)
+    'min_region_samples': 30,  # 阴影/高光区域内样本少于此数时改为整图计算
+    'min_pixels_ratio': 25,  # 像素数不足 sample_size 的该倍数(默认约1MP)时直接整图计算，小图整图计算并不更慢
+}
+
 # 图像处理常量
 IMAGE_PROCESSING = {
     'default_quality': 85,
@@ -63,6 +73,63 @@ IMAGE_PROCESSING = {
     'default_format': 'JPEG'
 }
 
+# 存储命名空间 -> 对应目录的配置项
+STORAGE_NAMESPACES = {
+    'uploads': 'UPLOAD_FOLDER',
+    'outputs': 'OUTPUT_FOLDER'
+}
+
+# 分片目录布局: 两级、每级两位十六进制 -> {root}/ab/cd/{image_id}.jpg
+STORAGE_LAYOUT = {
+    'shard_depth': 2,
+    'shard_width': 2
+}
+
+# 输出编码配置
+# fast: 跳过Huffman优化，编码最快；balanced: 与历史默认行为一致；smallest: 体积最小
+ENCODER_PROFILES = {
+    'fast': {'quality': 85, 'optimize': False, 'progressive': False, 'subsampling': '4:2:0', 'webp_method': 0},
+    'balanced': {'quality': 85, 'optimize': True, 'progressive': False, 'subsampling': '4:2:0', 'webp_method': 4},
+    'smallest': {'quality': 75, 'optimize': True, 'progressive': True, 'subsampling': '4:2:0', 'webp_method': 6}
+}
+
+OUTPUT_FORMATS = {
+    'jpeg': {'pil_format': 'JPEG', 'extension': 'jpg', 'mimetype': 'image/jpeg'},
+    'webp': {'pil_format': 'WEBP', 'extension': 'webp', 'mimetype': 'image/webp'}
+}
+
+# 批量滤镜生成流水线配置
+BATCH_PROCESSING = {
+    'max_images': 500,  # 单次批量请求最多图片数
+    'queue_size': 8,  # 各阶段之间的有界队列长度
+    'decode_workers': None,  # None表示按CPU核数自动确定
+    'process_workers': None,
+    'encode_workers': None
+}
+
+# 批量上传 (multipart多文件 / tar / zip)
+BULK_UPLOAD = {
+    'max_files': 1000,  # 单次请求最多文件数
+    'max_file_bytes': 16 * 1024 * 1024,  # 单个文件大小上限
+    'read_chunk_bytes': 64 * 1024,  # 读取请求体的块大小
+    'zip_spool_bytes': 8 * 1024 * 1024,  # zip先落临时文件，超过该大小写入磁盘
+    'queue_size': 4,  # 阶段间队列长度，决定同时在内存中的文件数
+    'validate_workers': None,  # None表示按CPU核数自动确定
+    'normalize_workers': None
+}
+
+# 可续传的分块上传
+RESUMABLE_UPLOAD = {
+    'chunk_bytes': 4 * 1024 * 1024  # 建议客户端使用的分块大小 (需小于 MAX_CONTENT_LENGTH)
+}
+
+# 批量分析 (缩略图堆叠)
+BATCH_ANALYSIS = {
+    'analysis_size': (256, 256),  # 统一的分析尺寸 (宽, 高)
+    'stack_size': 64,  # 每次堆叠计算的图片数
+    'decode_workers': None  # None表示按CPU核数自动确定
+}
+
 # 错误消息
 ERROR_MESSAGES = {
     'file_too_large': '文件大小超过限制',
@@ -71,6 +138,8 @@ ERROR_MESSAGES = {
     'generation_failed': '滤镜生成失败',
     'file_not_found': '文件未找到',
     'invalid_parameters': '无效的参数',
+    'invalid_analysis_engine': '不支持的分析引擎',
+    'invalid_analysis_parameters': '无效的分析参数',
     'processing_timeout': '处理超时'
 }
 
@@ -0,0 +1,359 @@
+"""
+文件过期索引
+保存文件时把(命名空间, 文件名, 大小, 时间)写入SQLite索引，
+清理任务只需按时间/访问顺序取出到期条目，无需扫描整个目录
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows下无fcntl，退化为每个进程各自清理
+    fcntl = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stored_files (
+    namespace TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, name)
+);
+CREATE INDEX IF NOT EXISTS idx_stored_files_created ON stored_files (created_at);
+CREATE INDEX IF NOT EXISTS idx_stored_files_accessed ON stored_files (accessed_at);
+
+-- 每个命名空间的文件数与总字节数，由触发器随 stored_files 同步更新，读取为O(1)
+CREATE TABLE IF NOT EXISTS storage_counters (
+    namespace TEXT PRIMARY KEY,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TRIGGER IF NOT EXISTS trg_stored_files_insert AFTER INSERT ON stored_files
+BEGIN
+    INSERT OR IGNORE INTO storage_counters (namespace) VALUES (new.namespace);
+    UPDATE storage_counters SET file_count = file_count + 1, total_bytes = total_bytes + new.size
+    WHERE namespace = new.namespace;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_stored_files_delete AFTER DELETE ON stored_files
+BEGIN
+    UPDATE storage_counters SET file_count = file_count - 1, total_bytes = total_bytes - old.size
+    WHERE namespace = old.namespace;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_stored_files_update AFTER UPDATE OF size ON stored_files
+BEGIN
+    UPDATE storage_counters SET total_bytes = total_bytes + new.size - old.size
+    WHERE namespace = new.namespace;
+END;
+"""
+
+# 访问时间的最小更新间隔(秒)，避免每次读取都写数据库
+TOUCH_RESOLUTION = 60
+
+# 进程内记录的最近访问时间条目上限，超出时丢弃已超过更新间隔的条目
+_TOUCH_MEMO_LIMIT = 65536
+
+class ExpiryIndex:
+    """基于SQLite的文件过期索引，可被多个进程同时使用"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._touched: Dict[Tuple[str, str], float] = {}
+        self._touched_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            self._rebuild_counters(conn)
+
+    @staticmethod
+    def _rebuild_counters(conn) -> None:
+        """按现有条目重新计算计数表 (启动时与对账后执行，修正旧版本索引或中途中断留下的偏差)"""
+        conn.execute("DELETE FROM storage_counters")
+        conn.execute(
+            "INSERT INTO storage_counters (namespace, file_count, total_bytes) "
+            "SELECT namespace, COUNT(*), SUM(size) FROM stored_files GROUP BY namespace"
+        )
+
+    @contextmanager
+    def _connect(self):
+        """每个线程复用一个连接 (fork 后的子进程重新建立)，退出时提交或回滚事务"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        with conn:
+            yield conn
+
+    def _remember_touch(self, namespace: str, name: str, when: float) -> None:
+        with self._touched_lock:
+            self._touched[(namespace, name)] = when
+            if len(self._touched) > _TOUCH_MEMO_LIMIT:
+                stale = when - TOUCH_RESOLUTION
+                self._touched = {key: at for key, at in self._touched.items() if at >= stale}
+
+    def record(self, namespace: str, name: str, size: int, created_at: Optional[float] = None) -> None:
+        """登记新保存(或被覆盖)的文件"""
+        now = created_at if created_at is not None else time.time()
+        with self._connect() as conn:
+            # 使用UPSERT而非REPLACE，保证计数触发器正确区分新增与覆盖
+            conn.execute(
+                "INSERT INTO stored_files (namespace, name, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, name) DO UPDATE SET "
+                "size = excluded.size, created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (namespace, name, size, now, now)
+            )
+        self._remember_touch(namespace, name, now)
+
+    def touch(self, namespace: str, name: str) -> None:
+        """
+        更新访问时间，用于LRU淘汰
+        本进程在 TOUCH_RESOLUTION 内已更新过的文件直接跳过，读取路径上不获取数据库写锁
+        """
+        now = time.time()
+        with self._touched_lock:
+            last = self._touched.get((namespace, name))
+        if last is not None and now - last < TOUCH_RESOLUTION:
+            return
+        self._remember_touch(namespace, name, now)
+
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE stored_files SET accessed_at = ? "
+                "WHERE namespace = ? AND name = ? AND accessed_at < ?",
+                (now, namespace, name, now - TOUCH_RESOLUTION)
+            )
+
+    def remove(self, namespace: str, name: str) -> None:
+        """文件被主动删除时移除索引条目"""
+        with self._touched_lock:
+            self._touched.pop((namespace, name), None)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM stored_files WHERE namespace = ? AND name = ?", (namespace, name))
+
+    def rename(self, namespace: str, old_name: str, new_name: str) -> None:
+        """文件移动(如迁移到分片目录)后更新键，保留创建与访问时间"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE OR IGNORE stored_files SET name = ? WHERE namespace = ? AND name = ?",
+                (new_name, namespace, old_name)
+            )
+
+    def total_bytes(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(total_bytes), 0) FROM storage_counters").fetchone()[0]
+
+    def get_counters(self) -> Dict[str, Dict[str, int]]:
+        """各命名空间的文件数与字节数 (读取计数表，不扫描文件)"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT namespace, file_count, total_bytes FROM storage_counters").fetchall()
+        return {
+            namespace: {'file_count': file_count, 'total_bytes': total_bytes}
+            for namespace, file_count, total_bytes in rows
+        }
+
+    def list_files(self, namespace: str, limit: int = 100,
+                   cursor: Optional[Tuple[float, str]] = None) -> List[Tuple[str, int, float, float]]:
+        """
+        按创建时间倒序分页列出文件
+
+        Args:
+            cursor: 上一页最后一条的 (created_at, name)，None表示第一页
+
+        Returns:
+            [(name, size, created_at, accessed_at), ...]
+        """
+        with self._connect() as conn:
+            if cursor is None:
+                rows = conn.execute(
+                    "SELECT name, size, created_at, accessed_at FROM stored_files WHERE namespace = ? "
+                    "ORDER BY created_at DESC, name DESC LIMIT ?",
+                    (namespace, limit)
+                ).fetchall()
+            else:
+                created_at, name = cursor
+                rows = conn.execute(
+                    "SELECT name, size, created_at, accessed_at FROM stored_files WHERE namespace = ? "
+                    "AND (created_at < ? OR (created_at = ? AND name < ?)) "
+                    "ORDER BY created_at DESC, name DESC LIMIT ?",
+                    (namespace, created_at, created_at, name, limit)
+                ).fetchall()
+        return rows
+
+    def pop_expired(self, cutoff: float, limit: int = 500) -> List[Tuple[str, str, int]]:
+        """取出并删除创建时间早于cutoff的条目"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT namespace, name, size FROM stored_files WHERE created_at < ? "
+                "ORDER BY created_at LIMIT ?",
+                (cutoff, limit)
+            ).fetchall()
+            conn.executemany(
+                "DELETE FROM stored_files WHERE namespace = ? AND name = ?",
+                [(namespace, name) for namespace, name, _ in rows]
+            )
+        return rows
+
+    def pop_least_recently_used(self, bytes_to_free: int, limit: int = 500) -> List[Tuple[str, str, int]]:
+        """按最近访问时间从旧到新取出条目，直到累计大小达到bytes_to_free"""
+        if bytes_to_free <= 0:
+            return []
+
+        popped = []
+        freed = 0
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "SELECT namespace, name, size FROM stored_files ORDER BY accessed_at LIMIT ?",
+                (limit,)
+            )
+            for namespace, name, size in cursor:
+                popped.append((namespace, name, size))
+                freed += size
+                if freed >= bytes_to_free:
+                    break
+            conn.executemany(
+                "DELETE FROM stored_files WHERE namespace = ? AND name = ?",
+                [(namespace, name) for namespace, name, _ in popped]
+            )
+        return popped
+
+    def reconcile(self, namespace: str, objects: Iterable[Any]) -> Dict[str, int]:
+        """
+        与存储实际内容对账，修正索引外的增删 (如手动删除文件)
+        需要全量列举存储，应由后台低频执行
+
+        Args:
+            objects: 存储后端列出的对象 (带 key / size / modified 属性)
+
+        Returns:
+            {'added': n, 'removed': n, 'resized': n}
+        """
+        on_disk = {obj.key: (obj.size, obj.modified) for obj in objects}
+
+        with self._connect() as conn:
+            indexed = {
+                name: size for name, size in conn.execute(
+                    "SELECT name, size FROM stored_files WHERE namespace = ?", (namespace,)
+                )
+            }
+
+            missing = [(namespace, name) for name in indexed if name not in on_disk]
+            added = [
+                (namespace, name, size, mtime, mtime)
+                for name, (size, mtime) in on_disk.items() if name not in indexed
+            ]
+            resized = [
+                (size, namespace, name)
+                for name, (size, _) in on_disk.items() if name in indexed and indexed[name] != size
+            ]
+
+            conn.executemany("DELETE FROM stored_files WHERE namespace = ? AND name = ?", missing)
+            conn.executemany(
+                "INSERT OR IGNORE INTO stored_files (namespace, name, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                added
+            )
+            conn.executemany("UPDATE stored_files SET size = ? WHERE namespace = ? AND name = ?", resized)
+            self._rebuild_counters(conn)
+
+        return {'added': len(added), 'removed': len(missing), 'resized': len(resized)}
+
+class CleanerLock:
+    """
+    清理进程选举
+    多个Web进程中只有成功获取文件锁的一个执行清理；持锁进程退出后锁自动释放，
+    其他进程在下一轮重新竞选
+    """
+
+    def __init__(self, lock_path: str):
+        self.lock_path = lock_path
+        self._fd = None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            return True
+
+        fd = os.open(self.lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None or fcntl is None
+
+def expire_files(index: ExpiryIndex, storages: Dict[str, Any], max_age_hours: float,
+                 quota_bytes: Optional[int] = None) -> Dict[str, int]:
+    """
+    按索引清理过期文件，并在超出容量配额时按LRU淘汰
+
+    Args:
+        index: 过期索引
+        storages: 命名空间 -> 存储 (提供 delete(key) 方法)
+        max_age_hours: 最长保留时间
+        quota_bytes: 容量配额，None表示不限制
+
+    Returns:
+        各命名空间被删除的文件数
+    """
+    removed = {namespace: 0 for namespace in storages}
+
+    def delete(entries):
+        for namespace, name, _ in entries:
+            storage = storages.get(namespace)
+            if storage is None:
+                continue
+            try:
+                if storage.delete(name):
+                    removed[namespace] += 1
+            except Exception:
+                continue  # 文件可能已被删除或无权限
+
+    cutoff = time.time() - max_age_hours * 3600
+    while True:
+        expired = index.pop_expired(cutoff)
+        delete(expired)
+        if len(expired) == 0:
+            break
+
+    if quota_bytes is not None:
+        while True:
+            overflow = index.total_bytes() - quota_bytes
+            if overflow <= 0:
+                break
+            evicted = index.pop_least_recently_used(overflow)
+            if not evicted:
+                break
+            delete(evicted)
+
+    return removed
+
+# 进程内共享的索引实例，由应用启动时配置
+_active_index: Optional[ExpiryIndex] = None
+_active_lock = threading.Lock()
+
+def configure_expiry_index(db_path: Optional[str]) -> Optional[ExpiryIndex]:
+    """配置进程内使用的过期索引，db_path为None时关闭索引"""
+    global _active_index
+    with _active_lock:
+        _active_index = ExpiryIndex(db_path) if db_path else None
+    return _active_index
+
+def get_expiry_index() -> Optional[ExpiryIndex]:
+    return _active_index
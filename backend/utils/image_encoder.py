@@ -0,0 +1,178 @@
+"""
+图片编码工具
+按编码配置(fast/balanced/smallest)和输出格式(JPEG/WebP)保存图片，
+或直接以数据块形式流式输出
+"""
+import queue
+import threading
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+import cv2
+from PIL import Image
+
+from .constants import ENCODER_PROFILES, OUTPUT_FORMATS
+
+DEFAULT_ENCODER_PROFILE = 'balanced'
+DEFAULT_OUTPUT_FORMAT = 'jpeg'
+
+def normalize_output_format(output_format: str) -> str:
+    """规范化输出格式名称 (jpg -> jpeg)"""
+    output_format = (output_format or DEFAULT_OUTPUT_FORMAT).lower()
+    if output_format == 'jpg':
+        output_format = 'jpeg'
+    return output_format
+
+def validate_encoder_options(profile: str, output_format: str) -> bool:
+    """验证编码配置与输出格式"""
+    return (profile or DEFAULT_ENCODER_PROFILE) in ENCODER_PROFILES and \
+        normalize_output_format(output_format) in OUTPUT_FORMATS
+
+def get_encoder_options(profile: str = DEFAULT_ENCODER_PROFILE,
+                        output_format: str = DEFAULT_OUTPUT_FORMAT) -> Tuple[str, Dict[str, Any]]:
+    """
+    解析编码配置
+
+    Returns:
+        (PIL格式名, Image.save关键字参数)
+    """
+    profile = profile or DEFAULT_ENCODER_PROFILE
+    output_format = normalize_output_format(output_format)
+
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(f"未知的编码配置: {profile}")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {output_format}")
+
+    settings = ENCODER_PROFILES[profile]
+    pil_format = OUTPUT_FORMATS[output_format]['pil_format']
+
+    if pil_format == 'WEBP':
+        options = {
+            'quality': settings['quality'],
+            'method': settings['webp_method']
+        }
+    else:
+        options = {
+            'quality': settings['quality'],
+            'optimize': settings['optimize'],
+            'progressive': settings['progressive'],
+            'subsampling': settings['subsampling']
+        }
+
+    return pil_format, options
+
+# PIL的色度抽样写法 -> OpenCV的抽样常量
+_CV2_SAMPLING_FACTORS = {
+    '4:2:0': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+    '4:2:2': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+    '4:4:4': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444
+}
+
+# 未指定编码配置时 cv2.imencode 使用的JPEG参数 (沿用质量95的原有输出)
+DEFAULT_CV2_JPEG_QUALITY = 95
+
+def cv2_jpeg_params(profile: Optional[str] = None) -> List[int]:
+    """
+    编码配置 -> cv2.imencode 的JPEG参数列表，与 get_encoder_options 共用 ENCODER_PROFILES
+
+    Args:
+        profile: 编码配置名，None或未知配置时只设置默认质量
+    """
+    settings = ENCODER_PROFILES.get(profile) if profile else None
+    if settings is None:
+        return [int(cv2.IMWRITE_JPEG_QUALITY), DEFAULT_CV2_JPEG_QUALITY]
+    return [
+        int(cv2.IMWRITE_JPEG_QUALITY), settings['quality'],
+        int(cv2.IMWRITE_JPEG_OPTIMIZE), int(settings['optimize']),
+        int(cv2.IMWRITE_JPEG_PROGRESSIVE), int(settings['progressive']),
+        int(cv2.IMWRITE_JPEG_SAMPLING_FACTOR), int(_CV2_SAMPLING_FACTORS[settings['subsampling']])
+    ]
+
+def get_output_extension(output_format: str = DEFAULT_OUTPUT_FORMAT) -> str:
+    """输出格式对应的文件扩展名"""
+    return OUTPUT_FORMATS[normalize_output_format(output_format)]['extension']
+
+def get_output_mimetype(output_format: str = DEFAULT_OUTPUT_FORMAT) -> str:
+    """输出格式对应的MIME类型"""
+    return OUTPUT_FORMATS[normalize_output_format(output_format)]['mimetype']
+
+def encode_image(image: Image.Image, fp: Union[str, BinaryIO],
+                 profile: str = DEFAULT_ENCODER_PROFILE,
+                 output_format: str = DEFAULT_OUTPUT_FORMAT) -> None:
+    """按编码配置把图片写入文件路径或文件对象"""
+    pil_format, options = get_encoder_options(profile, output_format)
+    image.save(fp, pil_format, **options)
+
+class _ChunkQueueWriter:
+    """把编码器的写入切分成固定大小的块，放入有界队列供响应读取"""
+
+    def __init__(self, chunk_queue: queue.Queue, chunk_size: int, cancelled: threading.Event):
+        self.chunk_queue = chunk_queue
+        self.chunk_size = chunk_size
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def write(self, data) -> int:
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            self._put(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self.buffer:
+            self._put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def _put(self, item) -> None:
+        while True:
+            if self.cancelled.is_set():
+                # 客户端已断开，终止编码
+                raise BrokenPipeError("编码输出已被取消")
+            try:
+                self.chunk_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+def iter_encoded_chunks(image: Image.Image, profile: str = DEFAULT_ENCODER_PROFILE,
+                        output_format: str = DEFAULT_OUTPUT_FORMAT,
+                        chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    边编码边产出数据块，不经过磁盘也不在内存中保留完整编码结果
+
+    编码在后台线程进行，通过有界队列与调用方衔接；调用方提前停止迭代时编码随之终止
+    """
+    chunk_queue: queue.Queue = queue.Queue(maxsize=4)
+    cancelled = threading.Event()
+    done = object()
+
+    def encode_worker():
+        writer = _ChunkQueueWriter(chunk_queue, chunk_size, cancelled)
+        try:
+            encode_image(image, writer, profile, output_format)
+            writer.close()
+            writer._put(done)
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            try:
+                writer._put(e)
+            except BrokenPipeError:
+                pass
+
+    thread = threading.Thread(target=encode_worker, name='image-encoder', daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = chunk_queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
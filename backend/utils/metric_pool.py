@@ -0,0 +1,43 @@
+"""
+分析指标线程池
+各项分析指标在颜色空间转换后彼此独立，且OpenCV/NumPy运算会释放GIL；
+把它们提交到共享线程池中同时计算，单张图片的分析耗时趋近于最慢的一项指标
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+def evaluate_metrics(tasks: List[Tuple[str, Callable, tuple]],
+                     pool: Optional[ThreadPoolExecutor] = None) -> Dict[str, object]:
+    """
+    计算一组独立指标
+
+    Args:
+        tasks: [(名称, 函数, 参数元组), ...]，耗时长的任务应排在前面以便尽早开始
+        pool: 线程池，为None时按顺序在当前线程计算
+
+    Returns:
+        {名称: 结果}，顺序与tasks一致
+    """
+    if pool is None:
+        return {name: func(*args) for name, func, args in tasks}
+
+    futures = [(name, pool.submit(func, *args)) for name, func, args in tasks]
+    # 按提交顺序取结果，任一指标的异常会抛给调用方
+    return {name: future.result() for name, future in futures}
+
+# 进程内共享的指标线程池，由应用启动时配置
+_active_pool: Optional[ThreadPoolExecutor] = None
+
+def configure_metric_pool(max_workers: int) -> Optional[ThreadPoolExecutor]:
+    """配置指标线程池，max_workers为0时关闭 (逐项顺序计算)"""
+    global _active_pool
+    if _active_pool is not None:
+        _active_pool.shutdown(wait=True)
+        _active_pool = None
+
+    if max_workers and max_workers > 1:
+        _active_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='metric-worker')
+    return _active_pool
+
+def get_metric_pool() -> Optional[ThreadPoolExecutor]:
+    return _active_pool
@@ -0,0 +1,150 @@
+"""
+多阶段流水线工具
+阶段之间通过有界队列衔接，每个阶段拥有独立的工作线程池，
+结果按完成顺序逐条产出
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+# 阶段结束标记
+_STAGE_DONE = object()
+
+# 队列阻塞时检查取消标志的间隔(秒)
+_POLL_INTERVAL = 0.1
+
+@dataclass
+class PipelineStage:
+    """流水线阶段定义"""
+    name: str
+    handler: Callable[[str, Any], Any]  # handler(key, payload) -> 下一阶段的payload
+    workers: int = 1
+
+@dataclass
+class PipelineResult:
+    """单个条目的处理结果"""
+    key: str
+    value: Any = None
+    error: Optional[Exception] = None
+    failed_stage: Optional[str] = None
+    elapsed: float = 0.0  # 从进入流水线到完成的耗时(秒)
+
+def _put(q: queue.Queue, item, cancel: threading.Event) -> bool:
+    """带取消检查的阻塞写入"""
+    while not cancel.is_set():
+        try:
+            q.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q: queue.Queue, cancel: threading.Event):
+    """带取消检查的阻塞读取"""
+    while not cancel.is_set():
+        try:
+            return q.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return _STAGE_DONE
+
+def run_staged_pipeline(items: Iterable[Tuple[str, Any]], stages: Iterable[PipelineStage],
+                        queue_size: int = 8) -> Iterator[PipelineResult]:
+    """
+    以流水线方式处理条目
+
+    Args:
+        items: (key, payload) 序列，惰性读取
+        stages: 按顺序执行的阶段
+        queue_size: 阶段间队列长度，限制在途条目数量
+
+    Returns:
+        按完成顺序产出的 PipelineResult。调用方提前停止迭代时，
+        所有工作线程会被取消并退出
+    """
+    stages = list(stages)
+    if not stages:
+        raise ValueError("流水线至少需要一个阶段")
+
+    cancel = threading.Event()
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    results: queue.Queue = queue.Queue()
+    threads = []
+
+    def feeder():
+        try:
+            for key, payload in items:
+                if not _put(queues[0], (key, payload, time.time()), cancel):
+                    return
+        except Exception as e:
+            results.put(PipelineResult(key='', error=e, failed_stage='input'))
+        finally:
+            for _ in range(stages[0].workers):
+                _put(queues[0], _STAGE_DONE, cancel)
+
+    def make_worker(index: int, remaining: list, lock: threading.Lock):
+        stage = stages[index]
+        in_q = queues[index]
+        is_last = index == len(stages) - 1
+
+        def worker():
+            while True:
+                item = _get(in_q, cancel)
+                if item is _STAGE_DONE:
+                    break
+
+                key, payload, started = item
+                try:
+                    value = stage.handler(key, payload)
+                except Exception as e:
+                    results.put(PipelineResult(
+                        key=key,
+                        error=e,
+                        failed_stage=stage.name,
+                        elapsed=time.time() - started
+                    ))
+                    continue
+
+                if is_last:
+                    results.put(PipelineResult(key=key, value=value, elapsed=time.time() - started))
+                elif not _put(queues[index + 1], (key, value, started), cancel):
+                    break
+
+            # 本阶段最后一个退出的线程负责通知下游
+            with lock:
+                remaining[0] -= 1
+                last_worker = remaining[0] == 0
+
+            if last_worker:
+                if is_last:
+                    results.put(_STAGE_DONE)
+                else:
+                    for _ in range(stages[index + 1].workers):
+                        _put(queues[index + 1], _STAGE_DONE, cancel)
+
+        return worker
+
+    threads.append(threading.Thread(target=feeder, daemon=True))
+    for index, stage in enumerate(stages):
+        remaining = [stage.workers]
+        lock = threading.Lock()
+        for n in range(stage.workers):
+            threads.append(threading.Thread(
+                target=make_worker(index, remaining, lock),
+                name=f"pipeline-{stage.name}-{n}",
+                daemon=True
+            ))
+
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            result = results.get()
+            if result is _STAGE_DONE:
+                break
+            yield result
+    finally:
+        cancel.set()
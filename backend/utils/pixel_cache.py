@@ -0,0 +1,141 @@
+"""
+解码像素缓存
+把图片解码后的RGB数组保存为未压缩的.npy文件，之后以内存映射方式读取:
+同一张图片的重复分析/预览/生成不再JPEG解码，且多个工作进程共享操作系统页缓存
+"""
+import hashlib
+import os
+import threading
+import uuid
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+def decode_rgb(image_path: str) -> np.ndarray:
+    """解码图片为RGB数组 (uint8, H x W x 3)"""
+    with Image.open(image_path) as image:
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return np.asarray(image)
+
+class PixelCache:
+    """以字节配额为上限的.npy内存映射缓存，可被多个进程同时使用"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None  # 本进程视角的缓存大小，超出配额时重新扫描校正
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, image_path: str) -> Optional[str]:
+        """按源文件路径、大小和修改时间生成缓存文件名，源文件被覆盖后自动失效"""
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        source = f"{os.path.abspath(image_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        return os.path.join(self.cache_dir, hashlib.sha1(source.encode('utf-8')).hexdigest() + '.npy')
+
+    def load_rgb(self, image_path: str) -> np.ndarray:
+        """
+        读取图片的RGB数组
+
+        命中时返回只读的内存映射数组；未命中时解码并写入缓存。
+        调用方需要修改像素时应先复制
+        """
+        entry_path = self._entry_path(image_path)
+        if entry_path is None:
+            raise FileNotFoundError(image_path)
+
+        try:
+            pixels = np.load(entry_path, mmap_mode='r')
+            with self._lock:
+                self.hits += 1
+            try:
+                os.utime(entry_path)  # 记录最近使用时间，供淘汰排序
+            except OSError:
+                pass
+            return pixels
+        except (FileNotFoundError, ValueError):
+            pass  # 未缓存，或其他进程正在替换
+
+        pixels = decode_rgb(image_path)
+        with self._lock:
+            self.misses += 1
+
+        if pixels.nbytes > self.max_bytes:
+            return pixels
+
+        temp_path = f"{entry_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                np.save(f, pixels)
+            os.replace(temp_path, entry_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return pixels
+
+        self._account(os.path.getsize(entry_path))
+        return np.load(entry_path, mmap_mode='r')
+
+    def _account(self, added_bytes: int) -> None:
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_total()
+            else:
+                self._approx_bytes += added_bytes
+            if self._approx_bytes > self.max_bytes:
+                self._approx_bytes = self._evict()
+
+    def _scan_entries(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith('.npy'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_total(self) -> int:
+        return sum(size for _, size, _ in self._scan_entries())
+
+    def _evict(self) -> int:
+        """按最近使用时间从旧到新删除，直到低于配额；返回剩余字节数"""
+        entries = sorted(self._scan_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)  # 其他进程已映射的数组在关闭前仍然有效
+                total -= size
+            except OSError:
+                continue
+        return total
+
+# 进程内共享的缓存实例，由应用启动时配置
+_active_cache: Optional[PixelCache] = None
+
+def configure_pixel_cache(cache_dir: Optional[str], max_bytes: int = 0) -> Optional[PixelCache]:
+    """配置解码像素缓存，cache_dir为空或配额为0时关闭"""
+    global _active_cache
+    _active_cache = PixelCache(cache_dir, max_bytes) if cache_dir and max_bytes > 0 else None
+    return _active_cache
+
+def get_pixel_cache() -> Optional[PixelCache]:
+    return _active_cache
+
+def load_rgb_image(image_path: str) -> np.ndarray:
+    """读取图片RGB数组，配置了缓存时经由缓存 (返回值可能是只读的内存映射)"""
+    cache = _active_cache
+    if cache is None:
+        return decode_rgb(image_path)
+    return cache.load_rgb(image_path)
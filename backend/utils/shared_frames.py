@@ -0,0 +1,104 @@
+"""
+共享内存图像帧
+HTTP工作进程把解码后的像素放入 multiprocessing.shared_memory 段，
+计算进程只接收描述符 (段名, 形状, dtype)，避免在进程间pickle数MB的数组
+
+生命周期约定:
+- 所有段都由发起请求的进程通过 SharedFrameArena 创建，并在 with 块结束时关闭并删除，
+  计算进程崩溃也不会遗留段
+- 计算进程只附加 (attach) 已存在的段，用完即关闭，从不创建或删除
+- 发起进程自身异常退出时，由 multiprocessing 的 resource_tracker 删除其创建的段
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+@dataclass(frozen=True)
+class SharedFrame:
+    """共享内存中的数组描述符 (可廉价pickle)"""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+class SharedFrameArena:
+    """
+    一次计算请求所用共享内存段的拥有者
+
+    用法:
+        with SharedFrameArena() as arena:
+            source = arena.put(pixels)
+            target = arena.allocate(pixels.shape, pixels.dtype)
+            pool.submit(worker, source, target).result()
+            output = arena.view(target).copy()
+    """
+
+    def __init__(self):
+        self._segments: List[shared_memory.SharedMemory] = []
+        self._views = {}
+
+    def allocate(self, shape: Tuple[int, ...], dtype=np.uint8) -> SharedFrame:
+        """创建未初始化的段，用于接收计算结果"""
+        dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        self._segments.append(segment)
+
+        frame = SharedFrame(segment.name, tuple(int(n) for n in shape), dtype.str)
+        self._views[frame.name] = np.ndarray(frame.shape, dtype=dtype, buffer=segment.buf)
+        return frame
+
+    def put(self, array: np.ndarray) -> SharedFrame:
+        """创建段并复制数组内容"""
+        frame = self.allocate(array.shape, array.dtype)
+        np.copyto(self._views[frame.name], array)
+        return frame
+
+    def view(self, frame: SharedFrame) -> np.ndarray:
+        """本进程内访问段内容的数组视图 (在 with 块结束后失效)"""
+        return self._views[frame.name]
+
+    def close(self) -> None:
+        """关闭并删除全部段"""
+        self._views.clear()
+        for segment in self._segments:
+            try:
+                segment.close()
+            except BufferError:
+                pass  # 仍有外部引用的视图，删除段名后内存随进程回收
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+        self._segments.clear()
+
+    def __enter__(self) -> 'SharedFrameArena':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+@contextmanager
+def attach_frame(frame: SharedFrame) -> Iterator[np.ndarray]:
+    """
+    在计算进程中附加已存在的段，退出时关闭 (不删除)
+
+    计算进程由发起进程的进程池启动，与发起进程共用同一个 resource_tracker，
+    附加不会使段在计算进程退出时被删除
+    """
+    segment = shared_memory.SharedMemory(name=frame.name)
+    array = np.ndarray(frame.shape, dtype=np.dtype(frame.dtype), buffer=segment.buf)
+    try:
+        yield array
+    finally:
+        del array
+        try:
+            segment.close()
+        except BufferError:
+            pass  # 仍有派生视图引用缓冲区，进程退出时释放映射
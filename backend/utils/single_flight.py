@@ -0,0 +1,354 @@
+"""
+单飞请求合并
+同一张图片(按内容摘要)、同一操作、同一组参数的并发请求只执行一次计算，
+其余请求等待并共享同一个结果。可选地通过锁文件跨进程合并:
+多个Web进程中只有持锁的一个计算，有其他进程在等待时写下结果，等待的进程在锁释放后读取。
+跨进程的结果只以数据格式(JSON/原始像素)写入，读取时不执行任何代码
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+try:
+    import fcntl
+except ImportError:  # Windows下无fcntl，只做进程内合并
+    fcntl = None
+
+_DIGEST_CHUNK = 1024 * 1024
+
+class ResultCodec(NamedTuple):
+    """跨进程共享结果的序列化方式 (只允许纯数据格式)"""
+    encode: Callable[[Any], bytes]
+    decode: Callable[[bytes], Any]
+
+def json_codec(to_data: Callable[[Any], Any] = lambda value: value,
+               from_data: Callable[[Any], Any] = lambda data: data) -> ResultCodec:
+    """经 JSON 序列化的结果，to_data/from_data 负责与可JSON化数据之间的转换"""
+    return ResultCodec(
+        encode=lambda value: json.dumps(to_data(value), ensure_ascii=False).encode('utf-8'),
+        decode=lambda data: from_data(json.loads(data.decode('utf-8')))
+    )
+
+def _encode_image(image: Image.Image) -> bytes:
+    header = json.dumps({'mode': image.mode, 'size': list(image.size)}).encode('utf-8')
+    return header + b'\n' + image.tobytes()
+
+def _decode_image(data: bytes) -> Image.Image:
+    header, _, pixels = data.partition(b'\n')
+    info = json.loads(header.decode('utf-8'))
+    return Image.frombytes(info['mode'], tuple(info['size']), pixels)
+
+# PIL图片: JSON头(模式/尺寸) + 原始像素
+IMAGE_CODEC = ResultCodec(encode=_encode_image, decode=_decode_image)
+
+class _Flight:
+    """一次正在进行的计算"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+def _lock_file(path: str, operation: int) -> int:
+    """
+    打开并锁定锁文件，返回文件描述符 (关闭即释放)
+
+    加锁后确认路径仍指向同一个文件: 清理可能在打开与加锁之间删除了它，
+    此时锁的是已删除的文件，需要重新打开
+    """
+    while True:
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, operation)
+            if os.path.samestat(os.fstat(fd), os.stat(path)):
+                return fd
+        except FileNotFoundError:
+            pass
+        except BaseException:
+            os.close(fd)
+            raise
+        os.close(fd)
+
+def _is_locked(path: str) -> bool:
+    """是否有其他进程持有该文件的锁 (文件不存在视为无人持有)"""
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return False
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+
+def _remove_unlocked(path: str) -> None:
+    """只在没有进程持锁时删除锁文件"""
+    fd = os.open(path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if os.path.samestat(os.fstat(fd), os.stat(path)):
+            os.remove(path)
+    except (BlockingIOError, FileNotFoundError):
+        pass
+    finally:
+        os.close(fd)
+
+class SingleFlight:
+    """
+    按键合并并发的相同计算
+
+    计算抛出的异常同样传递给所有等待者；结果只在计算进行期间共享，
+    完成后的请求重新计算 (结果的复用交给各自的缓存)
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None, result_ttl: float = 5.0):
+        """
+        Args:
+            lock_dir: 跨进程合并使用的锁文件/结果文件目录，None表示只在进程内合并
+            result_ttl: 跨进程结果文件的有效期(秒)，只需覆盖等待锁的时间
+        """
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.result_ttl = result_ttl
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.coalesced_remote = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._locked_runs = 0
+        if self.lock_dir:
+            # 只允许本用户读写，结果文件读取时同样校验属主
+            os.makedirs(self.lock_dir, mode=0o700, exist_ok=True)
+
+    def do(self, key: Hashable, func: Callable[[], Any],
+           codec: Optional[ResultCodec] = None) -> Tuple[Any, bool]:
+        """
+        执行或加入一次计算
+
+        Args:
+            codec: 跨进程共享结果的序列化方式，None时只在进程内合并
+
+        Returns:
+            (结果, 是否与其他请求共享了计算)
+        """
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        shared = False
+        try:
+            if self.lock_dir and codec is not None:
+                flight.result, shared = self._run_locked(key, func, codec)
+            else:
+                flight.result = self._execute(func)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                shared = shared or flight.waiters > 0
+            flight.done.set()
+        return flight.result, shared
+
+    def _execute(self, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.executions += 1
+        return func()
+
+    def _run_locked(self, key: Hashable, func: Callable[[], Any], codec: ResultCodec) -> Tuple[Any, bool]:
+        """
+        持有该键的文件锁计算；等锁期间若其他进程已算完，直接读取其结果
+
+        等锁的进程在等待期间持有 .wait 文件的共享锁，持锁计算的进程据此判断是否有跨进程等待者，
+        没有时不写结果文件 (生成类结果的原始像素可达数十MB)
+        """
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        lock_path = os.path.join(self.lock_dir, name + '.lock')
+        wait_path = os.path.join(self.lock_dir, name + '.wait')
+        result_path = os.path.join(self.lock_dir, name + '.result')
+
+        waited_since = time.time()
+        try:
+            fd = _lock_file(lock_path, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            wait_fd = _lock_file(wait_path, fcntl.LOCK_SH)
+            try:
+                fd = _lock_file(lock_path, fcntl.LOCK_EX)
+            finally:
+                os.close(wait_fd)
+        try:
+            result = self._read_result(result_path, waited_since, codec)
+            if result is not None:
+                with self._lock:
+                    self.coalesced_remote += 1
+                return result[0], True
+
+            value = self._execute(func)
+            if _is_locked(wait_path):
+                self._write_result(result_path, value, codec)
+        finally:
+            os.close(fd)  # 关闭即释放锁
+
+        with self._lock:
+            self._locked_runs += 1
+            sweep = self._locked_runs % 100 == 0
+        if sweep:
+            self._sweep()
+        return value, False
+
+    def _read_result(self, result_path: str, not_before: float, codec: ResultCodec) -> Optional[Tuple[Any]]:
+        """读取开始等锁之后写入、且仍在有效期内的结果；不是本用户写入的文件一律忽略"""
+        try:
+            fd = os.open(result_path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+        except OSError:
+            return None
+        try:
+            with os.fdopen(fd, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_uid != os.getuid():
+                    return None
+                if stat.st_mtime < not_before - 0.01 or time.time() - stat.st_mtime > self.result_ttl:
+                    return None
+                return (codec.decode(f.read()),)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_result(self, result_path: str, value: Any, codec: ResultCodec) -> None:
+        temp_path = f"{result_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            data = codec.encode(value)
+            with os.fdopen(os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600), 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, result_path)
+        except (OSError, ValueError, TypeError, AttributeError):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _sweep(self) -> None:
+        """
+        删除过期的结果文件与长期未用的锁文件
+
+        锁文件只在非阻塞地拿到排他锁时删除 (正在计算或等待的键不受影响)，
+        已打开旧文件的进程加锁后发现文件已被删除会重新打开，见 _lock_file
+        """
+        now = time.time()
+        try:
+            with os.scandir(self.lock_dir) as entries:
+                for entry in entries:
+                    try:
+                        age = now - entry.stat().st_mtime
+                        if entry.name.endswith('.result'):
+                            if age > self.result_ttl:
+                                os.remove(entry.path)
+                        elif entry.name.endswith(('.lock', '.wait')) and age > 3600:
+                            _remove_unlocked(entry.path)
+                        elif entry.name.endswith('.tmp') and age > 3600:
+                            os.remove(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced + self.coalesced_remote,
+                'coalesced_remote': self.coalesced_remote,
+                'in_flight': len(self._flights)
+            }
+
+class _DigestMemo:
+    """源文件(路径/大小/修改时间) -> 内容摘要，同一版本文件只读取一次"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def digest(self, image_path: str) -> str:
+        stat = os.stat(image_path)
+        identity = (os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._entries.get(identity)
+            if digest is not None:
+                self._entries.move_to_end(identity)
+                return digest
+
+        hasher = hashlib.sha256()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_DIGEST_CHUNK), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+
+        with self._lock:
+            self._entries[identity] = digest
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return digest
+
+_digests = _DigestMemo()
+
+def content_digest(image_path: str) -> str:
+    """图片内容的SHA-256摘要 (内容相同的不同上传得到相同的键)"""
+    return _digests.digest(image_path)
+
+# 进程内共享的合并器，由应用启动时配置；未配置时直接计算
+_active_flight: Optional[SingleFlight] = None
+
+def configure_single_flight(enabled: bool, lock_dir: Optional[str] = None) -> Optional[SingleFlight]:
+    """配置请求合并，lock_dir 不为空时同时跨进程合并"""
+    global _active_flight
+    _active_flight = SingleFlight(lock_dir) if enabled else None
+    return _active_flight
+
+def get_single_flight() -> Optional[SingleFlight]:
+    return _active_flight
+
+def coalesce(image_path: str, operation: str, parameters: Hashable, func: Callable[[], Any],
+             detach: Optional[Callable[[Any], Any]] = None, codec: Optional[ResultCodec] = None) -> Any:
+    """
+    以 (图片内容摘要, 操作, 规范化参数) 为键合并相同的并发计算
+
+    Args:
+        image_path: 源图片路径
+        operation: 操作名 (analyze/filter/preview...)
+        parameters: 规范化后的参数，需可哈希且 repr 稳定
+        func: 实际计算
+        detach: 结果被多个请求共享时，为每个请求复制出独立的副本 (如可变的PIL图片)
+        codec: 跨进程共享结果的序列化方式，None时只在进程内合并
+    """
+    flight = _active_flight
+    if flight is None:
+        return func()
+    try:
+        digest = content_digest(image_path)
+    except OSError:
+        return func()
+    result, shared = flight.do((digest, operation, parameters), func, codec)
+    return detach(result) if shared and detach is not None else result
@@ -0,0 +1,239 @@
+"""
+图片存储布局
+文件按ID哈希前缀分片存放: {root}/ab/cd/{image_id}.jpg，
+避免单个目录下文件过多导致查找、列目录和备份变慢。
+迁移期间同时兼容旧的平铺布局 {root}/{image_id}.jpg
+
+对象可以保存在本地磁盘或S3兼容存储中；使用远程存储时，
+root 为节点本地缓存目录，新文件先写入缓存再上传
+"""
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from .constants import STORAGE_LAYOUT, STORAGE_NAMESPACES
+from .expiry_index import get_expiry_index
+from .storage_backends import LocalBackend, ObjectInfo, ReadThroughCache, S3Backend, StorageBackend
+
+# 合法的图片ID: 只允许字母数字、下划线和连字符，防止路径穿越
+_IMAGE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+
+def is_valid_image_id(image_id: str) -> bool:
+    return bool(image_id) and bool(_IMAGE_ID_PATTERN.match(image_id))
+
+def shard_key(image_id: str, extension: str,
+              depth: int = STORAGE_LAYOUT['shard_depth'],
+              width: int = STORAGE_LAYOUT['shard_width']) -> str:
+    """计算分片后的相对路径，如 'ab/cd/{image_id}.jpg'"""
+    digest = hashlib.md5(image_id.encode('utf-8')).hexdigest()
+    parts = [digest[i * width:(i + 1) * width] for i in range(depth)]
+    parts.append(f"{image_id}.{extension.lower()}")
+    return '/'.join(parts)
+
+class ImageStorage:
+    """单个命名空间(uploads/outputs)的分片存储"""
+
+    def __init__(self, root: str, namespace: str, backend: Optional[StorageBackend] = None,
+                 cache_max_bytes: Optional[int] = None):
+        """
+        Args:
+            root: 本地目录；远程后端时为节点本地缓存目录
+            namespace: 命名空间
+            backend: 存储后端，缺省为以root为根的本地存储
+            cache_max_bytes: 远程后端时本地缓存的容量上限
+        """
+        self.root = root
+        self.namespace = namespace
+        self.backend = backend or LocalBackend(root)
+        self.cache = None
+        if not self.backend.is_local:
+            self.cache = ReadThroughCache(self.backend, root, cache_max_bytes)
+        # 正在后台写入的文件: 键 -> 写入任务，resolve 时等待写入完成
+        self._pending: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+
+    def key_for(self, image_id: str, extension: str = 'jpg') -> str:
+        return shard_key(image_id, extension)
+
+    def path_for_key(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def new_path(self, image_id: str, extension: str = 'jpg') -> str:
+        """返回新文件的写入路径 (自动创建分片目录)"""
+        if not is_valid_image_id(image_id):
+            raise ValueError(f"无效的图片ID: {image_id}")
+        path = self.path_for_key(self.key_for(image_id, extension))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def resolve(self, image_id: str, extension: str = 'jpg') -> Optional[str]:
+        """
+        查找已存在的文件路径，不存在时返回None
+
+        先查分片路径，再查旧的平铺路径；迁移工具可能正好在两次检查之间移动文件，
+        所以平铺路径未命中时再查一次分片路径
+        """
+        if not is_valid_image_id(image_id):
+            return None
+
+        self._wait_pending(self.key_for(image_id, extension))
+
+        if self.cache is not None:
+            # 远程存储: 缓存命中时不访问远程
+            return self.cache.fetch(self.key_for(image_id, extension))
+
+        sharded_path = self.path_for_key(self.key_for(image_id, extension))
+        if os.path.exists(sharded_path):
+            return sharded_path
+
+        legacy_path = os.path.join(self.root, f"{image_id}.{extension.lower()}")
+        if os.path.exists(legacy_path):
+            return legacy_path
+
+        if os.path.exists(sharded_path):
+            return sharded_path
+        return None
+
+    def track_pending(self, image_id: str, future: Future, extension: str = 'jpg') -> None:
+        """
+        登记后台写入中的文件: 写入完成前 resolve 会等待，而不是返回None
+        (只对本进程内的请求有效)
+        """
+        key = self.key_for(image_id, extension)
+        with self._pending_lock:
+            self._pending[key] = future
+
+        def forget(_):
+            with self._pending_lock:
+                if self._pending.get(key) is future:
+                    del self._pending[key]
+        future.add_done_callback(forget)
+
+    def _wait_pending(self, key: str, timeout: float = 30.0) -> None:
+        with self._pending_lock:
+            future = self._pending.get(key)
+        if future is None:
+            return
+        try:
+            future.result(timeout)
+        except Exception:
+            pass  # 写入失败或超时: 按文件不存在处理
+
+    def key_of(self, path: str) -> str:
+        """文件路径 -> 相对于存储根目录的键"""
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def register(self, path: str) -> None:
+        """新文件写入完成后提交到存储后端，并登记到过期索引"""
+        key = self.key_of(path)
+        if self.cache is not None:
+            self.cache.store(key, path)
+        index = get_expiry_index()
+        if index is not None:
+            index.record(self.namespace, key, os.path.getsize(path))
+
+    def delete(self, key: str) -> bool:
+        """删除对象 (含本地缓存副本)，同时移除过期索引条目，保持存储计数准确"""
+        if self.cache is not None:
+            self.cache.discard(key)
+        deleted = self.backend.delete(key)
+        index = get_expiry_index()
+        if index is not None:
+            index.remove(self.namespace, key)
+        return deleted
+
+    def iter_objects(self) -> Iterator[ObjectInfo]:
+        """列出后端中的全部对象，用于索引对账"""
+        return self.backend.list()
+
+    def touch(self, path: str) -> None:
+        """读取文件时更新过期索引中的访问时间"""
+        index = get_expiry_index()
+        if index is not None:
+            index.touch(self.namespace, self.key_of(path))
+
+    def iter_legacy_files(self) -> Iterator[str]:
+        """产出仍处于旧平铺布局的文件名 (仅本地存储)"""
+        if self.cache is not None or not os.path.exists(self.root):
+            return
+        for entry in os.scandir(self.root):
+            if entry.name.startswith('.') or entry.name.endswith('.tmp') or not entry.is_file():
+                continue
+            if '.' not in entry.name:
+                continue
+            yield entry.name
+
+    def migrate_legacy_file(self, filename: str) -> Optional[Tuple[str, str]]:
+        """
+        把一个平铺布局的文件移动到分片路径 (同一文件系统内原子重命名)
+
+        Returns:
+            (旧键, 新键)，文件名无法识别时返回None
+        """
+        image_id, extension = filename.rsplit('.', 1)
+        if not is_valid_image_id(image_id):
+            return None
+
+        source = os.path.join(self.root, filename)
+        target = self.new_path(image_id, extension)
+        os.replace(source, target)
+
+        new_key = self.key_of(target)
+        index = get_expiry_index()
+        if index is not None:
+            index.rename(self.namespace, filename, new_key)
+        return filename, new_key
+
+# 按配置复用的存储实例 (S3客户端与缓存状态在请求之间共享)
+_storages: Dict[tuple, ImageStorage] = {}
+_storages_lock = threading.Lock()
+
+def _create_backend(namespace: str, config) -> Optional[StorageBackend]:
+    backend_type = config.get('STORAGE_BACKEND', 'local')
+    if backend_type == 'local':
+        return None
+    if backend_type == 's3':
+        return S3Backend(
+            config['S3_BUCKET'],
+            key_prefix=f"{config.get('S3_KEY_PREFIX') or ''}{namespace}/",
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region_name=config.get('S3_REGION')
+        )
+    raise ValueError(f"未知的存储后端: {backend_type}")
+
+def get_storage(namespace: str, config=None) -> ImageStorage:
+    """
+    获取命名空间对应的存储
+
+    Args:
+        namespace: uploads / outputs
+        config: 配置映射，缺省时使用当前Flask应用的配置
+    """
+    if config is None:
+        from flask import current_app
+        config = current_app.config
+
+    backend_type = config.get('STORAGE_BACKEND', 'local')
+    if backend_type == 'local':
+        root = config[STORAGE_NAMESPACES[namespace]]
+    else:
+        root = os.path.join(config['STORAGE_CACHE_FOLDER'], namespace)
+
+    cache_key = (namespace, backend_type, root, config.get('S3_BUCKET'),
+                 config.get('S3_KEY_PREFIX'), config.get('S3_ENDPOINT_URL'))
+    with _storages_lock:
+        storage = _storages.get(cache_key)
+        if storage is None:
+            storage = ImageStorage(root, namespace, _create_backend(namespace, config),
+                                   config.get('STORAGE_CACHE_MAX_BYTES'))
+            _storages[cache_key] = storage
+    return storage
+
+def as_storage(target: Union[str, ImageStorage], namespace: str) -> ImageStorage:
+    """接受目录或存储对象，统一为存储对象 (命令行工具直接传目录)"""
+    if isinstance(target, ImageStorage):
+        return target
+    return ImageStorage(target, namespace)
@@ -0,0 +1,276 @@
+"""
+存储后端
+统一的对象存储接口 (put / get_stream / head / delete / list)，
+提供本地文件系统与S3兼容(AWS S3、MinIO等)两种实现，
+以及位于远程存储前的节点本地读穿透缓存
+"""
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # 仅使用本地存储时不需要boto3
+    boto3 = None
+    ClientError = None
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+@dataclass
+class ObjectInfo:
+    """存储对象元信息"""
+    key: str
+    size: int
+    modified: float
+
+class StorageBackend:
+    """存储后端接口，键使用'/'分隔，如 'ab/cd/{image_id}.jpg'"""
+
+    # 是否可以直接以本地文件路径访问对象
+    is_local = False
+
+    def put(self, key: str, source_path: str) -> None:
+        """上传本地文件到指定键 (覆盖已有对象)"""
+        raise NotImplementedError
+
+    def get_stream(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """按块读取对象内容，对象不存在时抛出FileNotFoundError"""
+        raise NotImplementedError
+
+    def head(self, key: str) -> Optional[ObjectInfo]:
+        """获取对象元信息，不存在时返回None"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        """删除对象，返回对象是否曾经存在"""
+        raise NotImplementedError
+
+    def list(self, prefix: str = '') -> Iterator[ObjectInfo]:
+        """列出键以prefix开头的全部对象"""
+        raise NotImplementedError
+
+class LocalBackend(StorageBackend):
+    """本地文件系统存储，键直接映射为 root 下的相对路径"""
+
+    is_local = True
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def put(self, key: str, source_path: str) -> None:
+        target = self.path(key)
+        if os.path.abspath(source_path) == os.path.abspath(target):
+            return  # 已直接写在存储位置
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, target)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def get_stream(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        with open(self.path(key), 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def head(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            stat = os.stat(self.path(key))
+        except OSError:
+            return None
+        return ObjectInfo(key, stat.st_size, stat.st_mtime)
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list(self, prefix: str = '') -> Iterator[ObjectInfo]:
+        # 前缀包含目录部分时只遍历对应子目录
+        directory = prefix.rsplit('/', 1)[0] + '/' if '/' in prefix else ''
+        for key, stat in self._scan(self.path(directory) if directory else self.root, directory):
+            if key.startswith(prefix):
+                yield ObjectInfo(key, stat.st_size, stat.st_mtime)
+
+    def _scan(self, folder: str, key_prefix: str):
+        """递归扫描，跳过隐藏文件和写入中的临时文件"""
+        if not os.path.isdir(folder):
+            return
+        for entry in os.scandir(folder):
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from self._scan(entry.path, f"{key_prefix}{entry.name}/")
+            elif entry.is_file() and not entry.name.endswith('.tmp'):
+                try:
+                    yield f"{key_prefix}{entry.name}", entry.stat()
+                except OSError:
+                    continue
+
+class S3Backend(StorageBackend):
+    """
+    S3兼容对象存储
+    endpoint_url 指向 MinIO 等本地替身时即可在单机上联调
+    """
+
+    def __init__(self, bucket: str, key_prefix: str = '', endpoint_url: Optional[str] = None,
+                 region_name: Optional[str] = None, client=None):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("使用S3存储需要安装boto3")
+            client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region_name)
+        self.client = client
+        self.bucket = bucket
+        self.key_prefix = key_prefix
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+
+    @staticmethod
+    def _is_not_found(error) -> bool:
+        code = error.response.get('Error', {}).get('Code')
+        return code in ('404', 'NoSuchKey', 'NotFound')
+
+    def put(self, key: str, source_path: str) -> None:
+        self.client.upload_file(source_path, self.bucket, self._object_key(key))
+
+    def get_stream(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+        body = response['Body']
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def head(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if self._is_not_found(e):
+                return None
+            raise
+        return ObjectInfo(key, response['ContentLength'], response['LastModified'].timestamp())
+
+    def delete(self, key: str) -> bool:
+        # S3删除是幂等的，不区分对象是否存在
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        return True
+
+    def list(self, prefix: str = '') -> Iterator[ObjectInfo]:
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix)):
+            for item in page.get('Contents', []):
+                yield ObjectInfo(
+                    item['Key'][len(self.key_prefix):],
+                    item['Size'],
+                    item['LastModified'].timestamp()
+                )
+
+class ReadThroughCache:
+    """
+    节点本地读穿透缓存
+    命中时直接返回本地文件路径，分析与滤镜处理不再访问远程存储；
+    未命中时从后端下载一次，超出容量时按最近使用顺序淘汰
+    """
+
+    def __init__(self, backend: StorageBackend, cache_dir: str, max_bytes: Optional[int] = None):
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Optional[OrderedDict] = None  # 键 -> 字节数，按最近使用排序
+        self._total_bytes = 0
+        self._local = LocalBackend(cache_dir)
+
+    def path(self, key: str) -> str:
+        return self._local.path(key)
+
+    def fetch(self, key: str) -> Optional[str]:
+        """返回对象的本地路径，远程也不存在时返回None"""
+        path = self.path(key)
+        if os.path.exists(path):
+            with self._lock:
+                self.hits += 1
+                self._mark_used(key, os.path.getsize(path))
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                for chunk in self.backend.get_stream(key):
+                    f.write(chunk)
+            os.replace(temp_path, path)
+        except FileNotFoundError:
+            return None
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        with self._lock:
+            self.misses += 1
+            self._mark_used(key, os.path.getsize(path))
+            self._evict(keep=key)
+        return path
+
+    def store(self, key: str, path: str) -> None:
+        """把写在缓存位置的新文件上传到后端，并保留本地副本"""
+        self.backend.put(key, path)
+        with self._lock:
+            self._mark_used(key, os.path.getsize(path))
+            self._evict(keep=key)
+
+    def discard(self, key: str) -> None:
+        """删除本地副本"""
+        with self._lock:
+            self._load_entries()
+            self._total_bytes -= self._entries.pop(key, 0)
+        self._local.delete(key)
+
+    def _load_entries(self) -> None:
+        """首次使用时扫描一次缓存目录 (进程重启后沿用已有缓存)"""
+        if self._entries is not None:
+            return
+        existing = sorted(self._local.list(), key=lambda info: info.modified)
+        self._entries = OrderedDict((info.key, info.size) for info in existing)
+        self._total_bytes = sum(self._entries.values())
+
+    def _mark_used(self, key: str, size: int) -> None:
+        self._load_entries()
+        self._total_bytes += size - self._entries.pop(key, 0)
+        self._entries[key] = size
+
+    def _evict(self, keep: str) -> None:
+        if self.max_bytes is None:
+            return
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            if key == keep:
+                self._entries[key] = size
+                continue
+            self._total_bytes -= size
+            self._local.delete(key)
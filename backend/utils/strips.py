@@ -0,0 +1,102 @@
+"""
+图像条带并行
+把图片按行切成水平条带，在线程池中并行处理各条带；
+NumPy / OpenCV / Pillow 的像素运算会释放GIL，多个条带可以真正同时在多个核上运行。
+空间滤波(锐化/模糊)需要在条带边界多取若干行(halo)，处理后再裁掉
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 每个条带的最小像素数，小图不切分，避免调度开销超过收益
+MIN_STRIP_PIXELS = 512 * 1024
+
+def plan_strips(height: int, width: int, max_strips: int,
+                min_strip_pixels: int = MIN_STRIP_PIXELS) -> List[Tuple[int, int]]:
+    """
+    按图片大小自动决定条带数并划分行区间
+
+    Returns:
+        [(起始行, 结束行), ...]
+    """
+    count = max(1, min(max_strips, (height * width) // min_strip_pixels, height))
+    bounds = np.linspace(0, height, count + 1).astype(int)
+    return [(int(bounds[i]), int(bounds[i + 1])) for i in range(count)]
+
+class StripExecutor:
+    """条带并行执行器，内部线程池在所有请求之间共享"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='strip-worker')
+
+    def plan(self, array: np.ndarray) -> List[Tuple[int, int]]:
+        return plan_strips(array.shape[0], array.shape[1], self.max_workers)
+
+    def map(self, array: np.ndarray, func: Callable[[np.ndarray], np.ndarray],
+            halo: int = 0) -> np.ndarray:
+        """
+        对每个条带调用func并拼回整图 (func的输出行数须与输入一致)
+
+        Args:
+            array: H x W (x C) 图像数组
+            func: 条带处理函数
+            halo: 条带上下额外携带的行数，供空间滤波使用
+        """
+        strips = self.plan(array)
+        if len(strips) == 1:
+            return func(array)
+
+        height = array.shape[0]
+        output: Optional[np.ndarray] = None
+        output_lock = threading.Lock()
+
+        def run(bounds):
+            nonlocal output
+            start, end = bounds
+            top = max(0, start - halo)
+            bottom = min(height, end + halo)
+            result = func(array[top:bottom])[start - top:start - top + (end - start)]
+            with output_lock:
+                if output is None:
+                    output = np.empty((height,) + result.shape[1:], dtype=result.dtype)
+            output[start:end] = result
+
+        # list() 等待全部完成，并把条带中的异常抛给调用方
+        list(self._pool.map(run, strips))
+        return output
+
+    def reduce_sum(self, array: np.ndarray, func: Callable[[np.ndarray], float]) -> float:
+        """对每个条带求func(条带)并求和，用于全局统计量"""
+        strips = self.plan(array)
+        return float(sum(self._pool.map(lambda bounds: func(array[bounds[0]:bounds[1]]), strips)))
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+# 进程内共享的条带执行器，由应用启动时配置
+_active_executor: Optional[StripExecutor] = None
+
+def configure_strip_parallelism(max_workers: int) -> Optional[StripExecutor]:
+    """
+    配置条带并行，max_workers为0时关闭
+
+    同时按 CPU核数 / 条带线程数 设置OpenCV内部线程数，
+    避免条带线程与OpenCV自身的并行叠加造成超额订阅
+    """
+    global _active_executor
+    if _active_executor is not None:
+        _active_executor.shutdown()
+        _active_executor = None
+
+    if max_workers and max_workers > 1:
+        _active_executor = StripExecutor(max_workers)
+        cv2.setNumThreads(max(1, (os.cpu_count() or 1) // max_workers))
+    return _active_executor
+
+def get_strip_executor() -> Optional[StripExecutor]:
+    return _active_executor
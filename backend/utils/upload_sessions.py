@@ -0,0 +1,241 @@
+"""
+可续传的分块上传
+每个上传会话对应暂存目录中的一个只追加的 .part 文件和一个元数据文件；
+已写入的字节数就是文件大小，连接中断后客户端查询进度即可从断点继续。
+分块写入时同步增量计算SHA-256，完成时无需再读取整个文件
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import BinaryIO, Dict, Optional
+
+from .storage import is_valid_image_id
+from .validation import ValidationError
+
+try:
+    import fcntl
+except ImportError:  # Windows下无fcntl，只在进程内串行写入
+    fcntl = None
+
+_READ_CHUNK = 64 * 1024
+_SHA256_PATTERN = re.compile(r'[0-9a-fA-F]{64}')
+
+class UploadOffsetMismatch(Exception):
+    """分块的起始偏移与已写入的字节数不一致 (客户端应从 offset 处继续)"""
+
+    def __init__(self, offset: int):
+        super().__init__(f"分块偏移不一致，当前已接收 {offset} 字节")
+        self.offset = offset
+
+@dataclass
+class UploadSession:
+    """上传会话元数据 (已接收字节数取自暂存文件大小)"""
+    session_id: str
+    filename: str
+    total_size: int
+    created_at: float
+    expected_sha256: Optional[str] = None
+    offset: int = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.offset == self.total_size
+
+class _Hasher:
+    """进程内的增量摘要状态，hashed 为已计入摘要的字节数"""
+
+    def __init__(self):
+        self.sha256 = hashlib.sha256()
+        self.hashed = 0
+        self.lock = threading.Lock()
+
+class UploadSessionStore:
+    """暂存目录中的上传会话，可被多个Web进程同时使用"""
+
+    def __init__(self, staging_dir: str, max_bytes: int, ttl_seconds: float):
+        """
+        Args:
+            staging_dir: 暂存目录 (多个Web进程部署时应为共享目录)
+            max_bytes: 单个上传文件的大小上限
+            ttl_seconds: 会话自创建起的有效期
+        """
+        self.staging_dir = staging_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._hashers: Dict[str, _Hasher] = {}
+        self._lock = threading.Lock()
+        os.makedirs(staging_dir, exist_ok=True)
+
+    def _meta_path(self, session_id: str) -> str:
+        return os.path.join(self.staging_dir, f"{session_id}.json")
+
+    def _part_path(self, session_id: str) -> str:
+        return os.path.join(self.staging_dir, f"{session_id}.part")
+
+    def _hasher(self, session_id: str) -> _Hasher:
+        with self._lock:
+            hasher = self._hashers.get(session_id)
+            if hasher is None:
+                hasher = self._hashers[session_id] = _Hasher()
+            return hasher
+
+    def create(self, filename: str, total_size: int, expected_sha256: Optional[str] = None) -> UploadSession:
+        """
+        创建上传会话
+
+        Raises:
+            ValidationError: 文件大小无效或超过上限，或 expected_sha256 不是64位十六进制字符串
+        """
+        if total_size <= 0:
+            raise ValidationError("文件大小必须大于0")
+        if total_size > self.max_bytes:
+            raise ValidationError(f"文件大小超过限制 ({self.max_bytes // 1024 // 1024}MB)")
+        if expected_sha256 is not None and (
+                not isinstance(expected_sha256, str) or not _SHA256_PATTERN.fullmatch(expected_sha256)):
+            raise ValidationError("sha256 应为64位十六进制字符串")
+
+        session = UploadSession(
+            session_id=uuid.uuid4().hex,
+            filename=filename,
+            total_size=total_size,
+            created_at=time.time(),
+            expected_sha256=expected_sha256.lower() if expected_sha256 is not None else None
+        )
+        open(self._part_path(session.session_id), 'wb').close()
+
+        meta_path = self._meta_path(session.session_id)
+        temp_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        metadata = asdict(session)
+        metadata.pop('offset')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        os.replace(temp_path, meta_path)
+        return session
+
+    def get(self, session_id: str) -> Optional[UploadSession]:
+        """读取会话，不存在或已过期时返回None"""
+        if not is_valid_image_id(session_id):
+            return None
+        try:
+            with open(self._meta_path(session_id), 'r', encoding='utf-8') as f:
+                session = UploadSession(**json.load(f))
+            session.offset = os.path.getsize(self._part_path(session_id))
+        except (OSError, ValueError, TypeError):
+            return None
+        if time.time() - session.created_at > self.ttl_seconds:
+            return None
+        return session
+
+    def append(self, session: UploadSession, offset: int, stream: BinaryIO,
+               length: Optional[int] = None) -> int:
+        """
+        把请求体从 offset 处追加到暂存文件
+
+        连接中断时已写入的部分保留，客户端按查询到的进度继续即可；
+        已知分块长度(length)时，超出声明大小的分块在写入前即被拒绝
+
+        Returns:
+            追加后已接收的字节数
+
+        Raises:
+            UploadOffsetMismatch: offset 与已接收的字节数不一致
+            ValidationError: 数据超出声明的文件大小
+        """
+        hasher = self._hasher(session.session_id)
+        with hasher.lock, open(self._part_path(session.session_id), 'ab') as part:
+            if fcntl is not None:
+                fcntl.flock(part.fileno(), fcntl.LOCK_EX)  # 其他进程的同一会话写入在此等待
+            current = os.fstat(part.fileno()).st_size
+            if offset != current:
+                raise UploadOffsetMismatch(current)
+            if length is not None and current + length > session.total_size:
+                raise ValidationError("上传数据超出声明的文件大小")
+
+            self._catch_up(session.session_id, hasher, current)
+            for chunk in iter(lambda: stream.read(_READ_CHUNK), b''):
+                if current + len(chunk) > session.total_size:
+                    raise ValidationError("上传数据超出声明的文件大小")
+                part.write(chunk)
+                hasher.sha256.update(chunk)
+                current += len(chunk)
+                hasher.hashed = current
+            part.flush()
+            return current
+
+    def _catch_up(self, session_id: str, hasher: _Hasher, size: int) -> None:
+        """前面的分块由其他进程写入时，补算本进程摘要中缺少的部分"""
+        if hasher.hashed > size:
+            hasher.sha256, hasher.hashed = hashlib.sha256(), 0
+        if hasher.hashed == size:
+            return
+        with open(self._part_path(session_id), 'rb') as f:
+            f.seek(hasher.hashed)
+            remaining = size - hasher.hashed
+            while remaining > 0:
+                chunk = f.read(min(_READ_CHUNK, remaining))
+                if not chunk:
+                    break
+                hasher.sha256.update(chunk)
+                remaining -= len(chunk)
+        hasher.hashed = size - remaining
+
+    def digest(self, session: UploadSession) -> str:
+        """已接收内容的SHA-256 (本进程写入了全部分块时无需读取文件)"""
+        hasher = self._hasher(session.session_id)
+        with hasher.lock:
+            self._catch_up(session.session_id, hasher, os.path.getsize(self._part_path(session.session_id)))
+            return hasher.sha256.hexdigest()
+
+    def open_staged(self, session: UploadSession) -> BinaryIO:
+        """打开已接收完整的暂存文件 (只读)"""
+        return open(self._part_path(session.session_id), 'rb')
+
+    def discard(self, session_id: str) -> None:
+        """删除会话及其暂存文件"""
+        with self._lock:
+            self._hashers.pop(session_id, None)
+        for path in (self._meta_path(session_id), self._part_path(session_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def expire(self) -> int:
+        """删除过期会话，返回删除的会话数"""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        with os.scandir(self.staging_dir) as entries:
+            for entry in entries:
+                session_id, _, extension = entry.name.partition('.')
+                if extension not in ('json', 'part'):
+                    continue
+                try:
+                    if entry.stat().st_mtime >= cutoff:
+                        continue
+                except OSError:
+                    continue
+                # 元数据写入后不再修改，其修改时间即创建时间；暂存文件只在没有元数据时按自身时间清理
+                if extension == 'json':
+                    self.discard(session_id)
+                    removed += 1
+                elif not os.path.exists(self._meta_path(session_id)):
+                    self.discard(session_id)
+        return removed
+
+# 进程内共享的会话存储，由应用启动时配置
+_active_store: Optional[UploadSessionStore] = None
+
+def configure_upload_sessions(staging_dir: Optional[str], max_bytes: int,
+                              ttl_seconds: float) -> Optional[UploadSessionStore]:
+    """配置可续传上传，staging_dir为空时关闭"""
+    global _active_store
+    _active_store = UploadSessionStore(staging_dir, max_bytes, ttl_seconds) if staging_dir else None
+    return _active_store
+
+def get_upload_sessions() -> Optional[UploadSessionStore]:
+    return _active_store
@@ -4,7 +4,9 @@
 import os
 from werkzeug.utils import secure_filename
 from PIL import Image
-from typing import Tuple, Optional
+from typing import Iterable, Optional, Tuple
+
+from .constants import PARAMETER_NAMES
 
 class ValidationError(Exception):
     """验证错误异常"""
@@ -80,4 +82,24 @@ def validate_filter_parameters(params: dict) -> bool:
         if not isinstance(value, (int, float)) or value < min_val or value > max_val:
             return False
 
-    return True
\ No newline at end of file
+    return True
+def normalize_analysis_parameters(names: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    规范化请求分析的参数子集
+
+    Args:
+        names: 参数名列表，为空时表示全部8类参数
+
+    Returns:
+        按标准参数顺序排列、去重后的参数名
+
+    Raises:
+        ValidationError: 包含未知的参数名
+    """
+    if not names:
+        return tuple(PARAMETER_NAMES)
+    requested = set(names)
+    unknown = sorted(requested - set(PARAMETER_NAMES))
+    if unknown:
+        raise ValidationError(f"未知的分析参数: {', '.join(unknown)}")
+    return tuple(name for name in PARAMETER_NAMES if name in requested)
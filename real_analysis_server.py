@@ -9,12 +9,22 @@ import os
 import time
 import tempfile
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import cv2
 import numpy as np
 from PIL import Image
 import cgi
 
+from backend.engine import apply_filter_parameters
+from backend.engine.analysis import estimate_high_freq_energy, local_window_stats
+from backend.utils.image_encoder import cv2_jpeg_params
+
+# 指标线程池: 颜色空间转换后七项分析相互独立，并行计算 (0表示顺序计算)
+ANALYSIS_METRIC_WORKERS = int(os.environ.get('ANALYSIS_METRIC_WORKERS', min(7, os.cpu_count() or 1)))
+METRIC_POOL = ThreadPoolExecutor(max_workers=ANALYSIS_METRIC_WORKERS,
+                                 thread_name_prefix='metric-worker') if ANALYSIS_METRIC_WORKERS > 1 else None
+
 class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory="/Users/cswenx/program/AICoding/Filter-Parser", **kwargs)
@@ -163,32 +173,42 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
             img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
             img_lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
 
-            # 1. 增强亮度分析 - 使用多种指标
-            brightness_metrics = self.analyze_brightness_advanced(img_gray, img_lab)
+            # 1-7. 各项增强分析相互独立，提交到指标线程池并行计算；
+            # 锐度(拉普拉斯/Sobel/FFT)与局部对比度(filter2D)开销最大，先提交
+            metric_tasks = [
+                ('sharpness', self.analyze_sharpness_advanced, (img_gray,)),       # 多尺度锐度检测
+                ('contrast', self.analyze_contrast_advanced, (img_gray,)),         # 局部对比度 + 全局对比度
+                ('saturation', self.analyze_saturation_advanced, (img_hsv, img_lab)),  # HSV + LAB双重分析
+                ('shadow_highlight', self.analyze_shadow_highlight_advanced, (img_gray, img_rgb)),  # 区域性分析
+                ('brightness', self.analyze_brightness_advanced, (img_gray, img_lab)),  # 多种亮度指标
+                ('hue', self.analyze_hue_advanced, (img_hsv,)),                    # 主导色调检测
+                ('temperature', self.analyze_temperature_advanced, (img_rgb,)),    # 白平衡算法
+            ]
+            if METRIC_POOL is None:
+                metrics = {name: func(*args) for name, func, args in metric_tasks}
+            else:
+                futures = [(name, METRIC_POOL.submit(func, *args)) for name, func, args in metric_tasks]
+                metrics = {name: future.result() for name, future in futures}
+
+            brightness_metrics = metrics['brightness']
             brightness_adjust = self.calculate_brightness_adjustment_advanced(brightness_metrics)
 
-            # 2. 增强对比度分析 - 局部对比度 + 全局对比度
-            contrast_metrics = self.analyze_contrast_advanced(img_gray)
+            contrast_metrics = metrics['contrast']
             contrast_adjust = self.calculate_contrast_adjustment_advanced(contrast_metrics)
 
-            # 3. 增强饱和度分析 - HSV + LAB双重分析
-            saturation_metrics = self.analyze_saturation_advanced(img_hsv, img_lab)
+            saturation_metrics = metrics['saturation']
             saturation_adjust = self.calculate_saturation_adjustment_advanced(saturation_metrics)
 
-            # 4. 增强锐化分析 - 多尺度锐度检测
-            sharpness_metrics = self.analyze_sharpness_advanced(img_gray)
+            sharpness_metrics = metrics['sharpness']
             sharpness_adjust = self.calculate_sharpness_adjustment_advanced(sharpness_metrics)
 
-            # 5. 增强色温分析 - 白平衡算法
-            temperature_metrics = self.analyze_temperature_advanced(img_rgb)
+            temperature_metrics = metrics['temperature']
             temperature_adjust = self.calculate_temperature_adjustment_advanced(temperature_metrics)
 
-            # 6. 增强色调分析 - 主导色调检测
-            hue_metrics = self.analyze_hue_advanced(img_hsv)
+            hue_metrics = metrics['hue']
             hue_adjust = self.calculate_hue_adjustment_advanced(hue_metrics)
 
-            # 7. 增强阴影/高光分析 - 区域性分析
-            shadow_highlight_metrics = self.analyze_shadow_highlight_advanced(img_gray, img_rgb)
+            shadow_highlight_metrics = metrics['shadow_highlight']
             shadow_adjust, highlight_adjust = self.calculate_shadow_highlight_adjustment_advanced(shadow_highlight_metrics)
 
             # 8. 生成智能建议
@@ -448,19 +468,30 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
             return round(-(weighted_brightness - 140) * 0.4, 1)
         return 0.0
 
-    def analyze_contrast_advanced(self, img_gray):
-        """增强的对比度分析"""
-        # 全局对比度（标准差）
-        global_contrast = np.std(img_gray)
+    def analyze_contrast_advanced(self, img_gray, scales=()):
+        """
+        增强的对比度分析
 
-        # 局部对比度（Michelson对比度）
-        kernel = np.ones((5, 5), np.float32) / 25
-        local_mean = cv2.filter2D(img_gray.astype(np.float32), -1, kernel)
-        local_contrast = np.mean(np.abs(img_gray.astype(np.float32) - local_mean))
+        Args:
+            img_gray: 灰度图
+            scales: 额外计算多尺度局部对比度(窗口内标准差均值)的窗口边长，如 (5, 15, 45)
+        """
+        # 全局对比度（标准差）；meanStdDev以双精度一次遍历完成，不产生临时数组
+        _, std_val = cv2.meanStdDev(img_gray)
+        global_contrast = std_val[0, 0]
 
-        # RMS对比度
-        mean_val = np.mean(img_gray)
-        rms_contrast = np.sqrt(np.mean((img_gray - mean_val) ** 2))
+        # 局部对比度（像素与5x5邻域均值的平均绝对差）
+        local_mean, _ = local_window_stats(img_gray, 5)
+        local_contrast = cv2.mean(cv2.absdiff(img_gray.astype(np.float32), local_mean))[0]
+
+        # RMS对比度: 即相对全局均值的均方根，与总体标准差相同
+        rms_contrast = std_val[0, 0]
+
+        # 多尺度局部对比度
+        multiscale = {}
+        for window in scales:
+            _, local_std = local_window_stats(img_gray, window, with_std=True)
+            multiscale[window] = cv2.mean(local_std)[0]
 
         # 基于直方图的对比度
         hist = cv2.calcHist([img_gray], [0], None, [256], [0, 256]).flatten()
@@ -475,6 +506,7 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
             'global': global_contrast,
             'local': local_contrast,
             'rms': rms_contrast,
+            'multiscale': multiscale,
             'hist_spread': hist_spread,
             'confidence': confidence
         }
@@ -537,23 +569,17 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
 
     def analyze_sharpness_advanced(self, img_gray):
         """增强的锐度分析"""
-        # 拉普拉斯算子
-        laplacian = cv2.Laplacian(img_gray, cv2.CV_64F)
-        laplacian_var = laplacian.var()
+        # 拉普拉斯算子 (float32输出，方差由meanStdDev以双精度累加)
+        laplacian = cv2.Laplacian(img_gray, cv2.CV_32F)
+        laplacian_var = cv2.meanStdDev(laplacian)[1][0, 0] ** 2
 
         # Sobel算子
-        sobelx = cv2.Sobel(img_gray, cv2.CV_64F, 1, 0, ksize=3)
-        sobely = cv2.Sobel(img_gray, cv2.CV_64F, 0, 1, ksize=3)
-        sobel_combined = np.sqrt(sobelx**2 + sobely**2)
-        sobel_mean = np.mean(sobel_combined)
-
-        # 高频内容分析
-        f_transform = np.fft.fft2(img_gray)
-        f_shift = np.fft.fftshift(f_transform)
-        magnitude = np.abs(f_shift)
-        h, w = img_gray.shape
-        high_freq = magnitude[h//4:3*h//4, w//4:3*w//4]
-        high_freq_energy = np.mean(high_freq)
+        sobelx = cv2.Sobel(img_gray, cv2.CV_32F, 1, 0, ksize=3)
+        sobely = cv2.Sobel(img_gray, cv2.CV_32F, 0, 1, ksize=3)
+        sobel_mean = cv2.mean(cv2.magnitude(sobelx, sobely))[0]
+
+        # 高频内容分析 (下采样图的实数FFT，见 estimate_high_freq_energy)
+        high_freq_energy = estimate_high_freq_energy(img_gray)
 
         # 置信度
         sharpness_indicators = [laplacian_var / 1000, sobel_mean / 100]
@@ -818,6 +844,7 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
                 # 获取原始图片和滤镜参数
                 image_id = data.get("original_image_id", "")
                 filter_parameters = data.get("parameters", {})
+                encoder_profile = data.get("encoder_profile")
 
                 if not image_id:
                     self.send_json_error(400, "Missing original_image_id")
@@ -848,7 +875,7 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
 
                 # 应用滤镜处理生成新图片
                 output_id = f"output_{int(time.time() * 1000)}"
-                processed_image_data = self.apply_filter_to_image(image_path, filter_parameters)
+                processed_image_data = self.apply_filter_to_image(image_path, filter_parameters, encoder_profile)
 
                 if processed_image_data:
                     # 保存处理后的图片到临时目录
@@ -862,6 +889,7 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
                         "output_id": output_id,
                         "image_id": image_id,
                         "filter_parameters": filter_parameters,
+                        "encoder_profile": encoder_profile,
                         "timestamp": time.time(),
                         "processed_image_path": processed_image_path
                     }
@@ -984,7 +1012,8 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
                 # 应用滤镜处理
                 processed_image_data = self.apply_filter_to_image(
                     image_path,
-                    filter_info.get("filter_parameters", {}) if filter_info else {}
+                    filter_info.get("filter_parameters", {}) if filter_info else {},
+                    filter_info.get("encoder_profile") if filter_info else None
                 )
 
                 if processed_image_data:
@@ -1007,7 +1036,7 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
             print(f"Download error: {e}")
             self.send_json_error(500, f"Download failed: {str(e)}")
 
-    def apply_filter_to_image(self, image_path, filter_parameters):
+    def apply_filter_to_image(self, image_path, filter_parameters, encoder_profile=None):
         """应用滤镜参数到图片并返回处理后的图片数据"""
         try:
             # 读取原始图片
@@ -1018,95 +1047,15 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
 
             print(f"Applying filters: {filter_parameters}")
 
-            # 转换为RGB (OpenCV默认BGR)
+            # 转换为RGB (OpenCV默认BGR)，由共用滤镜引擎按本服务原有的参数语义处理
             img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-            # 应用亮度调整
-            if 'brightness' in filter_parameters:
-                brightness_param = filter_parameters['brightness']
-                if isinstance(brightness_param, dict) and 'value' in brightness_param:
-                    brightness_val = brightness_param['value']
-                else:
-                    brightness_val = brightness_param
-
-                if brightness_val != 0:
-                    print(f"Applying brightness: {brightness_val}")
-                    # 亮度调整：添加常数值
-                    brightness_change = int(brightness_val * 2.5)  # 增强效果
-                    # 确保数据类型匹配
-                    img_rgb = img_rgb.astype(np.int16)
-                    img_rgb = img_rgb + brightness_change
-                    img_rgb = np.clip(img_rgb, 0, 255).astype(np.uint8)
-
-            # 应用对比度调整
-            if 'contrast' in filter_parameters:
-                contrast_param = filter_parameters['contrast']
-                if isinstance(contrast_param, dict) and 'value' in contrast_param:
-                    contrast_val = contrast_param['value']
-                else:
-                    contrast_val = contrast_param
-
-                if contrast_val != 0:
-                    print(f"Applying contrast: {contrast_val}")
-                    # 对比度调整：乘以比例因子
-                    factor = 1.0 + (contrast_val / 100.0)
-                    img_rgb = img_rgb.astype(np.float32)
-                    img_rgb = img_rgb * factor
-                    img_rgb = np.clip(img_rgb, 0, 255).astype(np.uint8)
-
-            # 应用饱和度调整
-            if 'saturation' in filter_parameters:
-                saturation_param = filter_parameters['saturation']
-                if isinstance(saturation_param, dict) and 'value' in saturation_param:
-                    saturation_val = saturation_param['value']
-                else:
-                    saturation_val = saturation_param
-
-                if saturation_val != 0:
-                    print(f"Applying saturation: {saturation_val}")
-                    # 转换到HSV进行饱和度调整
-                    img_hsv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HSV).astype(np.float32)
-                    factor = 1.0 + (saturation_val / 100.0)
-                    img_hsv[:, :, 1] = img_hsv[:, :, 1] * factor
-                    img_hsv[:, :, 1] = np.clip(img_hsv[:, :, 1], 0, 255)
-                    img_rgb = cv2.cvtColor(img_hsv.astype(np.uint8), cv2.COLOR_HSV2RGB)
-
-            # 应用色调调整
-            if 'hue' in filter_parameters:
-                hue_param = filter_parameters['hue']
-                if isinstance(hue_param, dict) and 'value' in hue_param:
-                    hue_val = hue_param['value']
-                else:
-                    hue_val = hue_param
-
-                if hue_val != 0:
-                    print(f"Applying hue: {hue_val}")
-                    # 转换到HSV进行色调调整
-                    img_hsv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HSV).astype(np.float32)
-                    img_hsv[:, :, 0] = (img_hsv[:, :, 0] + hue_val) % 180
-                    img_rgb = cv2.cvtColor(img_hsv.astype(np.uint8), cv2.COLOR_HSV2RGB)
-
-            # 应用锐化
-            if 'sharpness' in filter_parameters:
-                sharpness_param = filter_parameters['sharpness']
-                if isinstance(sharpness_param, dict) and 'value' in sharpness_param:
-                    sharpness_val = sharpness_param['value']
-                else:
-                    sharpness_val = sharpness_param
-
-                if sharpness_val > 0:
-                    print(f"Applying sharpness: {sharpness_val}")
-                    # 使用锐化核
-                    amount = sharpness_val / 100.0
-                    kernel = np.array([[-1,-1,-1], [-1,9+amount,-1], [-1,-1,-1]])
-                    img_rgb = cv2.filter2D(img_rgb, -1, kernel)
-                    img_rgb = np.clip(img_rgb, 0, 255).astype(np.uint8)
+            img_rgb = apply_filter_parameters(img_rgb, filter_parameters, 'opencv')
 
             # 转换回BGR for JPEG编码
             img_bgr = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
 
             # 编码为JPEG
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 95]
+            encode_param = cv2_jpeg_params(encoder_profile)
             is_success, buffer = cv2.imencode(".jpg", img_bgr, encode_param)
 
             if is_success:
@@ -15,6 +15,9 @@ import numpy as np
 from PIL import Image
 import cgi
 
+from backend.engine import apply_filter_parameters
+from backend.utils.image_encoder import cv2_jpeg_params
+
 class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         # 使用当前工作目录而不是固定路径
@@ -283,6 +286,7 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
                 # 获取原始图片和滤镜参数
                 image_id = data.get("original_image_id", "")
                 filter_parameters = data.get("parameters", {})
+                encoder_profile = data.get("encoder_profile")
 
                 if not image_id:
                     self.send_json_error(400, "Missing original_image_id")
@@ -313,7 +317,7 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
 
                 # 应用滤镜处理生成新图片
                 output_id = f"output_{int(time.time() * 1000)}"
-                processed_image_data = self.apply_filter_to_image(image_path, filter_parameters)
+                processed_image_data = self.apply_filter_to_image(image_path, filter_parameters, encoder_profile)
 
                 if processed_image_data:
                     # 保存处理后的图片到临时目录
@@ -329,6 +333,7 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
                         "output_id": output_id,
                         "image_id": image_id,
                         "filter_parameters": filter_parameters,
+                        "encoder_profile": encoder_profile,
                         "timestamp": time.time(),
                         "processed_image_path": processed_image_path
                     }
@@ -371,7 +376,7 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
             traceback.print_exc()
             self.send_json_error(500, f"Generate failed: {str(e)}")
 
-    def apply_filter_to_image(self, image_path, filter_parameters):
+    def apply_filter_to_image(self, image_path, filter_parameters, encoder_profile=None):
         """应用滤镜参数到图片并返回处理后的图片数据"""
         try:
             # 读取原始图片
@@ -382,64 +387,15 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
 
             print(f"Applying filters: {filter_parameters}")
 
-            # 转换为RGB (OpenCV默认BGR)
+            # 转换为RGB (OpenCV默认BGR)，由共用滤镜引擎按本服务原有的参数语义处理
             img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-            # 应用亮度调整
-            if 'brightness' in filter_parameters:
-                brightness_param = filter_parameters['brightness']
-                if isinstance(brightness_param, dict) and 'value' in brightness_param:
-                    brightness_val = brightness_param['value']
-                else:
-                    brightness_val = brightness_param
-
-                if brightness_val != 0:
-                    print(f"Applying brightness: {brightness_val}")
-                    # 亮度调整：添加常数值
-                    brightness_change = int(brightness_val * 2.5)  # 增强效果
-                    # 确保数据类型匹配
-                    img_rgb = img_rgb.astype(np.int16)
-                    img_rgb = img_rgb + brightness_change
-                    img_rgb = np.clip(img_rgb, 0, 255).astype(np.uint8)
-
-            # 应用对比度调整
-            if 'contrast' in filter_parameters:
-                contrast_param = filter_parameters['contrast']
-                if isinstance(contrast_param, dict) and 'value' in contrast_param:
-                    contrast_val = contrast_param['value']
-                else:
-                    contrast_val = contrast_param
-
-                if contrast_val != 0:
-                    print(f"Applying contrast: {contrast_val}")
-                    # 对比度调整：乘以比例因子
-                    factor = 1.0 + (contrast_val / 100.0)
-                    img_rgb = img_rgb.astype(np.float32)
-                    img_rgb = img_rgb * factor
-                    img_rgb = np.clip(img_rgb, 0, 255).astype(np.uint8)
-
-            # 应用饱和度调整
-            if 'saturation' in filter_parameters:
-                saturation_param = filter_parameters['saturation']
-                if isinstance(saturation_param, dict) and 'value' in saturation_param:
-                    saturation_val = saturation_param['value']
-                else:
-                    saturation_val = saturation_param
-
-                if saturation_val != 0:
-                    print(f"Applying saturation: {saturation_val}")
-                    # 转换到HSV进行饱和度调整
-                    img_hsv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HSV).astype(np.float32)
-                    factor = 1.0 + (saturation_val / 100.0)
-                    img_hsv[:, :, 1] = img_hsv[:, :, 1] * factor
-                    img_hsv[:, :, 1] = np.clip(img_hsv[:, :, 1], 0, 255)
-                    img_rgb = cv2.cvtColor(img_hsv.astype(np.uint8), cv2.COLOR_HSV2RGB)
+            img_rgb = apply_filter_parameters(img_rgb, filter_parameters, 'opencv_basic')
 
             # 转换回BGR for JPEG编码
             img_bgr = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
 
             # 编码为JPEG
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 95]
+            encode_param = cv2_jpeg_params(encoder_profile)
             is_success, buffer = cv2.imencode(".jpg", img_bgr, encode_param)
 
             if is_success:
@@ -536,7 +492,8 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
                 # 应用滤镜处理
                 processed_image_data = self.apply_filter_to_image(
                     image_path,
-                    filter_info.get("filter_parameters", {}) if filter_info else {}
+                    filter_info.get("filter_parameters", {}) if filter_info else {},
+                    filter_info.get("encoder_profile") if filter_info else None
                 )
 
                 if processed_image_data:
@@ -631,7 +588,7 @@ class ImageAnalysisHandler(http.server.SimpleHTTPRequestHandler):
             saturation_adjust = self.calculate_saturation_adjustment(saturation)
 
             # 分析锐度
-            laplacian_var = cv2.Laplacian(img_gray, cv2.CV_64F).var()
+            laplacian_var = cv2.meanStdDev(cv2.Laplacian(img_gray, cv2.CV_32F))[1][0, 0] ** 2
             sharpness_adjust = self.calculate_sharpness_adjustment(laplacian_var)
 
             # 分析色温